@@ -1,3 +1,29 @@
-from .chat_chain import chain_chat_response
+from .chat_chain import (
+    chain_chat_response,
+    achain_chat_response,
+    count_message_tokens,
+    get_chat_model,
+    set_chat_model,
+    set_llm_cache_enabled
+)
+from .llm_scheduler import LLMScheduler, get_llm_scheduler, set_llm_scheduler, estimate_tokens, INTERACTIVE, BATCH
+from .response_cache import ResponseCache, get_response_cache, set_response_cache, make_cache_key
 
-__all__ = ["chain_chat_response"]
+__all__ = [
+    "chain_chat_response",
+    "achain_chat_response",
+    "count_message_tokens",
+    "get_chat_model",
+    "set_chat_model",
+    "set_llm_cache_enabled",
+    "ResponseCache",
+    "get_response_cache",
+    "set_response_cache",
+    "make_cache_key",
+    "LLMScheduler",
+    "get_llm_scheduler",
+    "set_llm_scheduler",
+    "estimate_tokens",
+    "INTERACTIVE",
+    "BATCH"
+]
@@ -2,30 +2,186 @@
 Chat chain implementation using LangChain.
 
 This module provides the core chat functionality with the LLM model.
+When called inside a graph run with stream_mode="messages", the model streams
+its tokens to the graph's callback handler even though the call here blocks.
+Every call goes through the LLM scheduler (rate limits, concurrency, retries);
+a call is not retried once it has streamed a token, as the graph already
+forwarded it to the user.
 """
 
-from langchain_openai import ChatOpenAI
+import threading
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import SystemMessage
-from dotenv import load_dotenv
+from langchain_core.runnables.config import ensure_config, merge_configs
+from common_assets.config import (
+    chat_model_name,
+    chat_model_temperature,
+    llm_cache_enabled,
+    llm_cache_allow_nonzero_temperature
+)
+from backend.utils.tracing import span
+from .response_cache import get_response_cache, make_cache_key
+from .llm_scheduler import get_llm_scheduler, estimate_tokens, INTERACTIVE
 
-# Load environment variables
-load_dotenv()
+_model = None
+_model_lock = threading.Lock()
+# Runtime switch of the response cache, initialised from config (see set_llm_cache_enabled)
+_cache_enabled = llm_cache_enabled
 
-# Initialize the chat model
-model = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
 
+def get_chat_model():
+    """
+    Get the chat model, constructing it on first use.
+
+    Environment variables are loaded and langchain_openai is imported only
+    here, so importing this module stays cheap.
+
+    Returns:
+        ChatOpenAI instance shared by the process
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from dotenv import load_dotenv
+                from langchain_openai import ChatOpenAI
 
-def chain_chat_response(messages: list, system_prompt: str = None) -> str:
+                # Load environment variables
+                load_dotenv()
+
+                # Initialize the chat model; retries are left to the LLM scheduler
+                _model = ChatOpenAI(model=chat_model_name, temperature=chat_model_temperature, max_retries=0)
+    return _model
+
+
+def set_llm_cache_enabled(enabled: bool) -> None:
+    """
+    Switch the LLM response cache on or off for this process, e.g. off in benchmarks.
+
+    Args:
+        enabled: Whether calls that ask for caching may be served from the cache
+    """
+    global _cache_enabled
+    _cache_enabled = enabled
+
+
+def set_chat_model(chat_model) -> None:
+    """
+    Replace the process-wide chat model, e.g. with an offline fake in benchmarks.
+
+    Args:
+        chat_model: Any LangChain chat model, or None to build the default one on next use
+    """
+    global _model
+    with _model_lock:
+        _model = chat_model
+
+
+def __getattr__(name):
+    # Backwards-compatible module attribute: chat_chain.model builds the client on first access
+    if name == "model":
+        return get_chat_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def count_message_tokens(message) -> int:
+    """
+    Count the prompt tokens a single message costs with the chat model's tokenizer.
+
+    Args:
+        message: Message object
+
+    Returns:
+        int: Number of tokens
+    """
+    return get_chat_model().get_num_tokens_from_messages([message])
+
+
+def call_temperature(temperature: Optional[float]) -> Optional[float]:
+    """Sampling temperature of a call: the requested one, else the chat model's own."""
+    return temperature if temperature is not None else getattr(get_chat_model(), 'temperature', None)
+
+
+def get_cache_key(messages: list, system_prompt: Optional[str], use_cache: bool,
+                  temperature: Optional[float] = None) -> Optional[str]:
+    """
+    Cache key of a model call, or None if the call must not be cached.
+
+    Calls are only cached when the caller asks for it, caching is enabled, and
+    the call runs at temperature 0 (e.g. QnA, see 'temperature' in
+    d_chat_modes_graph) unless llm_cache_allow_nonzero_temperature opts in to
+    caching sampled answers.
+    """
+    if not use_cache:
+        return None
+    if not _cache_enabled:
+        return None
+    temperature = call_temperature(temperature)
+    if temperature and not llm_cache_allow_nonzero_temperature:
+        return None
+    return make_cache_key(get_chat_model().model_name, temperature, system_prompt, messages)
+
+
+def invoke_kwargs(temperature: Optional[float]) -> dict:
+    # Per-call override of the model's temperature, sent with the request
+    return {'temperature': temperature} if temperature is not None else {}
+
+
+class OutputStartedHandler(BaseCallbackHandler):
+    """Records whether the model streamed a token, i.e. whether part of the answer reached the caller."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = False
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self.started = True
+
+
+def with_output_handler(config: Optional[dict]):
+    """
+    Add an OutputStartedHandler to the call's config, keeping inherited callbacks (e.g. graph token streaming).
+
+    Returns:
+        tuple: (config to invoke the model with, the handler)
+    """
+    handler = OutputStartedHandler()
+    return merge_configs(ensure_config(config), {'callbacks': [handler]}), handler
+
+
+def token_usage(response) -> dict:
+    """Prompt/completion token counts reported by the provider, empty when unavailable."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {
+        'prompt_tokens': usage.get('input_tokens'),
+        'completion_tokens': usage.get('output_tokens')
+    } if usage else {}
+
+
+def chain_chat_response(messages: list, system_prompt: str = None, use_cache: bool = False,
+                        temperature: Optional[float] = None) -> str:
     """
     Invoke the chat model with messages and optional system prompt.
 
     Args:
         messages: List of message objects or dicts with 'role' and 'content'
         system_prompt: Optional system prompt to prepend to messages
+        use_cache: Serve repeated calls from the response cache (see get_cache_key)
+        temperature: Sampling temperature of this call, None for the chat model's default
 
     Returns:
         str: The AI-generated response content
     """
+    cache_key = get_cache_key(messages, system_prompt, use_cache, temperature)
+    if cache_key:
+        with span("llm.cache_lookup") as attrs:
+            cached_response = get_response_cache().get(cache_key)
+            attrs['hit'] = cached_response is not None
+        if cached_response is not None:
+            return cached_response
+
     # Prepend system prompt if provided
     if system_prompt:
         messages_with_system = [SystemMessage(content=system_prompt)] + messages
@@ -33,6 +189,62 @@ def chain_chat_response(messages: list, system_prompt: str = None) -> str:
         messages_with_system = messages
 
     # Invoke the model
-    response = model.invoke(messages_with_system)
+    model = get_chat_model()
+    config, output = with_output_handler(None)
+    with span("llm.invoke", model=model.model_name) as attrs:
+        response = get_llm_scheduler().call(lambda: model.invoke(messages_with_system, config=config,
+                                                                 **invoke_kwargs(temperature)),
+                                            priority=INTERACTIVE,
+                                            estimated_tokens=estimate_tokens(messages_with_system),
+                                            output_started=lambda: output.started)
+        attrs.update(token_usage(response))
+
+    if cache_key:
+        get_response_cache().set(cache_key, response.content)
+    return response.content
+
+
+async def achain_chat_response(messages: list, system_prompt: str = None, config: dict = None,
+                               use_cache: bool = False, temperature: Optional[float] = None) -> str:
+    """
+    Async variant of chain_chat_response, awaiting the model instead of blocking a thread.
+
+    Args:
+        messages: List of message objects or dicts with 'role' and 'content'
+        system_prompt: Optional system prompt to prepend to messages
+        config: Optional runnable config, forwarded so callbacks (e.g. graph
+                token streaming) reach the model on every Python version
+        use_cache: Serve repeated calls from the response cache (see get_cache_key)
+        temperature: Sampling temperature of this call, None for the chat model's default
+
+    Returns:
+        str: The AI-generated response content
+    """
+    cache_key = get_cache_key(messages, system_prompt, use_cache, temperature)
+    if cache_key:
+        with span("llm.cache_lookup") as attrs:
+            cached_response = get_response_cache().get(cache_key)
+            attrs['hit'] = cached_response is not None
+        if cached_response is not None:
+            return cached_response
+
+    # Prepend system prompt if provided
+    if system_prompt:
+        messages_with_system = [SystemMessage(content=system_prompt)] + messages
+    else:
+        messages_with_system = messages
+
+    # Invoke the model without blocking the event loop
+    model = get_chat_model()
+    config, output = with_output_handler(config)
+    with span("llm.invoke", model=model.model_name) as attrs:
+        response = await get_llm_scheduler().acall(lambda: model.ainvoke(messages_with_system, config=config,
+                                                                         **invoke_kwargs(temperature)),
+                                                   priority=INTERACTIVE,
+                                                   estimated_tokens=estimate_tokens(messages_with_system),
+                                                   output_started=lambda: output.started)
+        attrs.update(token_usage(response))
 
+    if cache_key:
+        get_response_cache().set(cache_key, response.content)
     return response.content
@@ -0,0 +1,378 @@
+"""
+Process-wide scheduler for chat model calls.
+
+Every model call waits for admission before it is sent:
+
+  - token buckets for requests per minute and tokens per minute (the
+    provider's limits); a call is charged its estimated tokens up front and
+    corrected with the reported usage when it returns
+  - a cap on calls in flight, with a smaller cap for batch work
+  - strict priority: interactive chat turns are admitted before any waiting
+    batch work, and batch work leaves llm_batch_reserve_fraction of each
+    bucket to interactive turns
+  - retries of rate-limit, timeout, connection and 5xx errors with jittered
+    exponential backoff; a 429 pauses all admissions (honoring Retry-After),
+    so one limit hit does not turn into a storm of them. A call that already
+    streamed output is not retried, since its tokens reached the caller
+
+Calls run in the caller's thread (or task), so context variables and
+callbacks, such as graph token streaming and tracing spans, work unchanged.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from common_assets.config import (
+    llm_requests_per_minute,
+    llm_tokens_per_minute,
+    llm_max_concurrency,
+    llm_batch_max_concurrency,
+    llm_batch_reserve_fraction,
+    llm_max_retries,
+    llm_backoff_base_s,
+    llm_backoff_max_s,
+    llm_expected_completion_tokens
+)
+from backend.utils.tracing import record_latency
+
+INTERACTIVE = 0
+BATCH = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Rough prompt cost of an image part (detail "auto" on a slide-sized image)
+IMAGE_PART_TOKENS = 1000
+
+_RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+                          "Timeout", "TimeoutError", "ConnectionError"}
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at per_minute / 60 per second, holding at most one minute's worth.
+
+    Takes may exceed the level (the bucket goes into debt), so a request
+    larger than the capacity is delayed rather than blocked forever.
+    """
+
+    def __init__(self, per_minute: float):
+        self.unlimited = per_minute <= 0
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float, now: float, reserve: float = 0.0) -> float:
+        """Seconds until `amount` can be taken while leaving `reserve` (fraction of capacity) in the bucket."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity) + reserve * self.capacity
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        if not self.unlimited:
+            self._refill(now)
+            self.level -= amount
+
+    def refund(self, amount: float) -> None:
+        # Negative amounts charge usage above the estimate
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    __slots__ = ('priority', 'sequence', 'slots', 'tokens', 'enqueued_at')
+
+    def __init__(self, priority: int, sequence: int, slots: int, tokens: int):
+        self.priority = priority
+        self.sequence = sequence
+        self.slots = slots
+        self.tokens = tokens
+        self.enqueued_at = time.perf_counter()
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+def estimate_tokens(messages: Sequence, completion_tokens: int = llm_expected_completion_tokens) -> int:
+    """
+    Rough token cost of a call (about 4 characters per token plus the expected completion), without tokenizing.
+    """
+    characters = 0
+    images = 0
+    for message in messages:
+        content = message.content if hasattr(message, "content") else message.get('content', "")
+        if isinstance(content, str):
+            characters += len(content)
+            continue
+        for part in content:
+            if isinstance(part, dict) and part.get('type') == 'image_url':
+                images += 1
+            else:
+                characters += len(part.get('text', "") if isinstance(part, dict) else str(part))
+    return characters // 4 + images * IMAGE_PART_TOKENS + completion_tokens
+
+
+def reported_tokens(result: Any) -> Optional[int]:
+    """Total tokens reported by the provider for a message or list of messages, None when unknown."""
+    results = result if isinstance(result, list) else [result]
+    total = 0
+    for item in results:
+        usage = getattr(item, "usage_metadata", None)
+        if not usage or usage.get('total_tokens') is None:
+            return None
+        total += usage['total_tokens']
+    return total
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    return (getattr(error, "status_code", None) in _RETRYABLE_STATUS_CODES
+            or type(error).__name__ in _RETRYABLE_ERROR_NAMES)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Retry-After of the provider's response, if the error carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Admission control for model calls: rate limits, concurrency caps, priority and retries.
+    """
+
+    def __init__(self, requests_per_minute: int = llm_requests_per_minute,
+                 tokens_per_minute: int = llm_tokens_per_minute,
+                 max_concurrency: int = llm_max_concurrency,
+                 batch_max_concurrency: int = llm_batch_max_concurrency,
+                 batch_reserve_fraction: float = llm_batch_reserve_fraction,
+                 max_retries: int = llm_max_retries,
+                 backoff_base_s: float = llm_backoff_base_s,
+                 backoff_max_s: float = llm_backoff_max_s):
+        self.max_concurrency = max_concurrency
+        self.batch_max_concurrency = max(1, min(batch_max_concurrency, max_concurrency))
+        self.batch_reserve_fraction = batch_reserve_fraction
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._batch_in_flight = 0
+        self._paused_until = 0.0
+        self._stats = Counter()
+
+    # Admission
+
+    def _try_admit(self, ticket: _Ticket) -> Optional[float]:
+        """
+        Admit the ticket if it is first in line and every limit allows it.
+
+        Returns:
+            None when admitted, otherwise seconds to wait (0: until another call finishes or is admitted)
+        """
+        if self._waiting[0] is not ticket:
+            return 0.0
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight + ticket.slots > self.max_concurrency:
+            return 0.0
+        is_batch = ticket.priority != INTERACTIVE
+        if is_batch and self._batch_in_flight + ticket.slots > self.batch_max_concurrency:
+            return 0.0
+        reserve = self.batch_reserve_fraction if is_batch else 0.0
+        wait = max(self._requests.time_until(ticket.slots, now, reserve),
+                   self._tokens.time_until(ticket.tokens, now, reserve))
+        if wait > 0:
+            return wait
+
+        self._requests.take(ticket.slots, now)
+        self._tokens.take(ticket.tokens, now)
+        heapq.heappop(self._waiting)
+        self._in_flight += ticket.slots
+        if is_batch:
+            self._batch_in_flight += ticket.slots
+        self._stats['admitted'] += ticket.slots
+        record_latency(f"llm.queue_wait.{PRIORITY_NAMES.get(ticket.priority, ticket.priority)}",
+                       (time.perf_counter() - ticket.enqueued_at) * 1000)
+        # The next ticket in line may be admissible now
+        self._condition.notify_all()
+        return None
+
+    def _enqueue(self, priority: int, slots: int, tokens: int) -> _Ticket:
+        ticket = _Ticket(priority, next(self._sequence), slots, tokens)
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        # Caller gave up (exception, cancellation) before admission
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._condition.notify_all()
+
+    def acquire(self, priority: int = INTERACTIVE, slots: int = 1, tokens: int = 0) -> _Ticket:
+        """Block until a call of `slots` requests and `tokens` estimated tokens may be sent."""
+        with self._condition:
+            ticket = self._enqueue(priority, slots, tokens)
+            try:
+                while True:
+                    wait = self._try_admit(ticket)
+                    if wait is None:
+                        return ticket
+                    self._condition.wait(timeout=wait or None)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    async def aacquire(self, priority: int = INTERACTIVE, slots: int = 1, tokens: int = 0) -> _Ticket:
+        """Async acquire: waits with asyncio.sleep instead of blocking the event loop."""
+        with self._condition:
+            ticket = self._enqueue(priority, slots, tokens)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(ticket)
+                if wait is None:
+                    return ticket
+                await asyncio.sleep(min(wait, 0.5) if wait else 0.01)
+        except BaseException:
+            with self._condition:
+                self._abandon(ticket)
+            raise
+
+    def release(self, ticket: _Ticket, used_tokens: Optional[int] = None) -> None:
+        """Free the ticket's slots and correct the token bucket with the reported usage."""
+        with self._condition:
+            self._in_flight -= ticket.slots
+            if ticket.priority != INTERACTIVE:
+                self._batch_in_flight -= ticket.slots
+            if used_tokens is not None:
+                self._tokens.refund(ticket.tokens - used_tokens)
+            self._condition.notify_all()
+
+    # Retries
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt) * (0.5 + random.random())
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if is_rate_limit_error(error):
+            # Everyone waits: the provider is already rejecting calls
+            with self._condition:
+                self._stats['rate_limited'] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self._condition.notify_all()
+        return delay
+
+    def _should_retry(self, attempt: int, error: BaseException, output_started: bool = False) -> bool:
+        if output_started or attempt >= self.max_retries or not is_retryable_error(error):
+            self._stats['failed'] += 1
+            return False
+        self._stats['retries'] += 1
+        return True
+
+    def call(self, fn: Callable[[], Any], priority: int = INTERACTIVE, estimated_tokens: int = 0,
+             output_started: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Run fn() (one model call) in this thread once admitted, retrying transient errors.
+
+        Args:
+            fn: Makes the call, e.g. lambda: model.invoke(messages)
+            priority: INTERACTIVE or BATCH
+            estimated_tokens: Prompt plus expected completion tokens (see estimate_tokens)
+            output_started: Optional callable telling whether fn already emitted output (e.g. streamed
+                            tokens); an error after that is raised instead of retried
+
+        Returns:
+            fn's result
+        """
+        for attempt in range(self.max_retries + 1):
+            ticket = self.acquire(priority, 1, estimated_tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                self.release(ticket)
+                if not self._should_retry(attempt, e, output_started is not None and output_started()):
+                    raise
+                delay = self._backoff(attempt, e)
+                if not is_rate_limit_error(e):
+                    time.sleep(delay)
+                continue
+            self.release(ticket, reported_tokens(result))
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE,
+                    estimated_tokens: int = 0, output_started: Optional[Callable[[], bool]] = None) -> Any:
+        """Async counterpart of call: fn returns an awaitable, e.g. lambda: model.ainvoke(messages)."""
+        for attempt in range(self.max_retries + 1):
+            ticket = await self.aacquire(priority, 1, estimated_tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                self.release(ticket)
+                if not self._should_retry(attempt, e, output_started is not None and output_started()):
+                    raise
+                delay = self._backoff(attempt, e)
+                if not is_rate_limit_error(e):
+                    await asyncio.sleep(delay)
+                continue
+            self.release(ticket, reported_tokens(result))
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                **self._stats,
+                'in_flight': self._in_flight,
+                'batch_in_flight': self._batch_in_flight,
+                'waiting': len(self._waiting),
+                'paused_s': max(0.0, self._paused_until - time.monotonic())
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the process-wide scheduler, created on first use from common_assets.config."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
+
+
+def set_llm_scheduler(scheduler: Optional[LLMScheduler]) -> None:
+    """Replace the process-wide scheduler (None builds the configured one on next use)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
@@ -0,0 +1,198 @@
+"""
+Response cache for chat model calls.
+
+Two tiers: an in-memory LRU in front of a persistent SQLite table. Entries
+expire after a TTL and the SQLite tier is trimmed to a maximum number of
+entries, least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from common_assets.config import (
+    llm_cache_sqlite_loc,
+    llm_cache_memory_max_entries,
+    llm_cache_max_entries,
+    llm_cache_ttl_s
+)
+
+
+def normalize_text(text) -> str:
+    # Case and whitespace differences should not produce different keys
+    if not isinstance(text, str):
+        text = json.dumps(text, sort_keys=True, default=str)
+    return " ".join(text.split()).casefold()
+
+
+def make_cache_key(model_name: str, temperature: float, system_prompt: Optional[str], messages: list) -> str:
+    """
+    Build the cache key of a model call.
+
+    Args:
+        model_name: Name of the chat model
+        temperature: Sampling temperature of the call
+        system_prompt: System prompt prepended to the messages, if any
+        messages: Message objects (or role/content dicts) sent to the model
+
+    Returns:
+        str: Hex SHA-256 digest of the normalized call
+    """
+    payload = {
+        'model': model_name,
+        'temperature': temperature,
+        'system': normalize_text(system_prompt or ""),
+        'messages': [
+            [message['role'], normalize_text(message['content'])] if isinstance(message, dict)
+            else [message.type, normalize_text(message.content)]
+            for message in messages
+        ]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of model responses keyed by make_cache_key.
+    """
+
+    def __init__(self, db_path: str, memory_max_entries: int = 1024, max_entries: int = 50000,
+                 ttl_s: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.memory_max_entries = memory_max_entries
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_trim = 0
+        self.hits_memory = 0
+        self.hits_sqlite = 0
+        self.misses = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_response_cache (
+                   cache_key TEXT PRIMARY KEY,
+                   response TEXT NOT NULL,
+                   expires_at REAL NOT NULL,
+                   last_access REAL NOT NULL)"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_access ON llm_response_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM llm_response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_response_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row[0], row[1])
+            self.hits_sqlite += 1
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """Store a response in both tiers."""
+        now = time.time()
+        expires_at = now + self.ttl_s
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._conn.execute(
+                """INSERT OR REPLACE INTO llm_response_cache (cache_key, response, expires_at, last_access)
+                   VALUES (?, ?, ?, ?)""",
+                (key, response, expires_at, now)
+            )
+            self._conn.commit()
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= 100:
+                self._trim(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_response_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since the cache was created."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_sqlite + self.misses
+            return {
+                'hits_memory': self.hits_memory,
+                'hits_sqlite': self.hits_sqlite,
+                'misses': self.misses,
+                'hit_rate': (self.hits_memory + self.hits_sqlite) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _trim(self, now: float) -> None:
+        # Drop expired rows, then the least recently used ones above max_entries
+        self._writes_since_trim = 0
+        self._conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            """DELETE FROM llm_response_cache WHERE cache_key IN (
+                   SELECT cache_key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)""",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache, created on first use from common_assets.config."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    llm_cache_sqlite_loc,
+                    memory_max_entries=llm_cache_memory_max_entries,
+                    max_entries=llm_cache_max_entries,
+                    ttl_s=llm_cache_ttl_s
+                )
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """
+    Replace the process-wide response cache, e.g. with one in a benchmark's temporary directory.
+
+    Args:
+        cache: A ResponseCache, or None to open the configured one on next use
+    """
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = cache
@@ -1,3 +1,6 @@
-from .prompts_chatbot import CHATBOT_SYSTEM_PROMPT
+from .prompts_chatbot import CHATBOT_SYSTEM_PROMPT, HISTORY_SUMMARY_PROMPT, RETRIEVAL_CONTEXT_PROMPT
+from .prompts_ingestion import PPT_SLIDE_ANALYSIS_PROMPT
+from .prompts_content_gen import CONTENT_OUTLINE_PROMPT, SECTION_DRAFT_PROMPT
 
-__all__ = ["CHATBOT_SYSTEM_PROMPT"]
+__all__ = ["CHATBOT_SYSTEM_PROMPT", "HISTORY_SUMMARY_PROMPT", "RETRIEVAL_CONTEXT_PROMPT", "PPT_SLIDE_ANALYSIS_PROMPT",
+           "CONTENT_OUTLINE_PROMPT", "SECTION_DRAFT_PROMPT"]
@@ -7,3 +7,17 @@ This file contains prompts specifically for chatbot interactions.
 CHATBOT_SYSTEM_PROMPT = """You are a helpful AI assistant.
 Provide clear, concise, and helpful responses to user questions.
 Be friendly, professional, and informative in your interactions."""
+
+HISTORY_SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Update the existing summary with the new messages provided.
+Keep facts, names, numbers, decisions and open questions; drop pleasantries and repetition.
+Write the summary in plain prose, at most a few short paragraphs.
+
+Existing summary:
+{summary}"""
+
+RETRIEVAL_CONTEXT_PROMPT = """Excerpts from the slide library that may be relevant to the user's question.
+Use them when they answer the question and mention the deck and slide number you relied on.
+If they are not relevant, answer without them.
+
+{context}"""
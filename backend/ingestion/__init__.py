@@ -0,0 +1,20 @@
+"""
+Slide-deck ingestion: rendering, analysis with PPT_SLIDE_ANALYSIS_PROMPT and storage.
+"""
+
+from .slide_schema import SLIDE_ANALYSIS_SCHEMA, SlideAnalysisError, parse_slide_analysis, validate_against_schema
+from .store import IngestionStore
+from .pipeline import IngestionResult, ingest_deck, analyze_slide_image, get_ingestion_model, set_ingestion_model
+
+__all__ = [
+    "SLIDE_ANALYSIS_SCHEMA",
+    "SlideAnalysisError",
+    "parse_slide_analysis",
+    "validate_against_schema",
+    "IngestionStore",
+    "IngestionResult",
+    "ingest_deck",
+    "analyze_slide_image",
+    "get_ingestion_model",
+    "set_ingestion_model"
+]
@@ -0,0 +1,306 @@
+"""
+Parallel, resumable slide-deck ingestion.
+
+For each deck:
+
+1. The deck is converted to PDF and its slides are rendered to PNG in a
+   process pool (see rendering).
+2. Each rendered chunk of slides goes straight to analysis, so rendering and
+   analysis overlap. Each slide image is analyzed with
+   PPT_SLIDE_ANALYSIS_PROMPT by a vision chat model. At most
+   `max_concurrency` calls are in flight at once, sent as batch work through
+   the LLM scheduler, so they respect the provider's rate limits and yield to
+   interactive chat turns. Rendering pauses while more than
+   2 * max_concurrency rendered slides wait for analysis.
+3. Answers are validated against SLIDE_ANALYSIS_SCHEMA; invalid answers are
+   retried. Each valid result is committed to the IngestionStore as soon as
+   it arrives, and its image is deleted (unless ingestion_keep_images).
+
+The manifest in the store is keyed by the deck's content hash. A rerun
+skips slides already done, and resumes after a crash. Slides are also keyed
+by a hash of their image, model and prompt, so identical slides in other
+decks reuse the stored analysis instead of calling the model again.
+
+    python -m backend.ingestion.pipeline decks/*.pptx --concurrency 8
+"""
+
+import argparse
+import base64
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from common_assets.config import (
+    ingestion_sqlite_loc,
+    ingestion_image_dir,
+    ingestion_render_workers,
+    ingestion_render_dpi,
+    ingestion_keep_images,
+    ingestion_max_concurrency,
+    ingestion_max_retries,
+    ingestion_model_name
+)
+from backend.config.prompts_ingestion import PPT_SLIDE_ANALYSIS_PROMPT
+from backend.chains.llm_scheduler import get_llm_scheduler, estimate_tokens, BATCH
+from backend.utils.tracing import span
+from .rendering import convert_to_pdf, count_pdf_pages, iter_rendered_slides
+from .slide_schema import parse_slide_analysis, SlideAnalysisError
+from .store import IngestionStore
+
+_PROMPT_HASH = hashlib.sha256(PPT_SLIDE_ANALYSIS_PROMPT.encode("utf-8")).hexdigest()
+
+_model = None
+_model_lock = threading.Lock()
+
+
+@dataclass
+class IngestionResult:
+    """
+    Outcome of ingesting one deck.
+
+    Attributes:
+        deck_path: Path of the deck
+        deck_hash: SHA-256 of the deck file (manifest key)
+        total: Number of slides in the deck
+        analyzed: Slides analyzed by the model in this run
+        reused: Slides whose analysis was found by content hash
+        skipped: Slides already done in an earlier run
+        failed: Slide number -> error, for slides that could not be analyzed
+    """
+    deck_path: str
+    deck_hash: str
+    total: int = 0
+    analyzed: List[int] = field(default_factory=list)
+    reused: List[int] = field(default_factory=list)
+    skipped: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def get_ingestion_model():
+    """
+    Get the vision chat model used for slide analysis, constructing it on first use.
+
+    Returns:
+        ChatOpenAI instance (temperature 0, JSON output) shared by the process
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from dotenv import load_dotenv
+                from langchain_openai import ChatOpenAI
+
+                load_dotenv()
+                _model = ChatOpenAI(model=ingestion_model_name, temperature=0, max_retries=0,
+                                    model_kwargs={'response_format': {'type': 'json_object'}})
+    return _model
+
+
+def set_ingestion_model(model) -> None:
+    """Replace the slide analysis model (None builds the default one on next use)."""
+    global _model
+    with _model_lock:
+        _model = model
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def slide_content_hash(image_bytes: bytes, model_name: str = ingestion_model_name) -> str:
+    """Hash of a slide image together with the model and prompt that analyze it."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(_PROMPT_HASH.encode("utf-8"))
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+def analyze_slide_image(image_bytes: bytes, max_retries: int = ingestion_max_retries) -> Dict:
+    """
+    Run PPT_SLIDE_ANALYSIS_PROMPT on one slide image.
+
+    Transient API errors are retried by the LLM scheduler; answers that fail
+    validation are retried here with jittered exponential backoff.
+
+    Args:
+        image_bytes: PNG image of the slide
+        max_retries: Retries after the first attempt
+
+    Returns:
+        dict: Validated analysis (see SLIDE_ANALYSIS_SCHEMA)
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    image_url = "data:image/png;base64," + base64.b64encode(image_bytes).decode("ascii")
+    messages = [
+        SystemMessage(content=PPT_SLIDE_ANALYSIS_PROMPT),
+        HumanMessage(content=[
+            {'type': 'text', 'text': "Analyze this slide and answer with the JSON only."},
+            {'type': 'image_url', 'image_url': {'url': image_url}}
+        ])
+    ]
+    model = get_ingestion_model()
+    scheduler = get_llm_scheduler()
+    estimated_tokens = estimate_tokens(messages)
+    for attempt in range(max_retries + 1):
+        try:
+            with span("ingestion.analyze_slide", attempt=attempt):
+                response = scheduler.call(lambda: model.invoke(messages), priority=BATCH,
+                                          estimated_tokens=estimated_tokens)
+            return parse_slide_analysis(response.content)
+        except SlideAnalysisError:
+            if attempt == max_retries:
+                raise
+            time.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+
+
+def ingest_deck(deck_path: str, store: IngestionStore, render_workers: int = ingestion_render_workers,
+                max_concurrency: int = ingestion_max_concurrency, force: bool = False,
+                progress_callback: Optional[Callable[[str, int, int], None]] = None) -> IngestionResult:
+    """
+    Render and analyze every slide of a deck that is not done yet.
+
+    Args:
+        deck_path: .pptx/.ppt/.odp or .pdf file
+        store: Store receiving the analyses and manifest entries
+        render_workers: Processes rendering slides
+        max_concurrency: Analysis calls in flight at once
+        force: Re-analyze every slide, ignoring the manifest and stored analyses
+        progress_callback: Optional callable(stage, done, total) with stage 'render' or 'analyze';
+                           'analyze' is called from the analysis threads
+
+    Returns:
+        IngestionResult: falsy when some slides failed (rerun to retry only those)
+    """
+    deck_hash = file_sha256(deck_path)
+    result = IngestionResult(deck_path=deck_path, deck_hash=deck_hash)
+    image_dir = os.path.join(ingestion_image_dir, deck_hash[:16])
+
+    pdf_path = convert_to_pdf(deck_path, image_dir)
+    result.total = count_pdf_pages(pdf_path)
+    done = {} if force else store.completed_slides(deck_hash)
+    result.skipped = sorted(slide for slide in done if slide <= result.total)
+    pending = [slide for slide in range(1, result.total + 1) if slide not in done]
+    if not pending:
+        return result
+
+    # Rendered slides waiting for (or in) analysis; rendering blocks while it is full
+    backlog = threading.BoundedSemaphore(2 * max(1, max_concurrency))
+    result_lock = threading.Lock()
+    completed = 0
+
+    def process_slide(slide_number: int, image_path: str) -> str:
+        try:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+            content_hash = slide_content_hash(image_bytes)
+            try:
+                if not force and store.has_analysis(content_hash):
+                    store.save_analysis(deck_hash, deck_path, slide_number, content_hash, None)
+                    outcome = 'reused'
+                else:
+                    analysis = analyze_slide_image(image_bytes)
+                    store.save_analysis(deck_hash, deck_path, slide_number, content_hash, analysis,
+                                        model=ingestion_model_name)
+                    outcome = 'analyzed'
+            except Exception as e:
+                store.mark_failed(deck_hash, deck_path, slide_number, content_hash, str(e))
+                raise
+            if not ingestion_keep_images:
+                os.remove(image_path)
+            return outcome
+        finally:
+            backlog.release()
+
+    def record_outcome(slide_number: int, future) -> None:
+        # Runs in the analysis thread as soon as the slide is done
+        nonlocal completed
+        error = future.exception()
+        if error is not None:
+            print(f"Error ingesting slide {slide_number} of {deck_path}: {error}")
+        with result_lock:
+            if error is not None:
+                result.failed[slide_number] = str(error)
+            else:
+                (result.analyzed if future.result() == 'analyzed' else result.reused).append(slide_number)
+            completed += 1
+            done_count = completed
+        if progress_callback:
+            progress_callback('analyze', done_count, len(pending))
+
+    rendered = 0
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="slide-analysis") as pool:
+        for chunk in iter_rendered_slides(pdf_path, pending, image_dir, workers=render_workers,
+                                          dpi=ingestion_render_dpi):
+            rendered += len(chunk)
+            if progress_callback:
+                progress_callback('render', rendered, len(pending))
+            for slide_number, image_path in chunk:
+                backlog.acquire()
+                future = pool.submit(process_slide, slide_number, image_path)
+                future.add_done_callback(partial(record_outcome, slide_number))
+
+    result.analyzed.sort()
+    result.reused.sort()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest slide decks with PPT_SLIDE_ANALYSIS_PROMPT.")
+    parser.add_argument("decks", nargs="+", help=".pptx/.ppt/.odp or .pdf files")
+    parser.add_argument("--db", default=ingestion_sqlite_loc, help="Ingestion store (SQLite)")
+    parser.add_argument("--render-workers", type=int, default=ingestion_render_workers,
+                        help="Processes rendering slides")
+    parser.add_argument("--concurrency", type=int, default=ingestion_max_concurrency,
+                        help="Analysis calls in flight at once")
+    parser.add_argument("--force", action="store_true", help="Re-analyze slides that are already done")
+    args = parser.parse_args(argv)
+
+    # Render and analyze progress arrive interleaved (and from analysis threads); show both on one line
+    progress = {}
+    progress_lock = threading.Lock()
+
+    def print_progress(stage, done, total):
+        with progress_lock:
+            progress[stage] = f"{stage}: {done}/{total}"
+            finished = stage == 'analyze' and done == total
+            print("\r" + "  ".join(progress.values()), end="\n" if finished else "", file=sys.stderr)
+            if finished:
+                progress.clear()
+
+    store = IngestionStore(args.db)
+    all_ok = True
+    try:
+        for deck_path in args.decks:
+            result = ingest_deck(deck_path, store, render_workers=args.render_workers,
+                                 max_concurrency=args.concurrency, force=args.force,
+                                 progress_callback=print_progress)
+            print(f"{deck_path}: {result.total} slides, {len(result.analyzed)} analyzed, "
+                  f"{len(result.reused)} reused, {len(result.skipped)} already done, {len(result.failed)} failed")
+            all_ok = all_ok and result.ok
+    finally:
+        store.close()
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
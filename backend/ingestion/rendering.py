@@ -0,0 +1,159 @@
+"""
+Rendering of slide decks to one PNG image per slide.
+
+.pptx/.ppt/.odp decks are converted to PDF once with LibreOffice
+(`soffice --headless`); PDF pages are then rasterized with PyMuPDF in a
+process pool, each worker rendering a contiguous range of pages. Chunks
+are yielded as they finish, so the pipeline analyzes slides while later ones
+are still rendering. Images already on disk are kept, so an interrupted run
+resumes where it stopped.
+
+PyMuPDF is an optional dependency (`pip install .[ingestion]`) and is only
+imported inside the workers.
+"""
+
+import itertools
+import os
+import shutil
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PRESENTATION_EXTENSIONS = (".pptx", ".ppt", ".odp")
+
+
+def slide_image_path(image_dir: str, slide_number: int) -> str:
+    return os.path.join(image_dir, f"slide_{slide_number:05d}.png")
+
+
+def convert_to_pdf(deck_path: str, out_dir: str, timeout_s: float = 1800) -> str:
+    """
+    Convert a presentation to PDF with LibreOffice, reusing an earlier conversion.
+
+    Args:
+        deck_path: Path of the .pptx/.ppt/.odp (a .pdf is returned as is)
+        out_dir: Directory for the PDF
+        timeout_s: Conversion timeout
+
+    Returns:
+        str: Path of the PDF
+    """
+    if deck_path.lower().endswith(".pdf"):
+        return deck_path
+
+    pdf_path = os.path.join(out_dir, os.path.splitext(os.path.basename(deck_path))[0] + ".pdf")
+    if os.path.exists(pdf_path):
+        return pdf_path
+
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    if soffice is None:
+        raise RuntimeError("LibreOffice (soffice) is required to render presentations; install it or pass a PDF")
+    os.makedirs(out_dir, exist_ok=True)
+    subprocess.run([soffice, "--headless", "--convert-to", "pdf", "--outdir", out_dir, deck_path],
+                   check=True, capture_output=True, timeout=timeout_s)
+    if not os.path.exists(pdf_path):
+        raise RuntimeError(f"LibreOffice did not produce {pdf_path}")
+    return pdf_path
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as document:
+        return document.page_count
+
+
+def render_pdf_pages(pdf_path: str, slide_numbers: Sequence[int], image_dir: str,
+                     dpi: int = 110) -> List[Tuple[int, str]]:
+    """
+    Render the given 1-based pages of a PDF to PNG files (runs in a worker process).
+
+    Returns:
+        List of (slide_number, image path)
+    """
+    import fitz  # PyMuPDF
+
+    rendered = []
+    with fitz.open(pdf_path) as document:
+        for slide_number in slide_numbers:
+            image_path = slide_image_path(image_dir, slide_number)
+            if not os.path.exists(image_path):
+                pixmap = document.load_page(slide_number - 1).get_pixmap(dpi=dpi)
+                # Write then rename, so a crash never leaves a truncated image behind
+                tmp_path = image_path + ".tmp"
+                pixmap.save(tmp_path, output="png")
+                os.replace(tmp_path, image_path)
+            rendered.append((slide_number, image_path))
+    return rendered
+
+
+def iter_rendered_slides(pdf_path: str, slide_numbers: Sequence[int], image_dir: str, workers: int = 4,
+                         dpi: int = 110, chunk_size: int = 25,
+                         max_pending_chunks: Optional[int] = None) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Render slides to PNG in a process pool, yielding each chunk as soon as it is rendered.
+
+    Only max_pending_chunks chunks are rendered ahead of the consumer, so a
+    consumer that stops pulling (e.g. because analysis is behind) also stops
+    rendering, and images do not pile up on disk.
+
+    Args:
+        pdf_path: PDF of the deck
+        slide_numbers: 1-based slide numbers to render
+        image_dir: Output directory
+        workers: Worker processes (1 renders in this process, one chunk per pull)
+        dpi: Render resolution
+        chunk_size: Pages per worker task
+        max_pending_chunks: Chunks submitted but not yet consumed (default: 2 per worker)
+
+    Yields:
+        List of (slide_number, image path) of one chunk, in completion order
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    slide_numbers = sorted(slide_numbers)
+    chunks = [slide_numbers[i:i + chunk_size] for i in range(0, len(slide_numbers), chunk_size)]
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield render_pdf_pages(pdf_path, chunk, image_dir, dpi)
+        return
+
+    remaining = iter(chunks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(render_pdf_pages, pdf_path, chunk, image_dir, dpi)
+                   for chunk in itertools.islice(remaining, max_pending_chunks or 2 * workers)}
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rendered = future.result()
+                for chunk in itertools.islice(remaining, 1):
+                    pending.add(pool.submit(render_pdf_pages, pdf_path, chunk, image_dir, dpi))
+                yield rendered
+
+
+def render_slides(pdf_path: str, slide_numbers: Sequence[int], image_dir: str, workers: int = 4,
+                  dpi: int = 110, chunk_size: int = 25,
+                  progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[int, str]:
+    """
+    Render slides to PNG in a process pool and wait for all of them.
+
+    Args:
+        pdf_path: PDF of the deck
+        slide_numbers: 1-based slide numbers to render
+        image_dir: Output directory
+        workers: Worker processes (1 renders in this process)
+        dpi: Render resolution
+        chunk_size: Pages per worker task
+        progress_callback: Optional callable(done, total) invoked after each chunk
+
+    Returns:
+        Dict mapping slide number to image path
+    """
+    total = len(slide_numbers)
+    images = {}
+    for rendered in iter_rendered_slides(pdf_path, slide_numbers, image_dir, workers=workers, dpi=dpi,
+                                         chunk_size=chunk_size):
+        images.update(rendered)
+        if progress_callback:
+            progress_callback(len(images), total)
+    return images
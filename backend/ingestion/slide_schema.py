@@ -0,0 +1,146 @@
+"""
+Schema of the per-slide analysis produced with PPT_SLIDE_ANALYSIS_PROMPT.
+
+SLIDE_ANALYSIS_SCHEMA mirrors the prompt's sample output as a (subset of)
+JSON Schema. It is checked by a small built-in validator, so no schema
+library is needed.
+"""
+
+import json
+import re
+from typing import Any, Dict, List
+
+_STRING = {'type': 'string'}
+_STRING_LIST = {'type': 'array', 'items': _STRING}
+
+SLIDE_ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'required': ['slide_headers', 'slide_content_full', 'slide_content_overview',
+                 'visual_components_inventory', 'slide_structure'],
+    'properties': {
+        'slide_headers': {
+            'type': 'object',
+            'required': ['slide_title'],
+            'properties': {
+                'slide_title': _STRING,
+                'slide_subtitle': _STRING,
+                'section_subheadings': _STRING_LIST,
+                'logos': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'required': ['logo_name'],
+                        'properties': {'logo_name': _STRING, 'position': _STRING}
+                    }
+                }
+            }
+        },
+        'slide_content_full': _STRING,
+        'slide_content_overview': {
+            'type': 'object',
+            'required': ['summary'],
+            'properties': {'summary': _STRING}
+        },
+        'visual_components_inventory': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['visual_type', 'description'],
+                'properties': {'visual_type': _STRING, 'description': _STRING}
+            }
+        },
+        'slide_structure': {
+            'type': 'object',
+            'required': ['components'],
+            'properties': {
+                'components': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'required': ['component_title', 'component_overview'],
+                        'properties': {
+                            'component_title': _STRING,
+                            'size_position': _STRING,
+                            'component_structure': _STRING,
+                            'component_overview': _STRING
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool
+}
+
+# ```json ... ``` fences models often wrap JSON answers in
+_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+class SlideAnalysisError(ValueError):
+    """The model output is not valid JSON or does not match SLIDE_ANALYSIS_SCHEMA."""
+
+
+def validate_against_schema(value: Any, schema: Dict, path: str = "$") -> List[str]:
+    """
+    Check a value against a schema using type, required, properties and items.
+
+    Args:
+        value: Parsed JSON value
+        schema: Schema (subset of JSON Schema)
+        path: Location of value, used in the messages
+
+    Returns:
+        List of error messages, empty if the value is valid
+    """
+    expected_type = schema.get('type')
+    if expected_type and not isinstance(value, _JSON_TYPES[expected_type]):
+        return [f"{path}: expected {expected_type}, got {type(value).__name__}"]
+
+    errors = []
+    if expected_type == 'object':
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}: missing required key '{key}'")
+        for key, sub_schema in schema.get('properties', {}).items():
+            # Optional fields may be null when the slide has nothing for them
+            if key in value and value[key] is not None:
+                errors.extend(validate_against_schema(value[key], sub_schema, f"{path}.{key}"))
+    elif expected_type == 'array' and 'items' in schema:
+        for i, element in enumerate(value):
+            errors.extend(validate_against_schema(element, schema['items'], f"{path}[{i}]"))
+    return errors
+
+
+def parse_slide_analysis(text: str) -> Dict:
+    """
+    Parse and validate a model answer to PPT_SLIDE_ANALYSIS_PROMPT.
+
+    Args:
+        text: Raw model output, optionally wrapped in a ```json fence
+
+    Returns:
+        dict: The validated analysis
+
+    Raises:
+        SlideAnalysisError: If the output is not JSON or violates the schema
+    """
+    match = _FENCE_PATTERN.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        analysis = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise SlideAnalysisError(f"Invalid JSON: {e}") from e
+
+    errors = validate_against_schema(analysis, SLIDE_ANALYSIS_SCHEMA)
+    if errors:
+        raise SlideAnalysisError("; ".join(errors[:10]))
+    return analysis
@@ -0,0 +1,152 @@
+"""
+Local SQLite store of slide analyses and the ingestion manifest.
+
+- slide_analysis: one validated analysis per content hash (slide image +
+  model + prompt), so an identical slide is analyzed once across decks.
+- deck_slides: the manifest, one row per (deck hash, slide number) with its
+  status ('done' or 'failed'), content hash and last error.
+
+Each result is committed as soon as it arrives, so a crash loses at most
+the calls that were in flight.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from common_assets.config import checkpoint_sqlite_busy_timeout_ms
+
+
+class IngestionStore:
+    """
+    Thread-safe store of slide analyses and per-deck slide status.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False,
+                                     timeout=checkpoint_sqlite_busy_timeout_ms / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS slide_analysis (
+                   content_hash TEXT PRIMARY KEY,
+                   analysis TEXT NOT NULL,
+                   model TEXT,
+                   created_at TEXT NOT NULL)"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS deck_slides (
+                   deck_hash TEXT NOT NULL,
+                   slide_number INTEGER NOT NULL,
+                   deck_path TEXT,
+                   content_hash TEXT,
+                   status TEXT NOT NULL,
+                   error TEXT,
+                   updated_at TEXT NOT NULL,
+                   PRIMARY KEY (deck_hash, slide_number))"""
+        )
+        self._conn.commit()
+
+    def completed_slides(self, deck_hash: str) -> Dict[int, str]:
+        """Slide numbers of a deck already analyzed, mapped to their content hash."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT slide_number, content_hash FROM deck_slides WHERE deck_hash = ? AND status = 'done'",
+                (deck_hash,)
+            ).fetchall()
+        return dict(rows)
+
+    def has_analysis(self, content_hash: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM slide_analysis WHERE content_hash = ?", (content_hash,)
+            ).fetchone() is not None
+
+    def save_analysis(self, deck_hash: str, deck_path: str, slide_number: int, content_hash: str,
+                      analysis: Optional[Dict], model: Optional[str] = None) -> None:
+        """
+        Record a slide as done, storing its analysis unless the content hash already has one.
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            try:
+                if analysis is not None:
+                    self._conn.execute(
+                        """INSERT OR IGNORE INTO slide_analysis (content_hash, analysis, model, created_at)
+                           VALUES (?, ?, ?, ?)""",
+                        (content_hash, json.dumps(analysis), model, now)
+                    )
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO deck_slides
+                       (deck_hash, slide_number, deck_path, content_hash, status, error, updated_at)
+                       VALUES (?, ?, ?, ?, 'done', NULL, ?)""",
+                    (deck_hash, slide_number, deck_path, content_hash, now)
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def mark_failed(self, deck_hash: str, deck_path: str, slide_number: int, content_hash: Optional[str],
+                    error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO deck_slides
+                   (deck_hash, slide_number, deck_path, content_hash, status, error, updated_at)
+                   VALUES (?, ?, ?, ?, 'failed', ?, ?)""",
+                (deck_hash, slide_number, deck_path, content_hash, error, datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def get_deck_analyses(self, deck_hash: str) -> List[Tuple[int, Dict]]:
+        """(slide_number, analysis) of every analyzed slide of a deck, in slide order."""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT deck_slides.slide_number, slide_analysis.analysis
+                   FROM deck_slides JOIN slide_analysis USING (content_hash)
+                   WHERE deck_slides.deck_hash = ? AND deck_slides.status = 'done'
+                   ORDER BY deck_slides.slide_number""",
+                (deck_hash,)
+            ).fetchall()
+        return [(slide_number, json.loads(analysis)) for slide_number, analysis in rows]
+
+    def iter_analyses(self, batch_size: int = 500) -> Iterator[Tuple[str, str, int, Dict]]:
+        """
+        Every analyzed slide as (deck_path, deck_hash, slide_number, analysis), read in batches.
+        """
+        last_key = ("", -1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """SELECT deck_slides.deck_path, deck_slides.deck_hash, deck_slides.slide_number,
+                              slide_analysis.analysis
+                       FROM deck_slides JOIN slide_analysis USING (content_hash)
+                       WHERE deck_slides.status = 'done'
+                         AND (deck_slides.deck_hash, deck_slides.slide_number) > (?, ?)
+                       ORDER BY deck_slides.deck_hash, deck_slides.slide_number LIMIT ?""",
+                    (*last_key, batch_size)
+                ).fetchall()
+            if not rows:
+                break
+            for deck_path, deck_hash, slide_number, analysis in rows:
+                yield deck_path, deck_hash, slide_number, json.loads(analysis)
+            last_key = (rows[-1][1], rows[-1][2])
+
+    def deck_status(self, deck_hash: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM deck_slides WHERE deck_hash = ? GROUP BY status", (deck_hash,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
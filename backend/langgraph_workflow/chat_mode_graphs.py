@@ -1,5 +1,19 @@
-from backend.langgraph_workflow.nodes import human_node, chatbot_node, hello_world_node
+from backend.langgraph_workflow.nodes import (
+    human_node,
+    context_node,
+    retrieval_node,
+    chatbot_node,
+    achatbot_node,
+    outline_node,
+    aoutline_node,
+    dispatch_sections,
+    draft_section_node,
+    adraft_section_node,
+    merge_sections_node
+)
 from backend.langgraph_workflow.state import GraphState
+from backend.utils import traced
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
 
 
@@ -7,26 +21,40 @@ def get_graph_qna():
     graph_builder = StateGraph(GraphState)
 
     # Add the chatbot node to the graph
-    graph_builder.add_node("human", human_node)
-    graph_builder.add_node("chatbot", chatbot_node)
-
-    # Define the edges: START -> chatbot -> END
+    graph_builder.add_node("human", traced("node.human")(human_node))
+    # Trims history to the last turns and folds older ones into a rolling summary
+    graph_builder.add_node("context", traced("node.context")(context_node))
+    # Top-k slides from the vector index for the question, added to the system prompt
+    graph_builder.add_node("retrieve", traced("node.retrieve")(retrieval_node))
+    # Sync and async implementations: invoke/stream use the first, ainvoke/astream the second
+    graph_builder.add_node("chatbot", RunnableLambda(traced("node.chatbot")(chatbot_node),
+                                                     afunc=traced("node.chatbot")(achatbot_node)))
+
+    # Define the edges: START -> human -> (context, retrieve in parallel) -> chatbot -> END
     graph_builder.add_edge(START, "human")
-    graph_builder.add_edge("human", "chatbot")
+    graph_builder.add_edge("human", "context")
+    graph_builder.add_edge("human", "retrieve")
+    graph_builder.add_edge(["context", "retrieve"], "chatbot")
     graph_builder.add_edge("chatbot", END)
     return graph_builder
 
 def get_graph_content_gen():
     graph_builder = StateGraph(GraphState)
 
-    # Add the chatbot node to the graph
-    graph_builder.add_node("human", human_node)
-    graph_builder.add_node("hello_world", hello_world_node)
-
-    # Define the edges: START -> chatbot -> END
+    graph_builder.add_node("human", traced("node.human")(human_node))
+    # Plans the document: title and sections with a brief each
+    graph_builder.add_node("outline", RunnableLambda(traced("node.outline")(outline_node),
+                                                     afunc=traced("node.outline")(aoutline_node)))
+    # One task per section, run in parallel (bounded by the chat mode's max_concurrency)
+    graph_builder.add_node("draft_section", RunnableLambda(traced("node.draft_section")(draft_section_node),
+                                                           afunc=traced("node.draft_section")(adraft_section_node)))
+    # Assembles the drafts in outline order into the answer message
+    graph_builder.add_node("merge", traced("node.merge")(merge_sections_node))
+
+    # Define the edges: START -> human -> outline -> draft_section x N -> merge -> END
     graph_builder.add_edge(START, "human")
-    graph_builder.add_edge("human", "hello_world")
-    graph_builder.add_edge("hello_world", END)
+    graph_builder.add_edge("human", "outline")
+    graph_builder.add_conditional_edges("outline", dispatch_sections, ["draft_section"])
+    graph_builder.add_edge("draft_section", "merge")
+    graph_builder.add_edge("merge", END)
     return graph_builder
-
-
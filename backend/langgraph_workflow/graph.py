@@ -3,22 +3,104 @@ LangGraph workflow definition.
 
 This module defines the graph structure, nodes, edges, and compilation
 with persistence/checkpointing enabled.
+
+The compiled graph and checkpointer live in the process-wide registry;
+ChatBotGraph is a lightweight per-user handle on top of them.
 """
 
-import sqlite3
+import asyncio
+import time
+from datetime import datetime
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.checkpoint.memory import MemorySaver
-from common_assets.config import d_chat_modes_graph, checkpoint_sqlitite_loc, default_user_id
+from langchain_core.messages import AIMessageChunk
+from common_assets.config import d_chat_modes_graph, checkpoint_sqlitite_loc, default_user_id, thread_preview_max_chars, sidebar_page_size, metadata_write_behind
 
-from backend.utils import save_thread_metadata, get_user_threads, delete_user_threads, get_thread_details
+from backend.utils import span, record_latency, upsert_thread_metadata, get_thread_details, thread_item_to_summary, list_user_threads, get_user_thread_summaries, bulk_delete_user_threads, get_metadata_writer, get_latest_checkpoint_id
 from .state import GraphState
-from .nodes import chatbot_node, human_node
+from .nodes import chatbot_node, human_node, format_document_title, format_section, DOCUMENT_PART_SEPARATOR
+from .registry import GraphResources, get_graph_resources, build_chat_graph
+
+
+class TurnStream:
+    """
+    Turns the graph events of one streamed turn into the text yielded to the caller.
+
+    LLM tokens of streamed_nodes are forwarded as they arrive. Drafts of
+    section_nodes (content_gen) arrive whole, in completion order, from
+    "updates" events; they are emitted in outline order as soon as every
+    earlier section is done, separated like in merge_sections_node, so the
+    streamed text equals the merged answer.
+    """
+
+    def __init__(self, streamed_nodes, section_nodes, turn_attrs: dict):
+        self.streamed_nodes = streamed_nodes
+        self.section_nodes = section_nodes
+        self.turn_attrs = turn_attrs
+        self.turn_start = time.perf_counter()
+        self.streamed_any = False
+        self.final_state = None
+        self._drafts = {}
+        self._next_section = 0
+        self._document_started = False
+
+    def handle(self, namespace, stream_mode, data) -> list:
+        """Text chunks to yield for one (namespace, stream_mode, data) event."""
+        if stream_mode == "values":
+            if not namespace:
+                self.final_state = data
+            return []
+        if stream_mode == "updates":
+            parts = []
+            for node, update in data.items():
+                if not isinstance(update, dict):
+                    continue
+                if node == "outline" and update.get('document_title'):
+                    parts.append(format_document_title(update['document_title']))
+                if node in self.section_nodes:
+                    for draft in update.get('section_drafts') or []:
+                        self._drafts[draft['index']] = draft
+            while self._next_section in self._drafts:
+                parts.append(format_section(self._drafts.pop(self._next_section)))
+                self._next_section += 1
+            return self._emit(self._document_chunks(parts))
+        message_chunk, metadata = data
+        if (isinstance(message_chunk, AIMessageChunk) and message_chunk.content
+                and metadata.get('langgraph_node') in self.streamed_nodes):
+            return self._emit([message_chunk.content])
+        return []
+
+    def _document_chunks(self, parts: list) -> list:
+        # Separator before every non-empty part but the first, as join_document_parts does
+        chunks = []
+        for part in parts:
+            if part:
+                chunks.append(DOCUMENT_PART_SEPARATOR + part if self._document_started else part)
+                self._document_started = True
+        return chunks
+
+    def _emit(self, chunks: list) -> list:
+        chunks = [chunk for chunk in chunks if chunk]
+        if chunks and not self.streamed_any:
+            self.turn_attrs['first_token_ms'] = (time.perf_counter() - self.turn_start) * 1000
+            record_latency("turn.first_token", self.turn_attrs['first_token_ms'])
+            self.streamed_any = True
+        return chunks
 
 
 class ChatBotGraph:
-    def __init__(self, user_id: str = str(default_user_id)):
+    # Nodes whose LLM tokens are forwarded to the caller by stream_response
+    streamed_nodes = ("chatbot",)
+    # Nodes whose drafted sections are forwarded whole as they complete
+    section_nodes = ("draft_section",)
+    stream_modes = ["messages", "updates", "values"]
+
+    def __init__(self, user_id: str = str(default_user_id), resources: GraphResources = None):
+        # Only the user_id is per handle; graph and checkpointer are shared process-wide
         self.user_id = user_id
+        self.resources = resources if resources is not None else get_graph_resources()
+        # Summary entries of threads written through this handle (see get_thread_summary)
+        self._thread_summaries = {}
         self.checkpointer = self.get_checkpointer()
         self.graph = self.get_graph()
         
@@ -29,67 +111,126 @@ class ChatBotGraph:
 
 
     def get_checkpointer(self):
-        # Use direct sqlite3 connection instead of from_conn_string()
-        # from_conn_string() returns a context manager, not a direct instance
-        conn = sqlite3.connect(checkpoint_sqlitite_loc, check_same_thread=False)
-        checkpointer = SqliteSaver(conn)
-        return checkpointer
+        # Shared PooledSqliteSaver from the registry (built once per process)
+        return self.resources.checkpointer
 
 
-    def get_all_thread_ids(self):
-        # Get thread IDs from DynamoDB for the current user
-        thread_ids = get_user_threads(self.user_id)
+    def get_all_thread_ids(self, page_size: int = sidebar_page_size, cursor=None):
+        # Get one page of thread IDs from DynamoDB for the current user, most recent first
+        l_items, _ = list_user_threads(self.user_id, page_size=page_size, cursor=cursor)
+        thread_ids = [item['thread_id'] for item in l_items]
         return thread_ids
 
     
-    def delete_all_threads(self):
-        l_all_threads = self.get_all_thread_ids()
-        try:
-            # Delete from SQLite checkpointer
-            for thread in l_all_threads:
-                self.checkpointer.delete_thread(thread)
-
-            # Delete from DynamoDB
-            delete_user_threads(self.user_id)
-
-            return True
-        except:
-            return False
+    def delete_all_threads(self, progress_callback=None):
+        # Checkpoints go in one SQLite transaction, metadata in batched DynamoDB writes.
+        # The returned BulkDeleteResult is falsy when some threads could not be deleted.
+        # progress_callback(stage, done, total) is called as each stage advances.
+        result = bulk_delete_user_threads(self.user_id, self.checkpointer, progress_callback=progress_callback)
+        for thread_id in result.metadata_deleted:
+            self._thread_summaries.pop(thread_id, None)
+        return result
         
 
-    def get_sidebar_json(self):
-        d_threads = {}
-        l_threads = self.get_all_thread_ids()
-        for thread in l_threads:
-            thread_details = get_thread_details(user_id=self.user_id, thread_id=thread)
-            thread_first_message = self.get_thread_state_messages(thread)['messages'][0].content
-            d_threads[thread] = {
-                'first_message' : thread_first_message,
-                'chat_mode' : thread_details['chat_mode'] if 'chat_mode' in thread_details else thread_details['mode'],
-                'created_date': thread_details['created_date'],
-                'update_date' : thread_details['update_date']
-            }
-
+    def get_sidebar_page(self, cursor=None, page_size: int = sidebar_page_size):
+        # Built from the thread summaries stored with the metadata: one query, no checkpoint reads
+        # Returns the page (most recent first) and the cursor to load the next one (None when exhausted)
+        d_threads, next_cursor = get_user_thread_summaries(self.user_id, page_size=page_size, cursor=cursor)
+        return d_threads, next_cursor
 
 
+    def get_sidebar_json(self):
+        # First page of the sidebar only; use get_sidebar_page to load more on demand
+        d_threads, _ = self.get_sidebar_page()
         return d_threads
 
 
     # def get_all_threads(self):
 
-    def get_response(self, thread_id, human_message, chat_mode, new_thread ):
+    def turn_config(self, thread_id, chat_mode):
+        # Chat modes with parallel nodes (content_gen sections) bound them with max_concurrency
         config = {"configurable": {"thread_id": thread_id}}
+        max_concurrency = d_chat_modes_graph.get(chat_mode, {}).get('max_concurrency')
+        if max_concurrency:
+            config['max_concurrency'] = max_concurrency
+        return config
+
+    def get_response(self, thread_id, human_message, chat_mode, new_thread ):
+        config = self.turn_config(thread_id, chat_mode)
+        invoke_object = {"chat_mode": chat_mode, "last_human_message":human_message}
+        # One span per turn; graph, LLM, checkpoint and DynamoDB spans inside it share its trace_id
+        with span("turn", chat_mode=chat_mode, thread_id=thread_id, new_thread=new_thread):
+            response_state = self.graph.invoke(invoke_object,config )
+            response_answer = response_state['messages'][-1].content
+
+            with span("turn.save_metadata"):
+                self.save_turn_metadata(thread_id, chat_mode, new_thread, response_state['messages'])
+
+        return response_answer
+
+    def stream_response(self, thread_id, human_message, chat_mode, new_thread ):
+        # Same as get_response, but yields the answer token by token as the LLM produces it
+        # (content_gen: section by section as drafts complete, see TurnStream).
+        # The graph still checkpoints the final AIMessage; metadata is saved once the stream is exhausted.
+        config = self.turn_config(thread_id, chat_mode)
         invoke_object = {"chat_mode": chat_mode, "last_human_message":human_message}
-        response_state = self.graph.invoke(invoke_object,config )
-        response_answer = response_state['messages'][-1].content
 
-        print('CHAT_MODE: ', chat_mode, '\t query: ', human_message)
+        with span("turn", chat_mode=chat_mode, thread_id=thread_id, new_thread=new_thread, streamed=True) as turn_attrs:
+            turn_stream = TurnStream(self.streamed_nodes, self.section_nodes, turn_attrs)
+            for namespace, stream_mode, data in self.graph.stream(invoke_object, config,
+                                                                  stream_mode=self.stream_modes, subgraphs=True):
+                yield from turn_stream.handle(namespace, stream_mode, data)
 
+            messages = turn_stream.final_state['messages']
+            # Answers that were not streamed (no LLM tokens, no sections) are sent whole
+            if not turn_stream.streamed_any:
+                yield messages[-1].content
+
+            with span("turn.save_metadata"):
+                self.save_turn_metadata(thread_id, chat_mode, new_thread, messages)
+
+    def save_turn_metadata(self, thread_id, chat_mode, new_thread, messages):
         # Save or update thread metadata in DynamoDB
         # If thread exists, updates update_date; if new, creates with created_date and update_date
-        save_thread_metadata(self.user_id, thread_id, chat_mode=chat_mode,  new_thread = new_thread)
+        # The thread summary used by the sidebar is refreshed in the same write
+        metadata_kwargs = dict(chat_mode=chat_mode,  new_thread = new_thread,
+                               first_message=messages[0].content,
+                               message_count=len(messages),
+                               last_message_preview=messages[-1].content[:thread_preview_max_chars])
+        # With write-behind, the write happens in the background so the answer returns immediately
+        # and the summary entry is built locally instead of from the stored item.
+        item = None
+        if metadata_write_behind:
+            get_metadata_writer().submit(self.user_id, thread_id, **metadata_kwargs)
+        else:
+            item = upsert_thread_metadata(self.user_id, thread_id, **metadata_kwargs)
 
-        return response_answer
+        if item:
+            summary = thread_item_to_summary(item)
+        else:
+            current_time = datetime.now().isoformat()
+            previous_summary = self._thread_summaries.get(thread_id, {})
+            summary = {
+                'first_message': previous_summary.get('first_message', metadata_kwargs['first_message']),
+                'chat_mode': previous_summary.get('chat_mode', chat_mode),
+                'created_date': previous_summary.get('created_date', current_time),
+                'update_date': current_time,
+                'message_count': metadata_kwargs['message_count'],
+                'last_message_preview': metadata_kwargs['last_message_preview']
+            }
+        self._thread_summaries[thread_id] = summary
+
+    def get_thread_summary(self, thread_id):
+        # Sidebar entry of a single thread, e.g. the one just written by get_response/stream_response,
+        # so the front-end can upsert it without rebuilding the whole sidebar
+        if thread_id in self._thread_summaries:
+            return self._thread_summaries[thread_id]
+        item = get_thread_details(user_id=self.user_id, thread_id=thread_id)
+        if not item:
+            return None
+        summary = thread_item_to_summary(item)
+        self._thread_summaries[thread_id] = summary
+        return summary
 
     def get_thread_state_messages(self, thread_id:str):
         config = {"configurable": {"thread_id": thread_id}}
@@ -97,25 +238,101 @@ class ChatBotGraph:
         state = self.graph.get_state(config).values
         messages = state['messages']
         return {'state':state, 'messages':messages}
-    
 
-    def get_graph(self):
-        ### Currently there's only 1 state for all subgraphs. Can change it later if required.
-        graph_builder = StateGraph(GraphState)
-        
-        for chat_mode in d_chat_modes_graph:
-            chat_mode_subgraphs = d_chat_modes_graph[chat_mode]['graph_fn']().compile()
-            graph_builder.add_node("subgraph_"+chat_mode, chat_mode_subgraphs )
+    def get_thread_messages_delta(self, thread_id:str, since_checkpoint_id=None, known_count:int = 0):
+        """
+        Messages added since the caller last saw the thread at since_checkpoint_id (holding known_count messages).
 
-        routing_fn = lambda x:  x['chat_mode'] 
+        Cost: when the latest checkpoint is unchanged, only its ID is read and
+        no checkpoint is loaded. When it has changed, the whole latest
+        checkpoint is loaded and deserialized and the delta is sliced off it,
+        so a refresh after a new turn costs about as much as a full fetch
+        (O(thread length), not O(delta)). The checkpoint stores the full
+        message list in one blob; the writes table cannot be used instead,
+        because retention prunes it.
 
-        graph_builder.add_conditional_edges(START, routing_fn, {chat_mode: 'subgraph_'+chat_mode for chat_mode in d_chat_modes_graph.keys()})
+        Returns:
+            dict with 'checkpoint_id', 'messages' and 'reset'; 'reset' tells the caller
+            to drop what it has and use 'messages' as the full history
+        """
+        latest_checkpoint_id = get_latest_checkpoint_id(self.checkpointer, thread_id)
+        if latest_checkpoint_id is None:
+            return {'checkpoint_id': None, 'messages': [], 'reset': known_count > 0}
+        if latest_checkpoint_id == since_checkpoint_id:
+            return {'checkpoint_id': latest_checkpoint_id, 'messages': [], 'reset': False}
 
-        if not hasattr(self,"checkpointer"):
-            self.checkpointer =   self.get_checkpointer()
- 
-        graph = graph_builder.compile(checkpointer=self.checkpointer)
-        return graph
+        config = {"configurable": {"thread_id": thread_id}}
+        snapshot = self.graph.get_state(config)
+        messages = snapshot.values.get('messages', [])
+        checkpoint_id = snapshot.config['configurable'].get('checkpoint_id', latest_checkpoint_id)
+        if len(messages) < known_count:
+            return {'checkpoint_id': checkpoint_id, 'messages': messages, 'reset': True}
+        return {'checkpoint_id': checkpoint_id, 'messages': messages[known_count:], 'reset': False}
+
+    ### Async variants: same behaviour as the sync methods, without blocking the event loop.
+    ### DynamoDB (boto3) calls have no async client here, so they run in worker threads.
+
+    async def aget_response(self, thread_id, human_message, chat_mode, new_thread ):
+        graph = await self.aget_graph()
+        config = self.turn_config(thread_id, chat_mode)
+        invoke_object = {"chat_mode": chat_mode, "last_human_message":human_message}
+        with span("turn", chat_mode=chat_mode, thread_id=thread_id, new_thread=new_thread):
+            response_state = await graph.ainvoke(invoke_object, config)
+            response_answer = response_state['messages'][-1].content
+
+            with span("turn.save_metadata"):
+                await asyncio.to_thread(self.save_turn_metadata, thread_id, chat_mode, new_thread, response_state['messages'])
+
+        return response_answer
+
+    async def astream_response(self, thread_id, human_message, chat_mode, new_thread ):
+        graph = await self.aget_graph()
+        config = self.turn_config(thread_id, chat_mode)
+        invoke_object = {"chat_mode": chat_mode, "last_human_message":human_message}
+
+        with span("turn", chat_mode=chat_mode, thread_id=thread_id, new_thread=new_thread, streamed=True) as turn_attrs:
+            turn_stream = TurnStream(self.streamed_nodes, self.section_nodes, turn_attrs)
+            async for namespace, stream_mode, data in graph.astream(invoke_object, config,
+                                                                    stream_mode=self.stream_modes, subgraphs=True):
+                for chunk in turn_stream.handle(namespace, stream_mode, data):
+                    yield chunk
+
+            messages = turn_stream.final_state['messages']
+            if not turn_stream.streamed_any:
+                yield messages[-1].content
+
+            with span("turn.save_metadata"):
+                await asyncio.to_thread(self.save_turn_metadata, thread_id, chat_mode, new_thread, messages)
+
+    async def aget_thread_state_messages(self, thread_id:str):
+        graph = await self.aget_graph()
+        config = {"configurable": {"thread_id": thread_id}}
+
+        state = (await graph.aget_state(config)).values
+        messages = state['messages']
+        return {'state':state, 'messages':messages}
+
+    async def aget_sidebar_page(self, cursor=None, page_size: int = sidebar_page_size):
+        return await asyncio.to_thread(self.get_sidebar_page, cursor, page_size)
+
+    async def aget_sidebar_json(self):
+        d_threads, _ = await self.aget_sidebar_page()
+        return d_threads
+
+    async def aclose(self):
+        # Close the shared async checkpointer of the running loop (every handle on this loop reopens it on next use)
+        await self.resources.aclose()
+    
+
+    def get_graph(self, checkpointer=None):
+        # Shared compiled graph from the registry; a dedicated one is compiled only for another checkpointer
+        if checkpointer is None:
+            return self.resources.graph
+        return build_chat_graph(checkpointer)
+
+    async def aget_graph(self):
+        # Shared async graph of the running event loop from the registry
+        return await self.resources.aget_graph()
 
 
 
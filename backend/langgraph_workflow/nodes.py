@@ -3,11 +3,36 @@ Node implementations for the LangGraph workflow.
 
 This module contains all node functions that process the graph state.
 """
-from typing import Any, Dict
+import json
+import re
+from typing import Any, Dict, List
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Send
 from .state import GraphState
-from backend.config import CHATBOT_SYSTEM_PROMPT
-from backend.chains import chain_chat_response
+from backend.config import (
+    CHATBOT_SYSTEM_PROMPT,
+    HISTORY_SUMMARY_PROMPT,
+    RETRIEVAL_CONTEXT_PROMPT,
+    CONTENT_OUTLINE_PROMPT,
+    SECTION_DRAFT_PROMPT
+)
+from backend.chains import chain_chat_response, achain_chat_response, count_message_tokens
+from backend.retrieval import IndexMismatchError, retrieve_slides
+from backend.utils.tracing import span
+from common_assets.config import (
+    d_chat_modes_graph,
+    qna_history_max_turns,
+    qna_history_max_tokens,
+    qna_history_summary_slack_turns,
+    qna_history_summary_slack_tokens,
+    qna_history_summary_temperature,
+    retrieval_enabled,
+    retrieval_top_k,
+    retrieval_max_context_chars,
+    content_gen_max_sections,
+    content_gen_history_messages
+)
 
 def router_node(state:GraphState)-> Dict[str, Any]:
     return state
@@ -16,17 +41,253 @@ def router_node(state:GraphState)-> Dict[str, Any]:
 def human_node(state: GraphState)-> Dict[str, Any]:
     return {'messages':HumanMessage(state['last_human_message'])} 
 
+def select_history_window(messages: list, token_counts: Dict[str, int], max_turns: int, max_tokens: int,
+                          start: int = 0) -> int:
+    """
+    Find the index from which messages are sent to the model verbatim.
+
+    Keeps at most the last max_turns turns (a turn starts at a human message),
+    dropping the oldest kept turns while they exceed max_tokens. The latest turn
+    is always kept. Uses cached token counts only, nothing is re-tokenized.
+    """
+    turn_starts = [idx for idx in range(start, len(messages)) if messages[idx].type == 'human']
+    if not turn_starts:
+        return start
+    turn_starts = turn_starts[-max_turns:]
+
+    suffix_tokens = 0
+    l_suffix_tokens: List[int] = [0] * (len(messages) - turn_starts[0] + 1)
+    for offset in range(len(messages) - 1, turn_starts[0] - 1, -1):
+        suffix_tokens += token_counts.get(messages[offset].id, 0)
+        l_suffix_tokens[offset - turn_starts[0]] = suffix_tokens
+
+    for turn_start in turn_starts[:-1]:
+        if l_suffix_tokens[turn_start - turn_starts[0]] <= max_tokens:
+            return turn_start
+    return turn_starts[-1]
+
+
+def summarize_history(summary: str, messages: list) -> str:
+    # Fold messages into the rolling summary with one LLM call
+    transcript = "\n".join(
+        f"{'User' if message.type == 'human' else 'Assistant'}: {message.content}" for message in messages
+    )
+    return chain_chat_response([HumanMessage(transcript)],
+                               system_prompt=HISTORY_SUMMARY_PROMPT.format(summary=summary or "(none)"),
+                               temperature=qna_history_summary_temperature)
+
+
+def context_node(state: GraphState) -> Dict[str, Any]:
+    messages = state["messages"]
+    token_counts = state.get("message_token_counts") or {}
+
+    # Only messages added since the last turn are tokenized
+    new_token_counts = {message.id: count_message_tokens(message)
+                        for message in messages if message.id not in token_counts}
+    all_token_counts = {**token_counts, **new_token_counts}
+
+    # Summarize only once the unsummarized history is more than K + slack turns or over the token budget,
+    # then fold down to K turns within the budget minus the slack tokens, so the summary call (which
+    # delays the answer) runs every few turns instead of on every turn of a long thread
+    summarized_upto = state.get("summarized_upto", 0)
+    overflow_start = select_history_window(messages, all_token_counts,
+                                           qna_history_max_turns + qna_history_summary_slack_turns,
+                                           qna_history_max_tokens, start=summarized_upto)
+
+    update = {"message_token_counts": new_token_counts}
+    if overflow_start > summarized_upto:
+        window_start = select_history_window(messages, all_token_counts, qna_history_max_turns,
+                                             max(0, qna_history_max_tokens - qna_history_summary_slack_tokens),
+                                             start=summarized_upto)
+        update["history_summary"] = summarize_history(state.get("history_summary", ""),
+                                                      messages[summarized_upto:window_start])
+        update["summarized_upto"] = window_start
+    return update
+
+
+def retrieval_node(state: GraphState) -> Dict[str, Any]:
+    # Top-k slides for the current question; always overwrites the previous turn's context
+    if not retrieval_enabled:
+        return {"retrieved_context": []}
+    try:
+        with span("retrieval.search", k=retrieval_top_k):
+            results = retrieve_slides(state["last_human_message"], k=retrieval_top_k,
+                                      deck_hashes=state.get("retrieval_decks") or None)
+    except IndexMismatchError:
+        # A misconfigured index would otherwise answer every turn without context, unnoticed
+        raise
+    except Exception as e:
+        print(f"Error retrieving slides: {e}")
+        results = []
+    return {"retrieved_context": results}
+
+
+def format_retrieved_context(results: List[Dict[str, Any]], max_chars: int = retrieval_max_context_chars) -> str:
+    # Best results first, stopping before the character budget is exceeded
+    parts = []
+    used = 0
+    for result in results:
+        part = f"[{result['deck_name']} - slide {result['slide_number']}]\n{result['text']}"
+        if parts and used + len(part) > max_chars:
+            break
+        parts.append(part[:max_chars])
+        used += len(part)
+    return "\n\n".join(parts)
+
+
+def build_chat_context(state: GraphState):
+    # Messages and system prompt seen by the model: rolling summary + recent turns verbatim
+    # + slides retrieved for this turn
+    messages = state["messages"][state.get("summarized_upto", 0):]
+    system_prompt = CHATBOT_SYSTEM_PROMPT
+    if state.get("history_summary"):
+        system_prompt += "\n\nSummary of the earlier conversation:\n" + state["history_summary"]
+    if state.get("retrieved_context"):
+        system_prompt += "\n\n" + RETRIEVAL_CONTEXT_PROMPT.format(
+            context=format_retrieved_context(state["retrieved_context"])
+        )
+    return messages, system_prompt
+
+
+def use_response_cache(state: GraphState) -> bool:
+    return d_chat_modes_graph.get(state.get("chat_mode"), {}).get("cache_llm_responses", False)
+
+
+def chat_mode_temperature(state: GraphState):
+    # None falls back to the chat model's default temperature
+    return d_chat_modes_graph.get(state.get("chat_mode"), {}).get("temperature")
+
+
 def chatbot_node(state: GraphState) -> dict:
     # Get the current messages from state
     
-    messages = state["messages"]
+    messages, system_prompt = build_chat_context(state)
     # Invoke the chat model with system prompt
-    response_content = chain_chat_response(messages, system_prompt=CHATBOT_SYSTEM_PROMPT)
+    response_content = chain_chat_response(messages, system_prompt=system_prompt,
+                                           use_cache=use_response_cache(state),
+                                           temperature=chat_mode_temperature(state))
 
     # Return the response as a message to be added to state
     # The add_messages annotation in ChatState will automatically append it
 
     return {"messages": AIMessage(content=response_content)}
 
-def hello_world_node(state: GraphState)-> Dict[str, Any]:
-    return {'messages':AIMessage(content='Hello World')} 
+async def achatbot_node(state: GraphState, config: RunnableConfig) -> dict:
+    # Async counterpart of chatbot_node, used when the graph runs with ainvoke/astream
+    messages, system_prompt = build_chat_context(state)
+    response_content = await achain_chat_response(messages, system_prompt=system_prompt, config=config,
+                                                  use_cache=use_response_cache(state),
+                                                  temperature=chat_mode_temperature(state))
+    return {"messages": AIMessage(content=response_content)}
+
+### Content generation: outline -> sections drafted in parallel (Send) -> merge
+
+_JSON_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+DOCUMENT_PART_SEPARATOR = "\n\n"
+
+
+def parse_outline(text: str, request: str) -> Dict[str, Any]:
+    """
+    Parse the outline model's JSON answer into a title and numbered sections.
+
+    An answer that is not a valid outline becomes a single untitled section
+    covering the whole request, so the turn still produces a document.
+    """
+    match = _JSON_FENCE_PATTERN.match(text or "")
+    try:
+        outline = json.loads(match.group(1) if match else text)
+        sections = [
+            {'index': index, 'title': str(section.get('title') or "").strip(),
+             'brief': str(section.get('brief') or "").strip()}
+            for index, section in enumerate(outline['sections'][:content_gen_max_sections])
+        ]
+        if sections:
+            return {'document_title': str(outline.get('title') or "").strip(), 'outline': sections}
+    except Exception as e:
+        print(f"Error parsing content outline: {e}")
+    return {'document_title': "", 'outline': [{'index': 0, 'title': "", 'brief': request}]}
+
+
+def outline_messages(state: GraphState) -> list:
+    return state["messages"][-content_gen_history_messages:]
+
+
+def outline_node(state: GraphState) -> Dict[str, Any]:
+    response = chain_chat_response(outline_messages(state),
+                                   system_prompt=CONTENT_OUTLINE_PROMPT.format(max_sections=content_gen_max_sections),
+                                   temperature=chat_mode_temperature(state))
+    # Drafts of the previous turn are cleared before the new sections are fanned out
+    return {**parse_outline(response, state["last_human_message"]), 'section_drafts': None}
+
+
+async def aoutline_node(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    response = await achain_chat_response(
+        outline_messages(state), config=config, temperature=chat_mode_temperature(state),
+        system_prompt=CONTENT_OUTLINE_PROMPT.format(max_sections=content_gen_max_sections)
+    )
+    return {**parse_outline(response, state["last_human_message"]), 'section_drafts': None}
+
+
+def dispatch_sections(state: GraphState) -> List[Send]:
+    # One draft_section task per outline section; the run's max_concurrency bounds how many run at once
+    outline_text = "\n".join(f"{section['index'] + 1}. {section['title']}: {section['brief']}"
+                              for section in state["outline"])
+    return [
+        Send("draft_section", {
+            'section': section,
+            'document_title': state.get("document_title", ""),
+            'outline_text': outline_text,
+            'request': state["last_human_message"],
+            'temperature': chat_mode_temperature(state)
+        })
+        for section in state["outline"]
+    ]
+
+
+def section_prompt(task: Dict[str, Any]) -> str:
+    section = task['section']
+    return SECTION_DRAFT_PROMPT.format(document_title=task['document_title'], request=task['request'],
+                                       outline=task['outline_text'], section_title=section['title'],
+                                       section_brief=section['brief'])
+
+
+def draft_section_node(task: Dict[str, Any]) -> Dict[str, Any]:
+    section = task['section']
+    content = chain_chat_response([HumanMessage(section_prompt(task))], temperature=task.get('temperature'))
+    return {'section_drafts': [{'index': section['index'], 'title': section['title'], 'content': content}]}
+
+
+async def adraft_section_node(task: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    section = task['section']
+    content = await achain_chat_response([HumanMessage(section_prompt(task))], config=config,
+                                         temperature=task.get('temperature'))
+    return {'section_drafts': [{'index': section['index'], 'title': section['title'], 'content': content}]}
+
+
+def format_document_title(title: str) -> str:
+    return f"# {title}" if title else ""
+
+
+def format_section(draft: Dict[str, Any]) -> str:
+    # Drop a heading the model repeated despite the prompt
+    content = draft['content'].strip()
+    if draft['title']:
+        first_line, _, rest = content.partition("\n")
+        if first_line.lstrip("#* ").rstrip("* ").strip().casefold() == draft['title'].casefold():
+            content = rest.strip()
+        return join_document_parts([f"## {draft['title']}", content])
+    return content
+
+
+def join_document_parts(parts) -> str:
+    # Title and sections are separated by a blank line; empty parts are dropped
+    return DOCUMENT_PART_SEPARATOR.join(part for part in parts if part)
+
+
+def merge_sections_node(state: GraphState) -> Dict[str, Any]:
+    # Sections in outline order under the document title; stream_response emits the same text piece by piece
+    drafts = sorted(state.get("section_drafts") or [], key=lambda draft: draft['index'])
+    document = join_document_parts([format_document_title(state.get("document_title", ""))]
+                                   + [format_section(draft) for draft in drafts])
+    return {'messages': AIMessage(content=document)} 
@@ -0,0 +1,161 @@
+"""
+Process-wide registry of the compiled chat graph and its checkpointer.
+
+Compiling every chat-mode subgraph and opening the checkpoint database is
+done once per database file and shared by all ChatBotGraph handles, which
+only carry the user_id. The compiled graph and PooledSqliteSaver are safe to
+use from several threads at once. The async graph and its AsyncSqliteSaver
+are shared the same way, one per event loop (an aiosqlite connection is bound
+to the loop it was opened on).
+"""
+
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import StateGraph, START
+from common_assets.config import d_chat_modes_graph, checkpoint_sqlitite_loc, get_chat_mode_graph_fn
+
+from backend.utils import PooledSqliteSaver, start_checkpoint_compactor, span, sqlite_pragmas
+from .state import GraphState
+
+
+def build_checkpointer(db_path: str = checkpoint_sqlitite_loc) -> PooledSqliteSaver:
+    # WAL-mode SQLite with a single writer connection and a pool of read connections,
+    # safe to share between Streamlit session threads and between processes on one host
+    checkpointer = PooledSqliteSaver(db_path)
+    # Prunes old checkpoints in the background when checkpoint_compaction_interval_s is set
+    start_checkpoint_compactor(checkpointer)
+    return checkpointer
+
+
+async def abuild_checkpointer(db_path: str = checkpoint_sqlitite_loc) -> AsyncSqliteSaver:
+    # Same pragmas as the sync connections, on an aiosqlite connection of the running loop
+    conn = await aiosqlite.connect(db_path)
+    for pragma in sqlite_pragmas():
+        await conn.execute(pragma)
+    return AsyncSqliteSaver(conn)
+
+
+def build_chat_graph(checkpointer):
+    ### Currently there's only 1 state for all subgraphs. Can change it later if required.
+    graph_builder = StateGraph(GraphState)
+
+    for chat_mode in d_chat_modes_graph:
+        chat_mode_subgraphs = get_chat_mode_graph_fn(chat_mode)().compile()
+        graph_builder.add_node("subgraph_"+chat_mode, chat_mode_subgraphs )
+
+    def routing_fn(x):
+        with span("graph.route", chat_mode=x['chat_mode']):
+            return x['chat_mode']
+
+    graph_builder.add_conditional_edges(START, routing_fn, {chat_mode: 'subgraph_'+chat_mode for chat_mode in d_chat_modes_graph.keys()})
+
+    graph = graph_builder.compile(checkpointer=checkpointer)
+    return graph
+
+
+class GraphResources:
+    """
+    Compiled graphs and checkpointers for one checkpoint database, built on first access.
+    """
+
+    def __init__(self, db_path: str = checkpoint_sqlitite_loc):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._checkpointer: Optional[PooledSqliteSaver] = None
+        self._graph = None
+        # Per event loop: (AsyncSqliteSaver, async graph), and the asyncio.Lock guarding its creation
+        self._async: Dict[asyncio.AbstractEventLoop, Tuple[AsyncSqliteSaver, object]] = {}
+        self._async_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+    @property
+    def checkpointer(self) -> PooledSqliteSaver:
+        if self._checkpointer is None:
+            with self._lock:
+                if self._checkpointer is None:
+                    self._checkpointer = build_checkpointer(self.db_path)
+        return self._checkpointer
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            checkpointer = self.checkpointer
+            with self._lock:
+                if self._graph is None:
+                    self._graph = build_chat_graph(checkpointer)
+        return self._graph
+
+    async def aget_checkpointer_and_graph(self) -> Tuple[AsyncSqliteSaver, object]:
+        """
+        Async checkpointer and graph of the running event loop, built on first use.
+
+        Returns:
+            (AsyncSqliteSaver, compiled graph) shared by every handle used from this loop
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._async.get(loop)
+        if entry is None:
+            with self._lock:
+                loop_lock = self._async_locks.setdefault(loop, asyncio.Lock())
+            async with loop_lock:
+                entry = self._async.get(loop)
+                if entry is None:
+                    checkpointer = await abuild_checkpointer(self.db_path)
+                    entry = (checkpointer, build_chat_graph(checkpointer))
+                    with self._lock:
+                        self._async[loop] = entry
+        return entry
+
+    async def aget_graph(self):
+        _, graph = await self.aget_checkpointer_and_graph()
+        return graph
+
+    async def aclose(self) -> None:
+        """Close the async checkpointer of the running event loop; the next async call reopens it."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async.pop(loop, None)
+            self._async_locks.pop(loop, None)
+        if entry is not None:
+            await entry[0].conn.close()
+
+    def close(self) -> None:
+        # Async checkpointers can only be closed from their own loop (aclose); here they are only dropped
+        with self._lock:
+            if self._checkpointer is not None:
+                self._checkpointer.close()
+            self._checkpointer = None
+            self._graph = None
+            self._async.clear()
+            self._async_locks.clear()
+
+
+_resources: Dict[str, GraphResources] = {}
+_resources_lock = threading.Lock()
+
+
+def get_graph_resources(db_path: str = checkpoint_sqlitite_loc) -> GraphResources:
+    """
+    Get the shared GraphResources of a checkpoint database, creating the entry on first use.
+
+    Args:
+        db_path: Path of the checkpoint database (default: from config)
+
+    Returns:
+        GraphResources shared by every caller in this process
+    """
+    with _resources_lock:
+        if db_path not in _resources:
+            _resources[db_path] = GraphResources(db_path)
+        return _resources[db_path]
+
+
+def reset_graph_resources() -> None:
+    """Close and forget every shared graph and checkpointer."""
+    with _resources_lock:
+        for resources in _resources.values():
+            resources.close()
+        _resources.clear()
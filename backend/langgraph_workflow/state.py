@@ -8,6 +8,18 @@ from typing import TypedDict, Annotated
 from langgraph.graph.message import add_messages
 
 
+def merge_dicts(left: dict, right: dict) -> dict:
+    """Reducer that merges updates into the existing dict instead of replacing it."""
+    return {**(left or {}), **(right or {})}
+
+
+def add_section_drafts(left: list, right: list) -> list:
+    """Reducer collecting drafts from parallel section nodes; an update of None clears the list."""
+    if right is None:
+        return []
+    return (left or []) + right
+
+
 class GraphState(TypedDict):
     """
     State schema for the chat graph.
@@ -15,8 +27,28 @@ class GraphState(TypedDict):
     Attributes:
         messages: List of conversation messages. The add_messages annotation
                  ensures new messages are appended to the list automatically.
+        history_summary: Rolling summary of the messages before summarized_upto.
+        summarized_upto: Index in messages up to which history is folded into
+                 history_summary; the model only sees messages from here on.
+        message_token_counts: Token count per message id, computed once per
+                 message and merged across turns.
+        retrieved_context: Slides retrieved for the current turn (row dicts
+                 of the vector index), added to the system prompt.
+        retrieval_decks: Optional deck hashes the retrieval is restricted to.
+        document_title: Title of the document planned by the content_gen outline.
+        outline: Sections ({'index', 'title', 'brief'}) of that document.
+        section_drafts: Drafted sections ({'index', 'title', 'content'}) in
+                 completion order, collected from the parallel section nodes.
     """
     chat_mode:str
     last_human_message: str
     messages: Annotated[list, add_messages]
+    history_summary: str
+    summarized_upto: int
+    message_token_counts: Annotated[dict, merge_dicts]
+    retrieved_context: list
+    retrieval_decks: list
+    document_title: str
+    outline: list
+    section_drafts: Annotated[list, add_section_drafts]
 
@@ -0,0 +1,35 @@
+"""
+Retrieval over ingested slides: a memory-mapped vector index, a BM25 keyword index, and their fusion.
+"""
+
+from .embeddings import HashingEmbedder, OpenAIEmbedder, build_embedder, get_embedder, set_embedder
+from .slide_documents import slide_doc_id, slide_header_terms, slide_analysis_to_text, iter_slide_documents
+from .vector_index import IndexMismatchError, VectorIndex, get_vector_index, set_vector_index, search_slides, index_slide_documents
+from .keyword_index import KeywordIndex, get_keyword_index, set_keyword_index, index_keyword_documents, tokenize
+from .retriever import RETRIEVAL_BACKENDS, reciprocal_rank_fusion, retrieve_slides
+
+__all__ = [
+    "HashingEmbedder",
+    "OpenAIEmbedder",
+    "build_embedder",
+    "get_embedder",
+    "set_embedder",
+    "slide_doc_id",
+    "slide_header_terms",
+    "slide_analysis_to_text",
+    "iter_slide_documents",
+    "IndexMismatchError",
+    "VectorIndex",
+    "get_vector_index",
+    "set_vector_index",
+    "search_slides",
+    "index_slide_documents",
+    "KeywordIndex",
+    "get_keyword_index",
+    "set_keyword_index",
+    "index_keyword_documents",
+    "tokenize",
+    "RETRIEVAL_BACKENDS",
+    "reciprocal_rank_fusion",
+    "retrieve_slides"
+]
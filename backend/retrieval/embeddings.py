@@ -0,0 +1,109 @@
+"""
+Pluggable text embedding functions for the retrieval index.
+
+An embedder is any object with `name` and `dim` attributes and an
+`embed(texts) -> np.ndarray` method returning one L2-normalized float32 row
+per text; the vector index records the name of the embedder it was built with. get_embedder() returns the one named by `retrieval_embedder` in
+common_assets.config:
+
+  - "openai":  OpenAIEmbedder, langchain_openai embeddings (default)
+  - "hashing": HashingEmbedder, a deterministic local stand-in (feature
+               hashing of word unigrams and bigrams) that needs no network,
+               used by the offline benchmarks
+"""
+
+import hashlib
+import re
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from common_assets.config import retrieval_embedder, retrieval_embedding_dim, retrieval_openai_embedding_model
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows stay zero) and return it as float32."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder based on signed feature hashing.
+
+    Texts sharing words get similar vectors, which is enough to exercise
+    the index and the QnA retrieval step offline and in benchmarks.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN_PATTERN.findall(text.casefold())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                matrix[row, digest % self.dim] += 1.0 if (digest >> 63) & 1 else -1.0
+        return normalize_rows(matrix)
+
+
+class OpenAIEmbedder:
+    """
+    OpenAI embeddings through langchain_openai, imported on first use.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = retrieval_openai_embedding_model, dim: int = retrieval_embedding_dim):
+        self.model = model
+        self.dim = dim
+        self._client = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if self._client is None:
+            from dotenv import load_dotenv
+            from langchain_openai import OpenAIEmbeddings
+
+            load_dotenv()
+            self._client = OpenAIEmbeddings(model=self.model, dimensions=self.dim)
+        return normalize_rows(np.array(self._client.embed_documents(list(texts)), dtype=np.float32))
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def build_embedder(name: str = retrieval_embedder, dim: int = retrieval_embedding_dim):
+    if name == "hashing":
+        return HashingEmbedder(dim)
+    if name == "openai":
+        return OpenAIEmbedder(dim=dim)
+    raise ValueError(f"Unknown embedder: {name!r}")
+
+
+def get_embedder():
+    """Get the process-wide embedder, created on first use from common_assets.config."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = build_embedder()
+    return _embedder
+
+
+def set_embedder(embedder: Optional[object]) -> None:
+    """Replace the process-wide embedder (None builds the configured one on next use)."""
+    global _embedder
+    with _embedder_lock:
+        _embedder = embedder
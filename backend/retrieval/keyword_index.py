@@ -0,0 +1,560 @@
+"""
+Incremental BM25 keyword index over slide analyses.
+
+Exact names (product names, logos, titles) are matched poorly by embeddings,
+so slides are also indexed by their words. Header terms of the analysis
+(title, subtitle, section subheadings, logo names, see slide_header_terms)
+count keyword_header_boost times.
+
+Postings are kept in two parts:
+
+  - the main segment: CSR arrays (term offsets, int32 slots, uint16 term
+    frequencies), loaded memory-mapped from .npy files at startup
+  - the delta: compact per-term arrays of slots added since the last
+    compaction, merged into the main segment once they grow past
+    keyword_index_max_delta_postings (and on save)
+
+Each slide gets a slot, never reused. Deleting a slide tombstones its slot;
+its postings are dropped at the next compaction (document frequencies count
+it until then). Slide rows, including the text needed to re-index them, are
+committed to docs.db on every add/delete, while save() writes a snapshot of
+the main segment. Opening the index loads the latest snapshot and re-indexes
+only the slides added after it, so startup cost does not grow with the number
+of slides. Other processes pick up committed changes on their next search.
+
+    python -m backend.retrieval.keyword_index --build
+    python -m backend.retrieval.keyword_index --query "Acme Cloud pricing" --k 5
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common_assets.config import (
+    keyword_index_dir,
+    keyword_bm25_k1,
+    keyword_bm25_b,
+    keyword_header_boost,
+    keyword_index_max_delta_postings,
+    retrieval_top_k,
+    ingestion_sqlite_loc
+)
+from .slide_documents import slide_header_terms
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+MAX_TERM_FREQUENCY = np.iinfo(np.uint16).max
+
+ROW_COLUMNS = ('doc_id', 'deck_hash', 'deck_name', 'slide_number', 'title', 'text')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall((text or "").casefold())
+
+
+def _grown(values: np.ndarray, size: int) -> np.ndarray:
+    # Amortized growth of a per-slot array
+    if size <= len(values):
+        return values
+    grown = np.zeros(max(size, 2 * len(values), 1024), dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index of slides with incremental add/delete and snapshot persistence.
+    """
+
+    def __init__(self, index_dir: str, k1: float = keyword_bm25_k1, b: float = keyword_bm25_b,
+                 header_boost: int = keyword_header_boost,
+                 max_delta_postings: int = keyword_index_max_delta_postings):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.header_boost = header_boost
+        self.max_delta_postings = max_delta_postings
+        os.makedirs(index_dir, exist_ok=True)
+        self._manifest_path = os.path.join(index_dir, "manifest.json")
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(os.path.join(index_dir, "docs.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS docs (
+                   slot INTEGER PRIMARY KEY,
+                   doc_id TEXT NOT NULL,
+                   deck_hash TEXT,
+                   deck_name TEXT,
+                   slide_number INTEGER,
+                   title TEXT,
+                   text TEXT,
+                   headers TEXT,
+                   deck_code INTEGER NOT NULL,
+                   deleted INTEGER NOT NULL DEFAULT 0)"""
+        )
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_docs_live_doc_id ON docs (doc_id) WHERE deleted = 0")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decks (deck_code INTEGER PRIMARY KEY, deck_hash TEXT NOT NULL UNIQUE)"
+        )
+        # Bumped by every write transaction, so readers notice changes with one query
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+        self._conn.commit()
+        self._load()
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def contains(self, doc_ids: Iterable[str]) -> set:
+        """The subset of doc_ids currently indexed."""
+        with self._lock:
+            return {doc_id for doc_id in doc_ids if doc_id in self._slot_of_doc}
+
+    # Loading and refreshing
+
+    def _reset_memory(self) -> None:
+        self._vocab: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_slots = np.empty(0, dtype=np.int32)
+        self._post_tfs = np.empty(0, dtype=np.uint16)
+        self._delta: Dict[int, Tuple[array, array]] = {}
+        self._delta_postings = 0
+        self._slot_count = 0
+        self._doc_lengths = np.zeros(0, dtype=np.int32)
+        self._deck_of_slot = np.zeros(0, dtype=np.int32)
+        self._live = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._live_length = 0
+        self._tombstones_since_compact = 0
+        self._slot_of_doc: Dict[str, int] = {}
+        self._deck_codes: Dict[str, int] = {}
+        self._generation = 0
+        self._version = -1
+
+    def _load(self) -> None:
+        with self._lock:
+            self._reset_memory()
+            snapshot_slots = 0
+            if os.path.exists(self._manifest_path):
+                with open(self._manifest_path) as f:
+                    manifest = json.load(f)
+                prefix = os.path.join(self.index_dir, f"seg-{manifest['generation']}")
+                with open(prefix + ".vocab", encoding="utf-8") as f:
+                    self._terms = f.read().split("\n") if manifest['terms'] else []
+                self._vocab = {term: term_id for term_id, term in enumerate(self._terms)}
+                self._offsets = np.load(prefix + ".offsets.npy", mmap_mode="r")
+                self._post_slots = np.load(prefix + ".slots.npy", mmap_mode="r")
+                self._post_tfs = np.load(prefix + ".tfs.npy", mmap_mode="r")
+                self._generation = manifest['generation']
+                snapshot_slots = manifest['slot_count']
+
+            self._deck_codes = dict(self._conn.execute("SELECT deck_hash, deck_code FROM decks").fetchall())
+            self._version = self._read_version()
+            rows = self._conn.execute(
+                "SELECT slot, doc_id, deck_code, deleted FROM docs WHERE slot < ? ORDER BY slot",
+                (snapshot_slots,)
+            ).fetchall()
+            self._slot_count = snapshot_slots
+            self._doc_lengths = np.zeros(snapshot_slots, dtype=np.int32)
+            self._deck_of_slot = np.zeros(snapshot_slots, dtype=np.int32)
+            self._live = np.zeros(snapshot_slots, dtype=bool)
+            if snapshot_slots:
+                self._doc_lengths[:] = np.load(
+                    os.path.join(self.index_dir, f"seg-{self._generation}.lengths.npy")
+                )[:snapshot_slots]
+            for slot, doc_id, deck_code, deleted in rows:
+                self._deck_of_slot[slot] = deck_code
+                if not deleted:
+                    self._live[slot] = True
+                    self._slot_of_doc[doc_id] = slot
+            self._live_count = int(self._live.sum())
+            self._tombstones_since_compact = snapshot_slots - self._live_count
+            self._live_length = int(self._doc_lengths[self._live].sum())
+            self._replay_from(snapshot_slots)
+
+    def _read_version(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _replay_from(self, first_slot: int) -> None:
+        # Index slides committed (possibly by another process) after first_slot
+        for slot, doc_id, deck_code, deleted, text, headers in self._conn.execute(
+            "SELECT slot, doc_id, deck_code, deleted, text, headers FROM docs WHERE slot >= ? ORDER BY slot",
+            (first_slot,)
+        ).fetchall():
+            self._index_slot(slot, doc_id, deck_code, self._term_counts(text, headers.split("\n") if headers else []))
+            if deleted:
+                self._tombstone(slot, doc_id)
+
+    def refresh(self) -> None:
+        """Pick up slides added or deleted by other processes since the last load."""
+        with self._lock:
+            version = self._read_version()
+            if version == self._version:
+                return
+            self._deck_codes = dict(self._conn.execute("SELECT deck_hash, deck_code FROM decks").fetchall())
+            self._replay_from(self._slot_count)
+            for slot, doc_id in self._conn.execute(
+                "SELECT slot, doc_id FROM docs WHERE deleted = 1 AND slot < ?", (self._slot_count,)
+            ).fetchall():
+                if self._live[slot]:
+                    self._tombstone(slot, doc_id)
+            self._version = version
+
+    # In-memory updates
+
+    def _term_counts(self, text: str, headers: Sequence[str]) -> Counter:
+        counts = Counter(tokenize(text))
+        if self.header_boost > 1:
+            for token in tokenize(" ".join(headers)):
+                counts[token] += self.header_boost - 1
+        return counts
+
+    def _index_slot(self, slot: int, doc_id: str, deck_code: int, counts: Counter) -> None:
+        for term, frequency in counts.items():
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                term_id = self._vocab[term] = len(self._terms)
+                self._terms.append(term)
+            postings = self._delta.get(term_id)
+            if postings is None:
+                postings = self._delta[term_id] = (array('i'), array('H'))
+            postings[0].append(slot)
+            postings[1].append(min(frequency, MAX_TERM_FREQUENCY))
+        self._delta_postings += len(counts)
+
+        self._slot_count = max(self._slot_count, slot + 1)
+        self._doc_lengths = _grown(self._doc_lengths, self._slot_count)
+        self._deck_of_slot = _grown(self._deck_of_slot, self._slot_count)
+        self._live = _grown(self._live, self._slot_count)
+        length = sum(counts.values())
+        self._doc_lengths[slot] = length
+        self._deck_of_slot[slot] = deck_code
+        self._live[slot] = True
+        self._live_count += 1
+        self._live_length += length
+        self._slot_of_doc[doc_id] = slot
+
+    def _tombstone(self, slot: int, doc_id: str) -> None:
+        self._live[slot] = False
+        self._live_count -= 1
+        self._live_length -= int(self._doc_lengths[slot])
+        self._tombstones_since_compact += 1
+        if self._slot_of_doc.get(doc_id) == slot:
+            del self._slot_of_doc[doc_id]
+
+    def compact(self) -> None:
+        """Merge the delta into the main segment and drop postings of deleted slides."""
+        with self._lock:
+            if not self._delta and not self._tombstones_since_compact:
+                return
+            main_terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int32), np.diff(self._offsets))
+            terms = [main_terms]
+            slots = [np.asarray(self._post_slots, dtype=np.int32)]
+            tfs = [np.asarray(self._post_tfs, dtype=np.uint16)]
+            for term_id, (delta_slots, delta_tfs) in self._delta.items():
+                terms.append(np.full(len(delta_slots), term_id, dtype=np.int32))
+                slots.append(np.frombuffer(delta_slots, dtype=np.int32))
+                tfs.append(np.frombuffer(delta_tfs, dtype=np.uint16))
+            terms = np.concatenate(terms)
+            slots = np.concatenate(slots)
+            tfs = np.concatenate(tfs)
+
+            keep = self._live[slots]
+            terms, slots, tfs = terms[keep], slots[keep], tfs[keep]
+            # New slots are always above existing ones, so a stable sort by term keeps slots ascending
+            order = np.argsort(terms, kind="stable")
+            self._post_slots = slots[order]
+            self._post_tfs = tfs[order]
+            self._offsets = np.zeros(len(self._terms) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=len(self._terms)), out=self._offsets[1:])
+            self._delta = {}
+            self._delta_postings = 0
+            self._tombstones_since_compact = 0
+
+    # Writes
+
+    def add_documents(self, documents: Iterable[Dict]) -> int:
+        """
+        Index slides; a slide whose doc_id is already indexed is replaced.
+
+        Args:
+            documents: Dicts with doc_id, deck_hash, deck_name, slide_number, title, text
+                       and optionally the slide analysis (see slide_documents.iter_slide_documents)
+
+        Returns:
+            int: Number of slides indexed
+        """
+        # The last version of a doc_id wins within one call
+        documents = list({doc['doc_id']: doc for doc in documents}.values())
+        if not documents:
+            return 0
+        with self._lock:
+            self.refresh()
+            replaced = []
+            pending = []
+            slot = self._slot_count
+            try:
+                for doc in documents:
+                    old_slot = self._slot_of_doc.get(doc['doc_id'])
+                    if old_slot is not None:
+                        replaced.append((old_slot, doc['doc_id']))
+                        self._conn.execute("UPDATE docs SET deleted = 1 WHERE slot = ?", (old_slot,))
+                    deck_code = self._deck_codes.get(doc['deck_hash'])
+                    if deck_code is None:
+                        cursor = self._conn.execute("INSERT INTO decks (deck_hash) VALUES (?)", (doc['deck_hash'],))
+                        deck_code = self._deck_codes[doc['deck_hash']] = cursor.lastrowid
+                    headers = slide_header_terms(doc['analysis']) if doc.get('analysis') else [doc.get('title') or ""]
+                    self._conn.execute(
+                        f"""INSERT INTO docs (slot, {', '.join(ROW_COLUMNS)}, headers, deck_code)
+                            VALUES (?, {', '.join('?' * len(ROW_COLUMNS))}, ?, ?)""",
+                        (slot, *(doc.get(column) for column in ROW_COLUMNS), "\n".join(headers), deck_code)
+                    )
+                    pending.append((slot, doc, deck_code, headers))
+                    slot += 1
+                self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._deck_codes = dict(self._conn.execute("SELECT deck_hash, deck_code FROM decks").fetchall())
+                raise
+
+            for old_slot, doc_id in replaced:
+                if self._live[old_slot]:
+                    self._tombstone(old_slot, doc_id)
+            for new_slot, doc, deck_code, headers in pending:
+                self._index_slot(new_slot, doc['doc_id'], deck_code, self._term_counts(doc.get('text'), headers))
+            self._version = self._read_version()
+            if self._delta_postings > self.max_delta_postings:
+                self.compact()
+        return len(pending)
+
+    def delete_documents(self, doc_ids: Iterable[str]) -> int:
+        """
+        Remove slides from search results (their postings go at the next compaction).
+
+        Returns:
+            int: Number of slides deleted
+        """
+        with self._lock:
+            self.refresh()
+            targets = [(self._slot_of_doc[doc_id], doc_id) for doc_id in set(doc_ids) if doc_id in self._slot_of_doc]
+            if not targets:
+                return 0
+            try:
+                self._conn.executemany("UPDATE docs SET deleted = 1 WHERE slot = ?", [(slot,) for slot, _ in targets])
+                self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            for slot, doc_id in targets:
+                self._tombstone(slot, doc_id)
+            self._version = self._read_version()
+        return len(targets)
+
+    def save(self) -> None:
+        """Compact and write a snapshot of the postings, so the next open loads instead of re-indexing."""
+        with self._lock:
+            self.compact()
+            generation = self._generation + 1
+            prefix = os.path.join(self.index_dir, f"seg-{generation}")
+            with open(prefix + ".vocab", "w", encoding="utf-8") as f:
+                f.write("\n".join(self._terms))
+            np.save(prefix + ".offsets.npy", np.asarray(self._offsets))
+            np.save(prefix + ".slots.npy", np.asarray(self._post_slots))
+            np.save(prefix + ".tfs.npy", np.asarray(self._post_tfs))
+            np.save(prefix + ".lengths.npy", self._doc_lengths[:self._slot_count])
+
+            manifest_tmp = self._manifest_path + ".tmp"
+            with open(manifest_tmp, "w") as f:
+                json.dump({'generation': generation, 'slot_count': self._slot_count, 'terms': len(self._terms)}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            # The manifest switch makes the new snapshot current
+            os.replace(manifest_tmp, self._manifest_path)
+            self._generation = generation
+            for path in glob.glob(os.path.join(self.index_dir, "seg-*")):
+                if not os.path.basename(path).startswith(f"seg-{generation}."):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"Error removing old keyword index segment {path}: {e}")
+
+    # Search
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        slots = []
+        tfs = []
+        if term_id < len(self._offsets) - 1:
+            start, end = int(self._offsets[term_id]), int(self._offsets[term_id + 1])
+            slots.append(np.asarray(self._post_slots[start:end]))
+            tfs.append(np.asarray(self._post_tfs[start:end]))
+        if term_id in self._delta:
+            delta_slots, delta_tfs = self._delta[term_id]
+            slots.append(np.array(delta_slots, dtype=np.int32))
+            tfs.append(np.array(delta_tfs, dtype=np.uint16))
+        if len(slots) == 1:
+            return slots[0], tfs[0]
+        if not slots:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16)
+        return np.concatenate(slots), np.concatenate(tfs)
+
+    def search(self, query: str, k: int = retrieval_top_k,
+               deck_hashes: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Top-k slides by BM25 score for a keyword query.
+
+        Args:
+            query: Free text; every word is a query term
+            k: Number of results
+            deck_hashes: Only return slides of these decks (None: all decks)
+
+        Returns:
+            Row dicts (ROW_COLUMNS plus 'score'), best first
+        """
+        self.refresh()
+        with self._lock:
+            term_ids = sorted({self._vocab[term] for term in tokenize(query) if term in self._vocab})
+            if not term_ids or not self._live_count or k <= 0:
+                return []
+            count = self._slot_count
+            live_count = self._live_count
+            average_length = self._live_length / live_count if live_count else 1.0
+            length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[:count] / max(average_length, 1e-9))
+
+            scores = np.zeros(count, dtype=np.float32)
+            for term_id in term_ids:
+                slots, tfs = self._postings(term_id)
+                if not len(slots):
+                    continue
+                frequency = min(len(slots), live_count)
+                idf = math.log(1 + (live_count - frequency + 0.5) / (frequency + 0.5))
+                tfs = tfs.astype(np.float32)
+                scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[slots])
+
+            mask = self._live[:count]
+            if deck_hashes is not None:
+                codes = [self._deck_codes[h] for h in deck_hashes if h in self._deck_codes]
+                mask = mask & np.isin(self._deck_of_slot[:count], codes)
+            scores[~mask] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        metadata = self.get_rows([int(slot) for slot in candidates])
+        return [{**metadata[int(slot)], 'score': float(scores[slot])} for slot in candidates if int(slot) in metadata]
+
+    def get_rows(self, slots: Sequence[int]) -> Dict[int, Dict]:
+        result = {}
+        with self._lock:
+            for start in range(0, len(slots), 500):
+                batch = list(slots[start:start + 500])
+                for values in self._conn.execute(
+                    f"SELECT slot, {', '.join(ROW_COLUMNS)} FROM docs WHERE slot IN ({', '.join('?' * len(batch))})",
+                    batch
+                ):
+                    result[values[0]] = dict(zip(ROW_COLUMNS, values[1:]))
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'slides': self._live_count,
+                'slots': self._slot_count,
+                'terms': len(self._terms),
+                'main_postings': int(len(self._post_slots)),
+                'delta_postings': self._delta_postings,
+                'generation': self._generation
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_keyword_index: Optional[KeywordIndex] = None
+_keyword_index_lock = threading.Lock()
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Get the process-wide keyword index of common_assets.config, loaded on first use."""
+    global _keyword_index
+    if _keyword_index is None:
+        with _keyword_index_lock:
+            if _keyword_index is None:
+                _keyword_index = KeywordIndex(keyword_index_dir)
+    return _keyword_index
+
+
+def set_keyword_index(index: Optional[KeywordIndex]) -> None:
+    """Replace the process-wide keyword index (None loads the configured one on next use)."""
+    global _keyword_index
+    with _keyword_index_lock:
+        _keyword_index = index
+
+
+def index_keyword_documents(documents: Iterable[Dict], index: Optional[KeywordIndex] = None,
+                            batch_size: int = 1000) -> int:
+    """
+    Add documents (see slide_documents.iter_slide_documents) not yet in the index, then save a snapshot.
+
+    Returns:
+        int: Number of slides added
+    """
+    index = index if index is not None else get_keyword_index()
+    added = 0
+    batch: List[Dict] = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            existing = index.contains(doc['doc_id'] for doc in batch)
+            added += index.add_documents(doc for doc in batch if doc['doc_id'] not in existing)
+            batch = []
+    existing = index.contains(doc['doc_id'] for doc in batch)
+    added += index.add_documents(doc for doc in batch if doc['doc_id'] not in existing)
+    index.save()
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the slide keyword (BM25) index.")
+    parser.add_argument("--build", action="store_true", help="Index analyzed slides from the ingestion store")
+    parser.add_argument("--ingestion-db", default=ingestion_sqlite_loc, help="Ingestion store (SQLite)")
+    parser.add_argument("--query", default=None, help="Search the index with this text")
+    parser.add_argument("--k", type=int, default=retrieval_top_k, help="Results per query")
+    parser.add_argument("--deck", action="append", default=None, help="Restrict search to a deck hash")
+    args = parser.parse_args(argv)
+
+    index = get_keyword_index()
+    if args.build:
+        from backend.ingestion import IngestionStore
+        from .slide_documents import iter_slide_documents
+
+        store = IngestionStore(args.ingestion_db)
+        try:
+            added = index_keyword_documents(iter_slide_documents(store), index)
+        finally:
+            store.close()
+        print(f"Added {added} slides; index holds {len(index)}")
+    if args.query:
+        for result in index.search(args.query, k=args.k, deck_hashes=args.deck):
+            print(f"{result['score']:.3f}  {result['deck_name']} #{result['slide_number']}  {result['title']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
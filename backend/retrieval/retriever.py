@@ -0,0 +1,58 @@
+"""
+Slide retrieval for the QnA graph: vector search, BM25 keyword search, or both fused.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from common_assets.config import retrieval_backend, retrieval_top_k, retrieval_rrf_k
+from .keyword_index import get_keyword_index
+from .vector_index import search_slides
+
+RETRIEVAL_BACKENDS = ("vector", "keyword", "hybrid")
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Dict]], k: int, rrf_k: int = retrieval_rrf_k) -> List[Dict]:
+    """
+    Merge ranked result lists by reciprocal rank (sum of 1 / (rrf_k + rank)).
+
+    Scores of different retrievers are not comparable, ranks are. The fused
+    score replaces 'score'; the first list's dict is kept for a doc_id found in several.
+
+    Returns:
+        Up to k row dicts, best first
+    """
+    fused: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            entry = fused.setdefault(result['doc_id'], {**result, 'score': 0.0})
+            entry['score'] += 1.0 / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)[:k]
+
+
+def retrieve_slides(query: str, k: int = retrieval_top_k, deck_hashes: Optional[Iterable[str]] = None,
+                    backend: str = retrieval_backend) -> List[Dict]:
+    """
+    Top-k slides for a question from the configured retriever.
+
+    Args:
+        query: The user's question
+        k: Number of slides
+        deck_hashes: Only return slides of these decks (None: all decks)
+        backend: "vector", "keyword" or "hybrid"
+
+    Returns:
+        Row dicts (doc_id, deck_hash, deck_name, slide_number, title, text, score), best first
+    """
+    if backend not in RETRIEVAL_BACKENDS:
+        raise ValueError(f"Unknown retrieval backend: {backend!r}")
+    deck_hashes = list(deck_hashes) if deck_hashes is not None else None
+    result_lists = []
+    if backend in ("vector", "hybrid"):
+        result_lists.append(search_slides([query], k=k * 2 if backend == "hybrid" else k,
+                                          deck_hashes=deck_hashes)[0])
+    if backend in ("keyword", "hybrid"):
+        result_lists.append(get_keyword_index().search(query, k=k * 2 if backend == "hybrid" else k,
+                                                       deck_hashes=deck_hashes))
+    if len(result_lists) == 1:
+        return result_lists[0]
+    return reciprocal_rank_fusion(result_lists, k)
@@ -0,0 +1,56 @@
+"""
+Conversion of stored slide analyses into retrievable documents.
+"""
+
+import os
+from typing import Dict, Iterator, List
+
+# Fields of a PPT_SLIDE_ANALYSIS_PROMPT result that name things exactly (titles, logos)
+HEADER_FIELDS = ('slide_title', 'slide_subtitle')
+
+
+def slide_doc_id(deck_hash: str, slide_number: int) -> str:
+    return f"{deck_hash[:16]}:{slide_number}"
+
+
+def slide_header_terms(analysis: Dict) -> List[str]:
+    """Title, subtitle, section subheadings and logo names of a slide analysis."""
+    headers = analysis.get('slide_headers') or {}
+    terms = [headers[key] for key in HEADER_FIELDS if headers.get(key)]
+    terms += [heading for heading in headers.get('section_subheadings') or [] if heading]
+    terms += [logo['logo_name'] for logo in headers.get('logos') or [] if logo.get('logo_name')]
+    return terms
+
+
+def slide_analysis_to_text(analysis: Dict) -> str:
+    """
+    Flatten a slide analysis into the text that is embedded and shown to the model.
+    """
+    parts = slide_header_terms(analysis)
+    summary = (analysis.get('slide_content_overview') or {}).get('summary')
+    if summary:
+        parts.append(summary)
+    if analysis.get('slide_content_full'):
+        parts.append(analysis['slide_content_full'])
+    for visual in analysis.get('visual_components_inventory') or []:
+        parts.append(f"{visual.get('visual_type', 'Visual')}: {visual.get('description', '')}")
+    return "\n".join(parts)
+
+
+def iter_slide_documents(store) -> Iterator[Dict]:
+    """
+    Every analyzed slide of an IngestionStore as a document dict.
+
+    Yields:
+        Dicts with doc_id, deck_hash, deck_name, slide_number, title, text and analysis
+    """
+    for deck_path, deck_hash, slide_number, analysis in store.iter_analyses():
+        yield {
+            'doc_id': slide_doc_id(deck_hash, slide_number),
+            'deck_hash': deck_hash,
+            'deck_name': os.path.basename(deck_path or ""),
+            'slide_number': slide_number,
+            'title': (analysis.get('slide_headers') or {}).get('slide_title') or "",
+            'text': slide_analysis_to_text(analysis),
+            'analysis': analysis
+        }
@@ -0,0 +1,359 @@
+"""
+Memory-mapped vector index of slide embeddings.
+
+The index directory holds
+
+  - vectors.f32: normalized float32 embeddings, one row per slide, memory-mapped
+  - decks.i32:   deck code of each row (parallel to vectors), for filtering by deck
+  - rows.db:     SQLite table of row metadata (doc_id, deck, slide number, title, text)
+  - index.json:  dimension and embedder the vectors were built with
+
+Appends add rows at the end of the files without rebuilding. A row counts
+only once its metadata is committed, so readers ignore the bytes of an
+append in progress, and the next append overwrites those of a crashed one. Search is a blocked
+matrix product over the mapped rows (cosine similarity, since rows and
+queries are normalized) with per-block top-k selection, so memory stays
+bounded for any index size. One process appends (the indexing CLI); other
+processes pick up new rows on their next search.
+
+    python -m backend.retrieval.vector_index --build
+    python -m backend.retrieval.vector_index --query "pricing roadmap" --k 5
+
+An index only answers queries embedded by the embedder it was built with.
+Opening it with another one (e.g. after changing `retrieval_embedder`)
+raises IndexMismatchError; set the embedder back, or move the index
+directory away and run --build again to re-embed all analyzed slides.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from common_assets.config import (
+    retrieval_index_dir,
+    retrieval_embedding_dim,
+    retrieval_top_k,
+    ingestion_sqlite_loc
+)
+from .embeddings import get_embedder, normalize_rows
+
+# Rows scored per matrix product during search
+SEARCH_BLOCK_ROWS = 65536
+
+ROW_COLUMNS = ('doc_id', 'deck_hash', 'deck_name', 'slide_number', 'title', 'text')
+
+
+class IndexMismatchError(ValueError):
+    """The index on disk was built with another embedder or dimension."""
+
+
+class VectorIndex:
+    """
+    Append-only index of normalized embeddings with top-k cosine search.
+    """
+
+    def __init__(self, index_dir: str, dim: int, embedder_name: str):
+        self.index_dir = index_dir
+        self.dim = dim
+        os.makedirs(index_dir, exist_ok=True)
+        self._vectors_path = os.path.join(index_dir, "vectors.f32")
+        self._decks_path = os.path.join(index_dir, "decks.i32")
+        self._lock = threading.RLock()
+
+        info_path = os.path.join(index_dir, "index.json")
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                info = json.load(f)
+            if info['dim'] != dim or info.get('embedder') != embedder_name:
+                raise IndexMismatchError(
+                    f"Index at {index_dir} was built with embedder={info.get('embedder')!r}, dim={info['dim']}, "
+                    f"not embedder={embedder_name!r}, dim={dim}. Set retrieval_embedder back, or move the "
+                    f"directory away and rebuild it with `python -m backend.retrieval.vector_index --build`"
+                )
+        else:
+            with open(info_path, "w") as f:
+                json.dump({'dim': dim, 'embedder': embedder_name}, f)
+
+        self._conn = sqlite3.connect(os.path.join(index_dir, "rows.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS rows (
+                   row INTEGER PRIMARY KEY,
+                   doc_id TEXT NOT NULL UNIQUE,
+                   deck_hash TEXT,
+                   deck_name TEXT,
+                   slide_number INTEGER,
+                   title TEXT,
+                   text TEXT)"""
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decks (deck_code INTEGER PRIMARY KEY, deck_hash TEXT NOT NULL UNIQUE)"
+        )
+        self._conn.commit()
+
+        self._count = 0
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._deck_of_row = np.empty((0,), dtype=np.int32)
+        self._deck_codes: Dict[str, int] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _load(self) -> None:
+        # Committed rows define the index size; bytes past them (an append in progress) are ignored
+        count = self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        self._deck_codes = dict(self._conn.execute("SELECT deck_hash, deck_code FROM decks").fetchall())
+        self._count = count
+        if count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            self._deck_of_row = np.fromfile(self._decks_path, dtype=np.int32, count=count)
+        else:
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+            self._deck_of_row = np.empty((0,), dtype=np.int32)
+
+    def refresh(self) -> None:
+        """Re-map the files if another process appended rows."""
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        if size != self._count * self.dim * 4:
+            with self._lock:
+                self._load()
+
+    def contains(self, doc_ids: Iterable[str]) -> set:
+        """The subset of doc_ids already in the index."""
+        doc_ids = list(doc_ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(doc_ids), 500):
+                batch = doc_ids[start:start + 500]
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT doc_id FROM rows WHERE doc_id IN ({', '.join('?' * len(batch))})", batch
+                ))
+        return found
+
+    def append(self, vectors: np.ndarray, rows: Sequence[Dict]) -> int:
+        """
+        Add rows at the end of the index; rows whose doc_id is already indexed are skipped.
+
+        Args:
+            vectors: (n, dim) embeddings, normalized here
+            rows: n dicts with doc_id, deck_hash, deck_name, slide_number, title and text
+
+        Returns:
+            int: Number of rows added
+        """
+        vectors = normalize_rows(np.array(vectors, dtype=np.float32, copy=True).reshape(len(rows), self.dim))
+        with self._lock:
+            existing = self.contains(row['doc_id'] for row in rows)
+            keep = [i for i, row in enumerate(rows) if row['doc_id'] not in existing]
+            if not keep:
+                return 0
+            vectors = vectors[keep]
+            rows = [rows[i] for i in keep]
+
+            # Drop trailing bytes of an interrupted append before writing after the committed rows
+            base = self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+            for path, row_bytes in ((self._vectors_path, self.dim * 4), (self._decks_path, 4)):
+                if os.path.exists(path) and os.path.getsize(path) > base * row_bytes:
+                    with open(path, "r+b") as f:
+                        f.truncate(base * row_bytes)
+
+            try:
+                for row in rows:
+                    if row['deck_hash'] not in self._deck_codes:
+                        cursor = self._conn.execute("INSERT INTO decks (deck_hash) VALUES (?)", (row['deck_hash'],))
+                        self._deck_codes[row['deck_hash']] = cursor.lastrowid
+                self._conn.executemany(
+                    f"INSERT INTO rows (row, {', '.join(ROW_COLUMNS)}) VALUES (?, {', '.join('?' * len(ROW_COLUMNS))})",
+                    [(base + i, *(row.get(column) for column in ROW_COLUMNS)) for i, row in enumerate(rows)]
+                )
+                deck_codes = np.array([self._deck_codes[row['deck_hash']] for row in rows], dtype=np.int32)
+                for path, data in ((self._vectors_path, vectors), (self._decks_path, deck_codes)):
+                    with open(path, "ab") as f:
+                        f.write(data.tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                # Rows become visible only with this commit
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._deck_codes = dict(self._conn.execute("SELECT deck_hash, deck_code FROM decks").fetchall())
+                self._load()
+                raise
+            self._load()
+        return len(rows)
+
+    def search(self, query_vectors: np.ndarray, k: int = retrieval_top_k,
+               deck_hashes: Optional[Iterable[str]] = None) -> List[List[Dict]]:
+        """
+        Top-k rows by cosine similarity for each query vector.
+
+        Args:
+            query_vectors: (q, dim) query embeddings
+            k: Results per query
+            deck_hashes: Only return rows of these decks (None: all decks)
+
+        Returns:
+            One list per query of row dicts (ROW_COLUMNS plus 'score'), best first
+        """
+        self.refresh()
+        queries = normalize_rows(np.array(query_vectors, dtype=np.float32, copy=True).reshape(-1, self.dim))
+        with self._lock:
+            vectors, deck_of_row, count = self._vectors, self._deck_of_row, self._count
+            allowed_codes = None
+            if deck_hashes is not None:
+                allowed_codes = np.array([self._deck_codes[h] for h in deck_hashes if h in self._deck_codes],
+                                         dtype=np.int32)
+        if not count or k <= 0 or (allowed_codes is not None and not len(allowed_codes)):
+            return [[] for _ in range(len(queries))]
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS])
+            scores = queries @ block.T
+            if allowed_codes is not None:
+                scores[:, ~np.isin(deck_of_row[start:start + len(block)], allowed_codes)] = -np.inf
+            top = min(k, scores.shape[1])
+            candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, candidates, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, candidates + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        wanted = sorted({int(row) for row, score in zip(best_rows.ravel(), best_scores.ravel()) if score > -np.inf})
+        metadata = self.get_rows(wanted)
+        return [
+            [{**metadata[int(row)], 'score': float(score)}
+             for row, score in zip(rows, scores) if score > -np.inf and int(row) in metadata]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    def get_rows(self, row_numbers: Sequence[int]) -> Dict[int, Dict]:
+        result = {}
+        with self._lock:
+            for start in range(0, len(row_numbers), 500):
+                batch = list(row_numbers[start:start + 500])
+                for values in self._conn.execute(
+                    f"SELECT row, {', '.join(ROW_COLUMNS)} FROM rows WHERE row IN ({', '.join('?' * len(batch))})",
+                    batch
+                ):
+                    result[values[0]] = dict(zip(ROW_COLUMNS, values[1:]))
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+            self._conn.close()
+
+
+_vector_index: Optional[VectorIndex] = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    """Get the process-wide vector index of common_assets.config, opened on first use."""
+    global _vector_index
+    if _vector_index is None:
+        with _vector_index_lock:
+            if _vector_index is None:
+                embedder = get_embedder()
+                _vector_index = VectorIndex(retrieval_index_dir, embedder.dim, embedder.name)
+    return _vector_index
+
+
+def set_vector_index(index: Optional[VectorIndex]) -> None:
+    """Replace the process-wide vector index (None opens the configured one on next use)."""
+    global _vector_index
+    with _vector_index_lock:
+        _vector_index = index
+
+
+def search_slides(queries: Sequence[str], k: int = retrieval_top_k,
+                  deck_hashes: Optional[Iterable[str]] = None, index: Optional[VectorIndex] = None,
+                  embedder=None) -> List[List[Dict]]:
+    """
+    Embed the query texts in one batch and search the index.
+
+    Returns:
+        One list of row dicts (with 'score') per query
+    """
+    index = index if index is not None else get_vector_index()
+    if not len(index):
+        index.refresh()
+        if not len(index):
+            return [[] for _ in queries]
+    embedder = embedder if embedder is not None else get_embedder()
+    return index.search(embedder.embed(list(queries)), k=k, deck_hashes=deck_hashes)
+
+
+def index_slide_documents(documents: Iterable[Dict], index: Optional[VectorIndex] = None, embedder=None,
+                          batch_size: int = 256) -> int:
+    """
+    Embed and append documents (see slide_documents.iter_slide_documents) not yet in the index.
+
+    Returns:
+        int: Number of rows added
+    """
+    index = index if index is not None else get_vector_index()
+    embedder = embedder if embedder is not None else get_embedder()
+    added = 0
+    batch: List[Dict] = []
+
+    def flush(batch):
+        existing = index.contains(doc['doc_id'] for doc in batch)
+        new_docs = [doc for doc in batch if doc['doc_id'] not in existing]
+        if not new_docs:
+            return 0
+        return index.append(embedder.embed([doc['text'] for doc in new_docs]), new_docs)
+
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            added += flush(batch)
+            batch = []
+    if batch:
+        added += flush(batch)
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the slide vector index.")
+    parser.add_argument("--build", action="store_true", help="Index analyzed slides from the ingestion store")
+    parser.add_argument("--ingestion-db", default=ingestion_sqlite_loc, help="Ingestion store (SQLite)")
+    parser.add_argument("--query", default=None, help="Search the index with this text")
+    parser.add_argument("--k", type=int, default=retrieval_top_k, help="Results per query")
+    parser.add_argument("--deck", action="append", default=None, help="Restrict search to a deck hash")
+    args = parser.parse_args(argv)
+
+    index = get_vector_index()
+    if args.build:
+        from backend.ingestion import IngestionStore
+        from .slide_documents import iter_slide_documents
+
+        store = IngestionStore(args.ingestion_db)
+        try:
+            added = index_slide_documents(iter_slide_documents(store), index)
+        finally:
+            store.close()
+        print(f"Added {added} slides; index holds {len(index)}")
+    if args.query:
+        for result in search_slides([args.query], k=args.k, deck_hashes=args.deck, index=index)[0]:
+            print(f"{result['score']:.3f}  {result['deck_name']} #{result['slide_number']}  {result['title']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
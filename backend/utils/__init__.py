@@ -5,15 +5,85 @@ Backend utility modules.
 from .dynamodb_helper import (
     get_dynamodb_table,
     save_thread_metadata,
+    upsert_thread_metadata,
     get_user_threads,
+    list_user_threads,
+    iter_user_threads,
     delete_user_threads,
-    get_thread_details
+    get_thread_details,
+    batch_get_thread_details,
+    batch_put_thread_metadata,
+    get_user_thread_summaries,
+    thread_item_to_summary,
+    batch_delete_thread_metadata
+)
+from .metadata_store import (
+    MetadataStore,
+    DynamoDBMetadataStore,
+    SqliteMetadataStore,
+    build_metadata_store,
+    get_metadata_store,
+    set_metadata_store
+)
+from .metadata_cache import MetadataCache, get_metadata_cache
+from .aws_clients import get_boto3_session, get_dynamodb_resource, get_dynamodb_client, set_dynamodb_resource, reset_aws_clients
+from .bulk_delete import BulkDeleteResult, bulk_delete_user_threads, delete_checkpoint_threads
+from .metadata_writer import MetadataWriteBehind, get_metadata_writer
+from .checkpoint_store import PooledSqliteSaver, open_sqlite_connection, sqlite_pragmas, get_latest_checkpoint_id
+from .tracing import span, traced, record_latency, get_latency_stats, dump_latency_stats, reset_latency_stats
+from .checkpoint_retention import (
+    CheckpointCompactor,
+    compact_checkpoints,
+    prune_thread_checkpoints,
+    get_thread_storage_report,
+    start_checkpoint_compactor
 )
 
 __all__ = [
     'get_dynamodb_table',
     'save_thread_metadata',
+    'upsert_thread_metadata',
     'get_user_threads',
+    'list_user_threads',
+    'iter_user_threads',
     'delete_user_threads',
-    'get_thread_details'
+    'get_thread_details',
+    'batch_get_thread_details',
+    'batch_put_thread_metadata',
+    'get_user_thread_summaries',
+    'thread_item_to_summary',
+    'batch_delete_thread_metadata',
+    'MetadataStore',
+    'DynamoDBMetadataStore',
+    'SqliteMetadataStore',
+    'build_metadata_store',
+    'get_metadata_store',
+    'set_metadata_store',
+    'MetadataCache',
+    'get_metadata_cache',
+    'BulkDeleteResult',
+    'bulk_delete_user_threads',
+    'delete_checkpoint_threads',
+    'MetadataWriteBehind',
+    'get_metadata_writer',
+    'get_boto3_session',
+    'get_dynamodb_resource',
+    'get_dynamodb_client',
+    'set_dynamodb_resource',
+    'reset_aws_clients',
+    'PooledSqliteSaver',
+    'open_sqlite_connection',
+    'sqlite_pragmas',
+    'get_latest_checkpoint_id',
+    'span',
+    'traced',
+    'record_latency',
+    'get_latency_stats',
+    'dump_latency_stats',
+    'reset_latency_stats',
+    'CheckpointCompactor',
+    'compact_checkpoints',
+    'prune_thread_checkpoints',
+    'get_thread_storage_report',
+    'start_checkpoint_compactor'
 ]
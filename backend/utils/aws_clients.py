@@ -0,0 +1,135 @@
+"""
+Process-wide, thread-safe provider for AWS clients.
+
+The boto3 session, DynamoDB resource and Table objects are built once and
+reused, so credentials, endpoints and HTTPS connections are resolved a single
+time per process instead of on every helper call. boto3 itself is only
+imported on first use, keeping it off the import path of the app.
+"""
+
+import threading
+from typing import Dict
+
+from common_assets.config import (
+    dynamodb_table_name,
+    dynamodb_endpoint_url,
+    dynamodb_max_pool_connections,
+    dynamodb_connect_timeout,
+    dynamodb_read_timeout,
+    dynamodb_retry_mode,
+    dynamodb_max_attempts
+)
+
+_lock = threading.Lock()
+_session = None
+_dynamodb_resource = None
+_tables: Dict[str, object] = {}
+
+
+def get_boto3_session():
+    """
+    Get the shared boto3 session, creating it on first use.
+
+    Returns:
+        boto3 Session
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+                _session = boto3.session.Session()
+    return _session
+
+
+def get_dynamodb_resource():
+    """
+    Get the shared DynamoDB service resource.
+
+    The underlying client is configured with the connection pool size,
+    timeouts, retry mode and optional endpoint override from common_assets.config.
+    Its methods are safe to call from several threads.
+
+    Returns:
+        DynamoDB ServiceResource
+    """
+    global _dynamodb_resource
+    if _dynamodb_resource is None:
+        session = get_boto3_session()
+        with _lock:
+            if _dynamodb_resource is None:
+                from botocore.config import Config
+                client_config = Config(
+                    max_pool_connections=dynamodb_max_pool_connections,
+                    connect_timeout=dynamodb_connect_timeout,
+                    read_timeout=dynamodb_read_timeout,
+                    retries={'mode': dynamodb_retry_mode, 'max_attempts': dynamodb_max_attempts}
+                )
+                _dynamodb_resource = session.resource(
+                    'dynamodb',
+                    endpoint_url=dynamodb_endpoint_url,
+                    config=client_config
+                )
+    return _dynamodb_resource
+
+
+def get_dynamodb_client():
+    """
+    Get the low-level client behind the shared DynamoDB resource.
+
+    It accepts plain Python values (no type descriptors), like the Table API.
+
+    Returns:
+        DynamoDB client
+    """
+    return get_dynamodb_resource().meta.client
+
+
+def get_dynamodb_table(table_name: str = dynamodb_table_name):
+    """
+    Get a cached DynamoDB Table resource.
+
+    Args:
+        table_name: Name of the table (default: metadata table from config)
+
+    Returns:
+        DynamoDB Table resource
+    """
+    table = _tables.get(table_name)
+    if table is None:
+        dynamodb = get_dynamodb_resource()
+        with _lock:
+            table = _tables.get(table_name)
+            if table is None:
+                table = dynamodb.Table(table_name)
+                _tables[table_name] = table
+    return table
+
+
+def set_dynamodb_resource(resource) -> None:
+    """
+    Use the given object as the shared DynamoDB resource instead of a boto3 one.
+
+    It must provide Table(name) and meta.client like a boto3 ServiceResource;
+    benchmarks use it to run against an in-memory stand-in.
+
+    Args:
+        resource: DynamoDB resource replacement, or None to build the boto3 one on next use
+    """
+    global _dynamodb_resource
+    with _lock:
+        _dynamodb_resource = resource
+        _tables.clear()
+
+
+def reset_aws_clients() -> None:
+    """
+    Drop the cached session, resource and tables.
+
+    The next call rebuilds them, e.g. after changing credentials or the endpoint.
+    """
+    global _session, _dynamodb_resource
+    with _lock:
+        _session = None
+        _dynamodb_resource = None
+        _tables.clear()
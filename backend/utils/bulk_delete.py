@@ -0,0 +1,115 @@
+"""
+Bulk deletion of a user's threads across the SQLite checkpointer and DynamoDB.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Callable
+
+from .dynamodb_helper import get_user_threads, batch_delete_thread_metadata
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+SQLITE_DELETE_CHUNK_SIZE = 500
+
+
+@dataclass
+class BulkDeleteResult:
+    """
+    Outcome of a bulk thread deletion.
+
+    Attributes:
+        total: Number of threads that were requested to be deleted
+        checkpoints_deleted: Thread IDs whose checkpoints were removed
+        metadata_deleted: Thread IDs whose DynamoDB metadata was removed
+        failed: Thread IDs that could not be fully deleted, with the reason
+    """
+    total: int = 0
+    checkpoints_deleted: List[str] = field(default_factory=list)
+    metadata_deleted: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def delete_checkpoint_threads(checkpointer, thread_ids: List[str],
+                              progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
+    """
+    Delete every checkpoint and pending write of the given threads in one SQLite transaction.
+
+    Either all rows are removed or none are; an exception is raised on failure
+    after rolling back.
+
+    Args:
+        checkpointer: SqliteSaver (or subclass) holding the checkpoints
+        thread_ids: Thread identifiers to delete
+        progress_callback: Optional callable(done, total) invoked after each chunk
+    """
+    total = len(thread_ids)
+    if not total:
+        return
+
+    checkpointer.setup()
+    with checkpointer.lock:
+        conn = checkpointer.conn
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for start in range(0, total, SQLITE_DELETE_CHUNK_SIZE):
+                chunk = [str(thread_id) for thread_id in thread_ids[start:start + SQLITE_DELETE_CHUNK_SIZE]]
+                placeholders = ",".join("?" * len(chunk))
+                cur.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({placeholders})", chunk)
+                cur.execute(f"DELETE FROM writes WHERE thread_id IN ({placeholders})", chunk)
+                if progress_callback:
+                    progress_callback(min(start + len(chunk), total), total)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def bulk_delete_user_threads(user_id: str, checkpointer,
+                             progress_callback: Optional[Callable[[str, int, int], None]] = None) -> BulkDeleteResult:
+    """
+    Delete all threads of a user: checkpoints first, then DynamoDB metadata.
+
+    Checkpoints are removed in a single transaction. Metadata is only deleted
+    once the checkpoints are gone, so a failed run leaves threads listed in
+    the sidebar and the deletion can simply be retried.
+
+    Args:
+        user_id: User identifier
+        checkpointer: SqliteSaver (or subclass) holding the checkpoints
+        progress_callback: Optional callable(stage, done, total), stage being
+                           'checkpoints' or 'metadata'
+
+    Returns:
+        BulkDeleteResult describing what was deleted and what failed
+    """
+    thread_ids = get_user_threads(user_id)
+    result = BulkDeleteResult(total=len(thread_ids))
+    if not thread_ids:
+        return result
+
+    def stage_progress(stage):
+        if progress_callback is None:
+            return None
+        return lambda done, total: progress_callback(stage, done, total)
+
+    try:
+        delete_checkpoint_threads(checkpointer, thread_ids, progress_callback=stage_progress('checkpoints'))
+        result.checkpoints_deleted = list(thread_ids)
+    except Exception as e:
+        print(f"Error deleting checkpoints: {e}")
+        result.failed = {thread_id: f"Checkpoint deletion failed: {e}" for thread_id in thread_ids}
+        return result
+
+    deleted, failed = batch_delete_thread_metadata(user_id, thread_ids, progress_callback=stage_progress('metadata'))
+    result.metadata_deleted = deleted
+    result.failed.update(failed)
+    return result
@@ -0,0 +1,279 @@
+"""
+Retention and compaction for the checkpoint database.
+
+Every super-step of a graph run writes a checkpoint carrying the whole
+message history, so the database grows roughly quadratically with the length
+of a conversation. This module keeps only the latest checkpoints per thread,
+drops intermediate subgraph checkpoints and pending writes, and returns freed
+pages to the filesystem with incremental VACUUM.
+
+It can run inside the app as a background thread (CheckpointCompactor) or
+from the command line:
+
+    python -m backend.utils.checkpoint_retention --keep 5 --vacuum --report
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from common_assets.config import checkpoint_sqlitite_loc, checkpoint_keep_last, checkpoint_compaction_interval_s
+from .checkpoint_store import open_sqlite_connection
+
+logger = logging.getLogger("docfliq.checkpoint_retention")
+
+
+def list_checkpoint_threads(conn: sqlite3.Connection) -> List[str]:
+    """
+    Get every thread ID that has checkpoints.
+
+    Args:
+        conn: Connection to the checkpoint database
+
+    Returns:
+        List of thread IDs
+    """
+    rows = conn.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall()
+    return [row[0] for row in rows]
+
+
+def prune_thread_checkpoints(conn: sqlite3.Connection, thread_id: str,
+                             keep_last: int = checkpoint_keep_last) -> Dict[str, int]:
+    """
+    Apply the retention policy to one thread in a single transaction.
+
+    - Root checkpoints: only the keep_last most recent are kept.
+    - Subgraph checkpoints (non-empty checkpoint_ns): dropped once a newer root
+      checkpoint exists, i.e. once the subgraph run has completed.
+    - Pending writes: only kept for the latest checkpoint of each namespace.
+
+    Checkpoint IDs are time-ordered, so "most recent" is the largest ID.
+
+    Args:
+        conn: Connection to the checkpoint database
+        thread_id: Thread identifier
+        keep_last: Number of root checkpoints to keep (at least 1)
+
+    Returns:
+        Dict with the number of checkpoints and writes deleted
+    """
+    keep_last = max(1, int(keep_last))
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            """DELETE FROM checkpoints
+               WHERE thread_id = ? AND checkpoint_ns = '' AND checkpoint_id NOT IN (
+                   SELECT checkpoint_id FROM checkpoints
+                   WHERE thread_id = ? AND checkpoint_ns = ''
+                   ORDER BY checkpoint_id DESC LIMIT ?)""",
+            (thread_id, thread_id, keep_last)
+        )
+        checkpoints_deleted = cur.rowcount
+        cur.execute(
+            """DELETE FROM checkpoints
+               WHERE thread_id = ? AND checkpoint_ns != '' AND checkpoint_id < (
+                   SELECT MAX(checkpoint_id) FROM checkpoints
+                   WHERE thread_id = ? AND checkpoint_ns = '')""",
+            (thread_id, thread_id)
+        )
+        checkpoints_deleted += cur.rowcount
+        cur.execute(
+            """DELETE FROM writes
+               WHERE thread_id = ? AND (checkpoint_ns, checkpoint_id) NOT IN (
+                   SELECT checkpoint_ns, MAX(checkpoint_id) FROM checkpoints
+                   WHERE thread_id = ? GROUP BY checkpoint_ns)""",
+            (thread_id, thread_id)
+        )
+        writes_deleted = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return {'checkpoints_deleted': checkpoints_deleted, 'writes_deleted': writes_deleted}
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: Optional[int] = None) -> int:
+    """
+    Return free pages to the filesystem.
+
+    Only has an effect on databases created with auto_vacuum=INCREMENTAL
+    (see convert_to_incremental_vacuum for older files).
+
+    Args:
+        conn: Connection to the checkpoint database
+        pages: Maximum number of pages to free, None for all
+
+    Returns:
+        Number of pages freed
+    """
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if pages:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    else:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
+
+
+def convert_to_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Switch an existing database to auto_vacuum=INCREMENTAL.
+
+    Requires a full VACUUM, which rewrites the file and blocks writers while it runs.
+    """
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def get_thread_storage_report(conn: sqlite3.Connection) -> List[Dict]:
+    """
+    Report checkpoint storage used by each thread, largest first.
+
+    Args:
+        conn: Connection to the checkpoint database
+
+    Returns:
+        List of dicts with thread_id, checkpoints, writes and bytes
+    """
+    report: Dict[str, Dict] = {}
+    rows = conn.execute(
+        """SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + IFNULL(LENGTH(metadata), 0))
+           FROM checkpoints GROUP BY thread_id"""
+    ).fetchall()
+    for thread_id, count, size in rows:
+        report[thread_id] = {'thread_id': thread_id, 'checkpoints': count, 'writes': 0, 'bytes': size or 0}
+    rows = conn.execute(
+        "SELECT thread_id, COUNT(*), SUM(IFNULL(LENGTH(value), 0)) FROM writes GROUP BY thread_id"
+    ).fetchall()
+    for thread_id, count, size in rows:
+        entry = report.setdefault(thread_id, {'thread_id': thread_id, 'checkpoints': 0, 'writes': 0, 'bytes': 0})
+        entry['writes'] = count
+        entry['bytes'] += size or 0
+    return sorted(report.values(), key=lambda entry: entry['bytes'], reverse=True)
+
+
+def compact_checkpoints(conn: sqlite3.Connection, keep_last: int = checkpoint_keep_last,
+                        thread_ids: Optional[List[str]] = None, vacuum: bool = True,
+                        lock: Optional[threading.Lock] = None) -> Dict[str, int]:
+    """
+    Prune every thread (one short transaction each) and optionally vacuum.
+
+    Args:
+        conn: Connection to the checkpoint database
+        keep_last: Number of root checkpoints to keep per thread
+        thread_ids: Threads to prune, None for all
+        vacuum: Whether to run an incremental VACUUM afterwards
+        lock: Lock guarding conn when it is shared, e.g. the checkpointer's writer lock;
+              it is released between threads so chat turns are not held up
+
+    Returns:
+        Dict with totals of threads, checkpoints and writes deleted, and pages freed
+    """
+    lock = lock or threading.Lock()
+    if thread_ids is None:
+        with lock:
+            thread_ids = list_checkpoint_threads(conn)
+
+    totals = {'threads': 0, 'checkpoints_deleted': 0, 'writes_deleted': 0, 'pages_freed': 0}
+    for thread_id in thread_ids:
+        with lock:
+            counts = prune_thread_checkpoints(conn, thread_id, keep_last=keep_last)
+        totals['threads'] += 1
+        totals['checkpoints_deleted'] += counts['checkpoints_deleted']
+        totals['writes_deleted'] += counts['writes_deleted']
+
+    if vacuum:
+        with lock:
+            totals['pages_freed'] = incremental_vacuum(conn)
+    return totals
+
+
+class CheckpointCompactor:
+    """
+    Background thread that periodically compacts a checkpointer's database.
+    """
+
+    def __init__(self, checkpointer, keep_last: int = checkpoint_keep_last,
+                 interval_s: float = checkpoint_compaction_interval_s):
+        self.checkpointer = checkpointer
+        self.keep_last = keep_last
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-compactor", daemon=True)
+
+    def start(self) -> "CheckpointCompactor":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def run_once(self) -> Dict[str, int]:
+        self.checkpointer.setup()
+        return compact_checkpoints(self.checkpointer.conn, keep_last=self.keep_last, lock=self.checkpointer.lock)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                totals = self.run_once()
+                logger.info("Checkpoint compaction: %s", totals)
+            except Exception:
+                logger.exception("Error compacting checkpoints")
+
+
+_compactors: Dict[str, CheckpointCompactor] = {}
+_compactors_lock = threading.Lock()
+
+
+def start_checkpoint_compactor(checkpointer) -> Optional[CheckpointCompactor]:
+    """
+    Start the background compactor for a checkpointer's database, once per database file.
+
+    Does nothing when checkpoint_compaction_interval_s is not set.
+
+    Returns:
+        The running CheckpointCompactor, or None if compaction is disabled
+    """
+    if not checkpoint_compaction_interval_s:
+        return None
+    db_path = getattr(checkpointer, 'db_path', checkpoint_sqlitite_loc)
+    with _compactors_lock:
+        if db_path not in _compactors:
+            _compactors[db_path] = CheckpointCompactor(checkpointer).start()
+        return _compactors[db_path]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prune and vacuum the LangGraph checkpoint database.")
+    parser.add_argument("--db", default=checkpoint_sqlitite_loc, help="Path of the checkpoint database")
+    parser.add_argument("--keep", type=int, default=checkpoint_keep_last, help="Root checkpoints to keep per thread")
+    parser.add_argument("--thread", action="append", dest="thread_ids", help="Only prune this thread (repeatable)")
+    parser.add_argument("--vacuum", action="store_true", help="Run an incremental VACUUM after pruning")
+    parser.add_argument("--convert", action="store_true",
+                        help="Switch an existing database to auto_vacuum=INCREMENTAL (full VACUUM)")
+    parser.add_argument("--report", action="store_true", help="Print per-thread storage size as JSON")
+    parser.add_argument("--report-only", action="store_true", help="Only print the report, do not prune")
+    args = parser.parse_args(argv)
+
+    conn = open_sqlite_connection(args.db)
+    try:
+        if args.convert:
+            convert_to_incremental_vacuum(conn)
+        if not args.report_only:
+            totals = compact_checkpoints(conn, keep_last=args.keep, thread_ids=args.thread_ids, vacuum=args.vacuum)
+            print(json.dumps(totals))
+        if args.report or args.report_only:
+            print(json.dumps(get_thread_storage_report(conn), indent=2))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+SQLite storage layer for LangGraph checkpoints.
+
+Connections are opened in WAL mode with tuned pragmas and a busy timeout.
+PooledSqliteSaver keeps a single writer connection (transactions start with
+BEGIN IMMEDIATE so concurrent writers, including other processes on the same
+host, queue on the busy timeout instead of failing) and a pool of read-only
+connections so reads never wait behind the writer lock.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from langgraph.checkpoint.base import CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.utils import load_pending_writes, pending_writes_sql, search_where
+
+from .tracing import span
+
+from common_assets.config import (
+    checkpoint_sqlite_busy_timeout_ms,
+    checkpoint_sqlite_synchronous,
+    checkpoint_sqlite_cache_size_kib,
+    checkpoint_sqlite_mmap_size,
+    checkpoint_sqlite_read_pool_size
+)
+
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    PRAGMA statements applied to every checkpoint database connection.
+
+    Args:
+        read_only: Whether the connection is only used for reads
+
+    Returns:
+        List of PRAGMA statements
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout={int(checkpoint_sqlite_busy_timeout_ms)}",
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={checkpoint_sqlite_synchronous}",
+        f"PRAGMA cache_size=-{int(checkpoint_sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size={int(checkpoint_sqlite_mmap_size)}",
+        "PRAGMA temp_store=MEMORY"
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # Only takes effect on a new database file, before any table is created
+        pragmas.insert(0, "PRAGMA auto_vacuum=INCREMENTAL")
+    return pragmas
+
+
+def open_sqlite_connection(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open a connection to the checkpoint database with the tuned pragmas applied.
+
+    The parent directory is created if needed. The connection can be shared
+    between threads; callers are responsible for serializing its use.
+
+    Args:
+        db_path: Path of the SQLite database file
+        read_only: Whether the connection is only used for reads
+
+    Returns:
+        sqlite3 Connection
+    """
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        timeout=checkpoint_sqlite_busy_timeout_ms / 1000
+    )
+    for pragma in sqlite_pragmas(read_only=read_only):
+        conn.execute(pragma)
+    return conn
+
+
+class PooledSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver with a single writer connection and a pool of reader connections.
+
+    Writes (put, put_writes, delete_thread) are serialized on the writer and
+    run inside BEGIN IMMEDIATE transactions. Reads (get_tuple, list) borrow a
+    read-only connection from the pool; under WAL they see the last committed
+    state and do not block, nor are blocked by, the writer.
+    """
+
+    def __init__(self, db_path: str, read_pool_size: int = checkpoint_sqlite_read_pool_size, serde=None):
+        super().__init__(open_sqlite_connection(db_path), serde=serde)
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self._read_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._read_created = 0
+        self._read_pool_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        with self.lock:
+            if not self.is_setup:
+                super().setup()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        self.setup()
+        if not transaction:
+            with self.read_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    yield cur
+                finally:
+                    cur.close()
+            return
+
+        with self.lock:
+            cur = self.conn.cursor()
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                yield cur
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+            finally:
+                cur.close()
+
+    def get_tuple(self, config):
+        with span("checkpoint.get_tuple"):
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter: Optional[Dict[str, Any]] = None, before=None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints, newest first, like SqliteSaver.list.
+
+        Upstream reads the pending writes through a second cursor on the writer
+        connection without the writer lock, so it can run inside another
+        thread's BEGIN IMMEDIATE transaction and see its uncommitted rows. Here
+        both cursors come from one pooled reader connection.
+        """
+        where, param_values = search_where(config, filter, before)
+        query = f"""SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata
+                    FROM checkpoints {where} ORDER BY checkpoint_id DESC"""
+        if limit is not None:
+            query += " LIMIT ?"
+            param_values = (*param_values, limit)
+        self.setup()
+        with self.read_connection() as conn, closing(conn.cursor()) as cur, closing(conn.cursor()) as wcur:
+            cur.execute(query, param_values)
+            for thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata in cur:
+                wcur.execute(pending_writes_sql(self._has_task_path), (thread_id, checkpoint_ns, checkpoint_id))
+                parent_config = {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id
+                    }
+                } if parent_checkpoint_id else None
+                yield CheckpointTuple(
+                    {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                      "checkpoint_id": checkpoint_id}},
+                    self.serde.loads_typed((type_, checkpoint)),
+                    json.loads(metadata) if metadata is not None else {},
+                    parent_config,
+                    load_pending_writes(wcur, self.serde)
+                )
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with span("checkpoint.put"):
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path: str = ""):
+        with span("checkpoint.put_writes", writes=len(writes)):
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with span("checkpoint.delete_thread"):
+            return super().delete_thread(thread_id)
+
+    @contextmanager
+    def read_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read-only connection from the pool.
+
+        Blocks when read_pool_size connections are already in use.
+        """
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._read_pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._read_pool_lock:
+            if self._read_created < self.read_pool_size:
+                self._read_created += 1
+                return open_sqlite_connection(self.db_path, read_only=True)
+        return self._read_pool.get()
+
+    def close(self) -> None:
+        """Close the writer and every pooled reader connection."""
+        with self.lock:
+            self.conn.close()
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_latest_checkpoint_id(checkpointer: SqliteSaver, thread_id: str, checkpoint_ns: str = "") -> Optional[str]:
+    """
+    Get the ID of a thread's latest checkpoint without loading the checkpoint itself.
+
+    Checkpoint IDs are time-ordered, so the latest is the largest.
+
+    Args:
+        checkpointer: SqliteSaver (or subclass) holding the checkpoints
+        thread_id: Thread identifier
+        checkpoint_ns: Checkpoint namespace ('' for the root graph)
+
+    Returns:
+        Checkpoint ID, or None if the thread has no checkpoint
+    """
+    with checkpointer.cursor(transaction=False) as cur:
+        row = cur.execute(
+            """SELECT checkpoint_id FROM checkpoints
+               WHERE thread_id = ? AND checkpoint_ns = ?
+               ORDER BY checkpoint_id DESC LIMIT 1""",
+            (str(thread_id), checkpoint_ns)
+        ).fetchone()
+    return row[0] if row else None
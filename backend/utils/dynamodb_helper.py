@@ -1,90 +1,142 @@
 """
 DynamoDB helper functions for thread metadata management.
+
+The functions keep their DynamoDB-era names, but the storage itself is the
+backend returned by get_metadata_store() (DynamoDB or the local SQLite
+table, see metadata_store). Reads go through the in-process metadata cache,
+which every write here keeps up to date (see metadata_cache).
 """
 
 from datetime import datetime
-from typing import List, Dict, Optional
-import boto3
-from boto3.dynamodb.conditions import Key
-from common_assets.config import dynamodb_table_name
+from typing import List, Dict, Optional, Iterator, Tuple, Callable
+from common_assets.config import dynamodb_table_name, sidebar_page_size
+from .aws_clients import get_dynamodb_table as get_shared_dynamodb_table
+from .metadata_store import get_metadata_store
+from .metadata_cache import get_metadata_cache, MISSING
+from .tracing import traced
 
 
 def get_dynamodb_table():
     """
     Get DynamoDB table resource.
 
+    The table comes from the process-wide provider in aws_clients, so the
+    session, credentials and connection pool are reused across calls.
+
     Returns:
         DynamoDB Table resource
     """
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(dynamodb_table_name)
+    table = get_shared_dynamodb_table(dynamodb_table_name)
     return table
 
 
-def save_thread_metadata(user_id: str, thread_id: str, chat_mode: str, new_thread : bool) -> bool:
+@traced("dynamodb.upsert_thread_metadata")
+def upsert_thread_metadata(user_id: str, thread_id: str, chat_mode: str, new_thread : bool,
+                           first_message: Optional[str] = None, message_count: Optional[int] = None,
+                           last_message_preview: Optional[str] = None) -> Optional[Dict]:
     """
-    Save or update thread metadata in DynamoDB.
-    If thread exists, only updates update_date.
-    If thread is new, creates with created_date and update_date.
+    Save or update thread metadata in DynamoDB with a single upsert.
+    Always sets update_date and the thread summary fields.
+    created_date, chat_mode and first_message are only set if missing, so a new
+    thread gets them on its first write and an existing thread keeps them.
+
+    The summary fields (first_message, message_count, last_message_preview) are
+    denormalized onto the thread item so the sidebar can be built from a single
+    query without opening any checkpoint.
 
     Args:
         user_id: User identifier
         thread_id: Thread identifier
         chat_mode: Chat mode (default: "QnA")
+        new_thread: Whether the front-end believes this is a new thread
+        first_message: First human message of the thread
+        message_count: Number of messages in the thread after this turn
+        last_message_preview: Truncated content of the latest message
 
     Returns:
-        True if successful, False otherwise
+        The thread item as stored after the write, None if the write failed
     """
     try:
-        table = get_dynamodb_table()
         current_time = datetime.now().isoformat()
-
-        # Check if thread exists
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'thread_id': thread_id
-            }
+        item = get_metadata_store().upsert_thread(
+            user_id, thread_id, chat_mode, current_time, first_message=first_message,
+            message_count=message_count, last_message_preview=last_message_preview
         )
 
-        if 'Item' in response:
-            ### Ideally new-thread should not be False here
-            if new_thread:
-                print('New Thread = True sent by Front-end, but backend thread_id already existed')
-            # Thread exists - only update update_date
-            table.update_item(
-                Key={
-                    'user_id': user_id,
-                    'thread_id': thread_id
-                },
-                UpdateExpression='SET update_date = :update_date',
-                ExpressionAttributeValues={
-                    ':update_date': current_time
-                }
-            )
-        else:
-            if not new_thread:
-                print('New Thread = False sent by Front-end, but backend thread_id did not exis')
-
-            # New thread - create with all fields
-            table.put_item(
-                Item={
-                    'user_id': user_id,
-                    'thread_id': thread_id,
-                    'chat_mode': chat_mode,
-                    'created_date': current_time,
-                    'update_date': current_time
-                }
-            )
-        return True
+        # created_date equals this write's timestamp only when the item was just created
+        created_now = item.get('created_date') == current_time
+        if new_thread and not created_now:
+            print('New Thread = True sent by Front-end, but backend thread_id already existed')
+        elif not new_thread and created_now:
+            print('New Thread = False sent by Front-end, but backend thread_id did not exis')
+        get_metadata_cache().put(user_id, thread_id, item)
+        return item
     except Exception as e:
         print(f"Error saving thread metadata: {e}")
-        return False
+        return None
+
+
+def save_thread_metadata(user_id: str, thread_id: str, chat_mode: str, new_thread : bool,
+                         first_message: Optional[str] = None, message_count: Optional[int] = None,
+                         last_message_preview: Optional[str] = None) -> bool:
+    """
+    Save or update thread metadata in DynamoDB (see upsert_thread_metadata).
+
+    Returns:
+        True if successful, False otherwise
+    """
+    item = upsert_thread_metadata(user_id, thread_id, chat_mode, new_thread, first_message=first_message,
+                                  message_count=message_count, last_message_preview=last_message_preview)
+    return item is not None
+
+
+@traced("dynamodb.list_user_threads")
+def list_user_threads(user_id: str, page_size: int = sidebar_page_size,
+                      cursor: Optional[Dict] = None) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Get one page of thread metadata items for a user, most recently updated first.
+
+    Uses the update_date index (the DynamoDB GSI, or the SQLite index on
+    user_id, update_date) so the page comes back already ordered by recency.
+
+    Args:
+        user_id: User identifier
+        page_size: Maximum number of threads to return
+        cursor: Cursor returned by the previous page, None for the first page
+
+    Returns:
+        Tuple of (list of thread items, cursor for the next page or None if exhausted)
+    """
+    items, next_cursor = get_metadata_store().list_threads(user_id, page_size, cursor=cursor)
+    # Warms the cache for the detail lookups that follow a sidebar load
+    get_metadata_cache().put_many(items)
+    return items, next_cursor
+
+
+def iter_user_threads(user_id: str, page_size: int = sidebar_page_size) -> Iterator[Dict]:
+    """
+    Stream every thread metadata item for a user, most recently updated first.
+
+    Follows LastEvaluatedKey so large accounts are not truncated at 1 MB.
+
+    Args:
+        user_id: User identifier
+        page_size: Number of items fetched per query
+
+    Yields:
+        Thread metadata items
+    """
+    cursor = None
+    while True:
+        items, cursor = list_user_threads(user_id, page_size=page_size, cursor=cursor)
+        yield from items
+        if not cursor:
+            break
 
 
 def get_user_threads(user_id: str) -> List[str]:
     """
-    Get all thread IDs for a specific user from DynamoDB.
+    Get all thread IDs for a specific user from DynamoDB, most recent first.
 
     Args:
         user_id: User identifier
@@ -93,36 +145,129 @@ def get_user_threads(user_id: str) -> List[str]:
         List of thread IDs for the user
     """
     try:
-        table = get_dynamodb_table()
-        response = table.query(
-            KeyConditionExpression=Key('user_id').eq(user_id)
-        )
-
-        thread_ids = [item['thread_id'] for item in response.get('Items', [])]
+        thread_ids = [item['thread_id'] for item in iter_user_threads(user_id)]
         return thread_ids
     except Exception as e:
         print(f"Error getting user threads: {e}")
         return []
 
 
+@traced("dynamodb.get_thread_details")
 def get_thread_details(user_id: str,thread_id:str):
     try:
-        table = get_dynamodb_table()
-        response = table.get_item(
-            Key={
-                'user_id':user_id,
-                'thread_id': thread_id
-            }
-        )
-        if (not 'Item' in response):
+        cache = get_metadata_cache()
+        item = cache.get(user_id, thread_id)
+        if item is None:
+            item = get_metadata_store().get_thread(user_id, thread_id)
+            cache.put(user_id, thread_id, item)
+        if (not item) or item is MISSING:
             return False
         else:
-            return response['Item']
+            return item
     except:
         return False
 
 
+@traced("dynamodb.batch_get_thread_details")
+def batch_get_thread_details(user_id: str, thread_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Get the metadata items of many threads in as few requests as possible.
 
+    Args:
+        user_id: User identifier
+        thread_ids: Thread identifiers
+
+    Returns:
+        Dict mapping thread_id to its item; threads that don't exist are left out
+    """
+    try:
+        cache = get_metadata_cache()
+        items = {}
+        to_fetch = []
+        for thread_id in thread_ids:
+            item = cache.get(user_id, thread_id)
+            if item is None:
+                to_fetch.append(thread_id)
+            elif item is not MISSING:
+                items[thread_id] = item
+        if to_fetch:
+            fetched = get_metadata_store().batch_get_threads(user_id, to_fetch)
+            for thread_id in to_fetch:
+                cache.put(user_id, thread_id, fetched.get(thread_id))
+            items.update(fetched)
+        return items
+    except Exception as e:
+        print(f"Error batch getting thread metadata: {e}")
+        return {}
+
+
+@traced("dynamodb.batch_put_thread_metadata")
+def batch_put_thread_metadata(items: List[Dict]) -> bool:
+    """
+    Write many complete thread metadata items, replacing existing ones (e.g. imports, migrations).
+
+    Args:
+        items: Items with at least user_id and thread_id
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        get_metadata_store().batch_put_threads(items)
+        get_metadata_cache().put_many(items)
+        return True
+    except Exception as e:
+        print(f"Error batch saving thread metadata: {e}")
+        return False
+
+
+def thread_item_to_summary(item: Dict) -> Dict:
+    """
+    Convert a thread metadata item into a sidebar summary entry.
+
+    Items written before the summary fields existed fall back to the
+    thread_id as label, so no checkpoint has to be opened.
+
+    Args:
+        item: Thread metadata item as stored in DynamoDB
+
+    Returns:
+        Dict with first_message, chat_mode, created_date, update_date,
+        message_count and last_message_preview
+    """
+    return {
+        'first_message': item.get('first_message') or item['thread_id'],
+        'chat_mode': item['chat_mode'] if 'chat_mode' in item else item['mode'],
+        'created_date': item['created_date'],
+        'update_date': item['update_date'],
+        'message_count': int(item.get('message_count', 0)),
+        'last_message_preview': item.get('last_message_preview', '')
+    }
+
+
+def get_user_thread_summaries(user_id: str, page_size: int = sidebar_page_size,
+                              cursor: Optional[Dict] = None) -> Tuple[Dict[str, Dict], Optional[Dict]]:
+    """
+    Get one page of thread summary entries for a user, most recent first.
+
+    Args:
+        user_id: User identifier
+        page_size: Maximum number of threads to return
+        cursor: Cursor returned by the previous page, None for the first page
+
+    Returns:
+        Tuple of (dict mapping thread_id to its summary entry, cursor for the next page or None)
+    """
+    try:
+        items, next_cursor = list_user_threads(user_id, page_size=page_size, cursor=cursor)
+        return {item['thread_id']: thread_item_to_summary(item) for item in items}, next_cursor
+    except Exception as e:
+        print(f"Error getting user thread summaries: {e}")
+        return {}, None
+
+
+
+@traced("dynamodb.delete_thread_metadata")
 def delete_thread_metadata(user_id: str, thread_id: str) -> bool:
     """
     Delete a single thread's metadata from DynamoDB.
@@ -135,19 +280,63 @@ def delete_thread_metadata(user_id: str, thread_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        table = get_dynamodb_table()
-        table.delete_item(
-            Key={
-                'user_id': user_id,
-                'thread_id': thread_id
-            }
-        )
+        get_metadata_store().delete_thread(user_id, thread_id)
+        get_metadata_cache().invalidate(user_id, [thread_id])
         return True
     except Exception as e:
         print(f"Error deleting thread metadata: {e}")
         return False
 
 
+@traced("dynamodb.batch_delete_thread_metadata")
+def batch_delete_thread_metadata(user_id: str, thread_ids: List[str],
+                                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                                 max_retries: int = 5) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Delete the metadata of many threads in batches.
+
+    Batches hold the store's batch_size threads (25 per BatchWriteItem on
+    DynamoDB, one transaction of up to 500 on SQLite). UnprocessedItems
+    returned by DynamoDB are retried with exponential backoff; whatever is
+    still unprocessed after max_retries is reported as failed instead of
+    aborting the whole run.
+
+    Args:
+        user_id: User identifier
+        thread_ids: Thread identifiers to delete
+        progress_callback: Optional callable(done, total) invoked after each batch
+        max_retries: Number of retries for unprocessed items of a batch
+
+    Returns:
+        Tuple of (deleted thread IDs, dict mapping failed thread ID to error message)
+    """
+    deleted = []
+    failed = {}
+    total = len(thread_ids)
+    if not total:
+        return deleted, failed
+
+    store = get_metadata_store()
+
+    for start in range(0, total, store.batch_size):
+        batch = thread_ids[start:start + store.batch_size]
+        try:
+            batch_deleted, batch_failed = store.batch_delete_threads(user_id, batch, max_retries=max_retries)
+            deleted.extend(batch_deleted)
+            failed.update(batch_failed)
+        except Exception as e:
+            print(f"Error batch deleting thread metadata: {e}")
+            for thread_id in batch:
+                failed[thread_id] = str(e)
+        # Failed deletes may have been partly applied, so they are dropped from the cache as well
+        get_metadata_cache().invalidate(user_id, batch)
+
+        if progress_callback:
+            progress_callback(min(start + len(batch), total), total)
+
+    return deleted, failed
+
+
 def delete_user_threads(user_id: str) -> bool:
     """
     Delete all threads for a specific user from DynamoDB.
@@ -160,11 +349,10 @@ def delete_user_threads(user_id: str) -> bool:
     """
     try:
         thread_ids = get_user_threads(user_id)
-
-        for thread_id in thread_ids:
-            delete_thread_metadata(user_id, thread_id)
-
-        return True
+        _, failed = batch_delete_thread_metadata(user_id, thread_ids)
+        return not failed
     except Exception as e:
         print(f"Error deleting user threads: {e}")
         return False
+    finally:
+        get_metadata_cache().invalidate_user(user_id)
@@ -0,0 +1,150 @@
+"""
+In-process read-through cache of thread metadata items.
+
+Entries are keyed by (user_id, thread_id), expire after a TTL and are
+evicted least recently used first above a maximum entry count. The
+metadata helpers in dynamodb_helper read through it and keep it current on
+every write: upserts store the item returned by the write, deletes drop the
+entry, and deleting all of a user's threads drops all of that user's
+entries. Threads known not to exist are cached too, so repeated lookups of
+a missing thread don't reach the store either.
+
+The TTL bounds how stale an entry can get when another process writes the
+same thread.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from common_assets.config import metadata_cache_enabled, metadata_cache_max_entries, metadata_cache_ttl_s
+
+# Cached marker of a thread that does not exist in the store
+MISSING = object()
+
+
+class MetadataCache:
+    """
+    Thread-safe TTL/LRU cache of thread metadata items with per-user invalidation.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 300):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[object, float]]" = OrderedDict()
+        self._user_threads: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, thread_id: str):
+        """
+        Return a copy of the cached item, MISSING for a cached absent thread, or None on a miss.
+        """
+        key = (user_id, thread_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0] if entry[0] is MISSING else dict(entry[0])
+
+    def put(self, user_id: str, thread_id: str, item: Optional[Dict]) -> None:
+        """Store an item as read or written; a falsy item records the thread as missing."""
+        key = (user_id, thread_id)
+        value = dict(item) if item else MISSING
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            self._user_threads.setdefault(user_id, set()).add(thread_id)
+            while len(self._entries) > self.max_entries:
+                oldest_key, _ = self._entries.popitem(last=False)
+                self._forget_user_thread(oldest_key)
+                self.evictions += 1
+
+    def put_many(self, items: Iterable[Dict]) -> None:
+        for item in items:
+            self.put(item['user_id'], item['thread_id'], item)
+
+    def invalidate(self, user_id: str, thread_ids: Iterable[str]) -> None:
+        with self._lock:
+            for thread_id in thread_ids:
+                if (user_id, thread_id) in self._entries:
+                    self._remove((user_id, thread_id))
+                    self.invalidations += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached entry of a user."""
+        with self._lock:
+            for thread_id in self._user_threads.pop(user_id, set()):
+                if self._entries.pop((user_id, thread_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_threads.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since the cache was created."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        del self._entries[key]
+        self._forget_user_thread(key)
+
+    def _forget_user_thread(self, key: Tuple[str, str]) -> None:
+        user_id, thread_id = key
+        thread_ids = self._user_threads.get(user_id)
+        if thread_ids is not None:
+            thread_ids.discard(thread_id)
+            if not thread_ids:
+                del self._user_threads[user_id]
+
+
+class NullMetadataCache(MetadataCache):
+    """
+    Cache that stores nothing, used when metadata_cache_enabled is False.
+    """
+
+    def get(self, user_id: str, thread_id: str):
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, user_id: str, thread_id: str, item: Optional[Dict]) -> None:
+        pass
+
+
+_metadata_cache: Optional[MetadataCache] = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Get the process-wide metadata cache, created on first use from common_assets.config."""
+    global _metadata_cache
+    if _metadata_cache is None:
+        with _metadata_cache_lock:
+            if _metadata_cache is None:
+                if metadata_cache_enabled:
+                    _metadata_cache = MetadataCache(max_entries=metadata_cache_max_entries,
+                                                    ttl_s=metadata_cache_ttl_s)
+                else:
+                    _metadata_cache = NullMetadataCache()
+    return _metadata_cache
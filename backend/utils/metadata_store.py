@@ -0,0 +1,403 @@
+"""
+Pluggable storage backends for thread metadata.
+
+The functions in dynamodb_helper go through get_metadata_store(), which
+returns the backend selected by `metadata_store_backend` in
+common_assets.config:
+
+  - "dynamodb": the DynamoDB table with its user_id/update_date GSI
+  - "sqlite":   a `thread_metadata` table in the checkpoint database, indexed
+                on (user_id, update_date), so a single-node deployment reads
+                and writes metadata without any network hop
+
+Both return items as plain dicts with the same attributes (missing
+attributes are left out, as in DynamoDB) and the same cursor shape
+({'user_id', 'thread_id', 'update_date'}) for pagination.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from common_assets.config import (
+    metadata_store_backend,
+    metadata_sqlite_loc,
+    dynamodb_table_name,
+    dynamodb_update_date_index
+)
+from .aws_clients import get_dynamodb_table, get_dynamodb_client
+from .metadata_cache import get_metadata_cache
+
+# DynamoDB accepts at most 25 put/delete requests per BatchWriteItem call
+DYNAMODB_BATCH_WRITE_LIMIT = 25
+# ... and at most 100 keys per BatchGetItem call
+DYNAMODB_BATCH_GET_LIMIT = 100
+
+THREAD_METADATA_COLUMNS = ('user_id', 'thread_id', 'chat_mode', 'created_date', 'update_date',
+                           'first_message', 'message_count', 'last_message_preview')
+
+
+class MetadataStore:
+    """
+    Interface of a thread metadata backend.
+
+    Items are keyed by (user_id, thread_id). batch_delete_threads takes at
+    most `batch_size` threads per call; callers chunk larger deletions.
+    """
+
+    batch_size = DYNAMODB_BATCH_WRITE_LIMIT
+
+    def upsert_thread(self, user_id: str, thread_id: str, chat_mode: str, update_date: str,
+                      first_message: Optional[str] = None, message_count: Optional[int] = None,
+                      last_message_preview: Optional[str] = None) -> Dict:
+        """
+        Create or update a thread item in a single write.
+
+        update_date and the given summary fields are always set; created_date
+        (= update_date), chat_mode and first_message only when missing.
+
+        Returns:
+            The item as stored after the write
+        """
+        raise NotImplementedError
+
+    def get_thread(self, user_id: str, thread_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def batch_get_threads(self, user_id: str, thread_ids: List[str]) -> Dict[str, Dict]:
+        """Items of the given threads that exist, keyed by thread_id."""
+        raise NotImplementedError
+
+    def batch_put_threads(self, items: List[Dict]) -> None:
+        """Write whole items, replacing existing ones."""
+        raise NotImplementedError
+
+    def list_threads(self, user_id: str, page_size: int,
+                     cursor: Optional[Dict] = None) -> Tuple[List[Dict], Optional[Dict]]:
+        """One page of a user's items, most recently updated first, and the cursor of the next page."""
+        raise NotImplementedError
+
+    def delete_thread(self, user_id: str, thread_id: str) -> None:
+        raise NotImplementedError
+
+    def batch_delete_threads(self, user_id: str, thread_ids: List[str],
+                             max_retries: int = 5) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Delete the given threads.
+
+        Returns:
+            Tuple of (deleted thread IDs, dict mapping failed thread ID to error message)
+        """
+        raise NotImplementedError
+
+
+class DynamoDBMetadataStore(MetadataStore):
+    """
+    Thread metadata in a DynamoDB table (partition key user_id, sort key thread_id).
+    """
+
+    batch_size = DYNAMODB_BATCH_WRITE_LIMIT
+
+    def __init__(self, table_name: str = dynamodb_table_name, update_date_index: str = dynamodb_update_date_index):
+        self.table_name = table_name
+        self.update_date_index = update_date_index
+
+    @property
+    def table(self):
+        return get_dynamodb_table(self.table_name)
+
+    def upsert_thread(self, user_id: str, thread_id: str, chat_mode: str, update_date: str,
+                      first_message: Optional[str] = None, message_count: Optional[int] = None,
+                      last_message_preview: Optional[str] = None) -> Dict:
+        update_expression = ('SET update_date = :update_date, '
+                             'created_date = if_not_exists(created_date, :update_date), '
+                             'chat_mode = if_not_exists(chat_mode, :chat_mode)')
+        expression_values = {':update_date': update_date, ':chat_mode': chat_mode}
+        if first_message is not None:
+            update_expression += ', first_message = if_not_exists(first_message, :first_message)'
+            expression_values[':first_message'] = first_message
+        if message_count is not None:
+            update_expression += ', message_count = :message_count'
+            expression_values[':message_count'] = message_count
+        if last_message_preview is not None:
+            update_expression += ', last_message_preview = :last_message_preview'
+            expression_values[':last_message_preview'] = last_message_preview
+
+        response = self.table.update_item(
+            Key={
+                'user_id': user_id,
+                'thread_id': thread_id
+            },
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_values,
+            ReturnValues='ALL_NEW'
+        )
+        return response.get('Attributes', {})
+
+    def get_thread(self, user_id: str, thread_id: str) -> Optional[Dict]:
+        response = self.table.get_item(Key={'user_id': user_id, 'thread_id': thread_id})
+        return response.get('Item')
+
+    def batch_get_threads(self, user_id: str, thread_ids: List[str], max_retries: int = 5) -> Dict[str, Dict]:
+        client = get_dynamodb_client()
+        items = {}
+        for start in range(0, len(thread_ids), DYNAMODB_BATCH_GET_LIMIT):
+            request_items = {
+                self.table_name: {
+                    'Keys': [{'user_id': user_id, 'thread_id': thread_id}
+                             for thread_id in thread_ids[start:start + DYNAMODB_BATCH_GET_LIMIT]]
+                }
+            }
+            for attempt in range(max_retries + 1):
+                response = client.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    items[item['thread_id']] = item
+                request_items = response.get('UnprocessedKeys') or {}
+                if not request_items:
+                    break
+                time.sleep(min(0.05 * (2 ** attempt), 2.0))
+        return items
+
+    def batch_put_threads(self, items: List[Dict], max_retries: int = 5) -> None:
+        client = get_dynamodb_client()
+        for start in range(0, len(items), DYNAMODB_BATCH_WRITE_LIMIT):
+            request_items = {
+                self.table_name: [{'PutRequest': {'Item': item}}
+                                  for item in items[start:start + DYNAMODB_BATCH_WRITE_LIMIT]]
+            }
+            for attempt in range(max_retries + 1):
+                response = client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+                time.sleep(min(0.05 * (2 ** attempt), 2.0))
+            if request_items:
+                raise RuntimeError(f"{len(request_items[self.table_name])} items unprocessed after retries")
+
+    def list_threads(self, user_id: str, page_size: int,
+                     cursor: Optional[Dict] = None) -> Tuple[List[Dict], Optional[Dict]]:
+        from boto3.dynamodb.conditions import Key
+
+        query_kwargs = {
+            'IndexName': self.update_date_index,
+            'KeyConditionExpression': Key('user_id').eq(user_id),
+            'ScanIndexForward': False,
+            'Limit': page_size
+        }
+        if cursor:
+            query_kwargs['ExclusiveStartKey'] = cursor
+
+        response = self.table.query(**query_kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def delete_thread(self, user_id: str, thread_id: str) -> None:
+        self.table.delete_item(Key={'user_id': user_id, 'thread_id': thread_id})
+
+    def batch_delete_threads(self, user_id: str, thread_ids: List[str],
+                             max_retries: int = 5) -> Tuple[List[str], Dict[str, str]]:
+        # UnprocessedItems returned by DynamoDB are retried with exponential backoff;
+        # whatever is still unprocessed after max_retries is reported as failed
+        request_items = {
+            self.table_name: [
+                {'DeleteRequest': {'Key': {'user_id': user_id, 'thread_id': thread_id}}}
+                for thread_id in thread_ids
+            ]
+        }
+        client = get_dynamodb_client()
+        for attempt in range(max_retries + 1):
+            response = client.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                break
+            time.sleep(min(0.05 * (2 ** attempt), 2.0))
+
+        unprocessed = {
+            request['DeleteRequest']['Key']['thread_id']
+            for request in request_items.get(self.table_name, [])
+        }
+        deleted = [thread_id for thread_id in thread_ids if thread_id not in unprocessed]
+        failed = {thread_id: 'Unprocessed after retries' for thread_id in thread_ids if thread_id in unprocessed}
+        return deleted, failed
+
+
+class SqliteMetadataStore(MetadataStore):
+    """
+    Thread metadata in a SQLite table, by default inside the checkpoint database.
+
+    Uses one connection with the checkpoint pragmas (WAL, busy timeout);
+    writes run in BEGIN IMMEDIATE transactions so they queue behind the
+    checkpoint writer instead of failing.
+    """
+
+    batch_size = 500
+
+    def __init__(self, db_path: str = metadata_sqlite_loc):
+        from .checkpoint_store import open_sqlite_connection
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = open_sqlite_connection(db_path)
+        self._conn.isolation_level = None
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS thread_metadata (
+                       user_id TEXT NOT NULL,
+                       thread_id TEXT NOT NULL,
+                       chat_mode TEXT,
+                       created_date TEXT,
+                       update_date TEXT,
+                       first_message TEXT,
+                       message_count INTEGER,
+                       last_message_preview TEXT,
+                       PRIMARY KEY (user_id, thread_id))"""
+            )
+            # Serves the sidebar query (newest first per user) like the DynamoDB GSI
+            self._conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_thread_metadata_user_update
+                   ON thread_metadata (user_id, update_date DESC, thread_id DESC)"""
+            )
+
+    @staticmethod
+    def _row_to_item(row) -> Dict:
+        return {column: value for column, value in zip(THREAD_METADATA_COLUMNS, row) if value is not None}
+
+    def _write(self, sql: str, params_list: List[tuple]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, params_list)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def upsert_thread(self, user_id: str, thread_id: str, chat_mode: str, update_date: str,
+                      first_message: Optional[str] = None, message_count: Optional[int] = None,
+                      last_message_preview: Optional[str] = None) -> Dict:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """INSERT INTO thread_metadata (user_id, thread_id, chat_mode, created_date, update_date,
+                                                    first_message, message_count, last_message_preview)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (user_id, thread_id) DO UPDATE SET
+                           update_date = excluded.update_date,
+                           created_date = COALESCE(thread_metadata.created_date, excluded.created_date),
+                           chat_mode = COALESCE(thread_metadata.chat_mode, excluded.chat_mode),
+                           first_message = COALESCE(thread_metadata.first_message, excluded.first_message),
+                           message_count = COALESCE(excluded.message_count, thread_metadata.message_count),
+                           last_message_preview = COALESCE(excluded.last_message_preview,
+                                                           thread_metadata.last_message_preview)
+                       RETURNING """ + ", ".join(THREAD_METADATA_COLUMNS),
+                    (user_id, thread_id, chat_mode, update_date, update_date,
+                     first_message, message_count, last_message_preview)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_item(row)
+
+    def get_thread(self, user_id: str, thread_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(THREAD_METADATA_COLUMNS)} FROM thread_metadata WHERE user_id = ? AND thread_id = ?",
+                (user_id, thread_id)
+            ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def batch_get_threads(self, user_id: str, thread_ids: List[str]) -> Dict[str, Dict]:
+        items = {}
+        for start in range(0, len(thread_ids), self.batch_size):
+            batch = thread_ids[start:start + self.batch_size]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""SELECT {', '.join(THREAD_METADATA_COLUMNS)} FROM thread_metadata
+                        WHERE user_id = ? AND thread_id IN ({', '.join('?' * len(batch))})""",
+                    (user_id, *batch)
+                ).fetchall()
+            for row in rows:
+                item = self._row_to_item(row)
+                items[item['thread_id']] = item
+        return items
+
+    def batch_put_threads(self, items: List[Dict]) -> None:
+        self._write(
+            f"""INSERT OR REPLACE INTO thread_metadata ({', '.join(THREAD_METADATA_COLUMNS)})
+                VALUES ({', '.join('?' * len(THREAD_METADATA_COLUMNS))})""",
+            [tuple(item.get(column) for column in THREAD_METADATA_COLUMNS) for item in items]
+        )
+
+    def list_threads(self, user_id: str, page_size: int,
+                     cursor: Optional[Dict] = None) -> Tuple[List[Dict], Optional[Dict]]:
+        sql = f"SELECT {', '.join(THREAD_METADATA_COLUMNS)} FROM thread_metadata WHERE user_id = ?"
+        params = [user_id]
+        if cursor:
+            sql += " AND (update_date, thread_id) < (?, ?)"
+            params += [cursor['update_date'], cursor['thread_id']]
+        # One extra row tells whether another page exists
+        sql += " ORDER BY update_date DESC, thread_id DESC LIMIT ?"
+        params.append(page_size + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        items = [self._row_to_item(row) for row in rows[:page_size]]
+        next_cursor = None
+        if len(rows) > page_size:
+            last = items[-1]
+            next_cursor = {'user_id': user_id, 'thread_id': last['thread_id'], 'update_date': last['update_date']}
+        return items, next_cursor
+
+    def delete_thread(self, user_id: str, thread_id: str) -> None:
+        self._write("DELETE FROM thread_metadata WHERE user_id = ? AND thread_id = ?", [(user_id, thread_id)])
+
+    def batch_delete_threads(self, user_id: str, thread_ids: List[str],
+                             max_retries: int = 5) -> Tuple[List[str], Dict[str, str]]:
+        # One transaction: either every thread of the batch is deleted or none is
+        self._write("DELETE FROM thread_metadata WHERE user_id = ? AND thread_id = ?",
+                    [(user_id, thread_id) for thread_id in thread_ids])
+        return list(thread_ids), {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_metadata_store: Optional[MetadataStore] = None
+_metadata_store_lock = threading.Lock()
+
+
+def build_metadata_store(backend: str = metadata_store_backend) -> MetadataStore:
+    """
+    Create the metadata store of the given backend ("dynamodb" or "sqlite").
+    """
+    if backend == "dynamodb":
+        return DynamoDBMetadataStore()
+    if backend == "sqlite":
+        return SqliteMetadataStore()
+    raise ValueError(f"Unknown metadata store backend: {backend!r}")
+
+
+def get_metadata_store() -> MetadataStore:
+    """Get the process-wide metadata store, created on first use from common_assets.config."""
+    global _metadata_store
+    if _metadata_store is None:
+        with _metadata_store_lock:
+            if _metadata_store is None:
+                _metadata_store = build_metadata_store()
+    return _metadata_store
+
+
+def set_metadata_store(store: Optional[MetadataStore]) -> None:
+    """
+    Replace the process-wide metadata store. The metadata cache is cleared,
+    since its entries came from the previous store.
+
+    Args:
+        store: MetadataStore to use, or None to build the configured one on next use
+    """
+    global _metadata_store
+    with _metadata_store_lock:
+        _metadata_store = store
+    get_metadata_cache().clear()
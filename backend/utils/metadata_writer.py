@@ -0,0 +1,115 @@
+"""
+Write-behind queue for thread metadata updates.
+
+Metadata writes are taken off the response path: they are queued, coalesced
+per thread and written by a background thread. The queue is flushed when the
+process exits.
+"""
+
+import atexit
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from common_assets.config import metadata_write_queue_size
+from .dynamodb_helper import save_thread_metadata
+
+
+class MetadataWriteBehind:
+    """
+    Bounded, coalescing background writer for save_thread_metadata calls.
+
+    Only the latest pending update of a thread is kept; an update submitted
+    while another one for the same thread is still queued replaces it. When
+    the queue holds max_queue_size distinct threads, submit blocks until the
+    worker catches up.
+    """
+
+    def __init__(self, write_fn: Callable[..., bool] = save_thread_metadata,
+                 max_queue_size: int = metadata_write_queue_size):
+        self.write_fn = write_fn
+        self.max_queue_size = max_queue_size
+        self._pending: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="metadata-write-behind", daemon=True)
+        self._worker.start()
+
+    def submit(self, user_id: str, thread_id: str, **kwargs) -> None:
+        """
+        Queue a save_thread_metadata(user_id, thread_id, **kwargs) call.
+
+        Falls back to a synchronous write once the writer has been shut down.
+        """
+        key = (user_id, thread_id)
+        with self._cond:
+            if not self._closed:
+                while key not in self._pending and len(self._pending) >= self.max_queue_size:
+                    self._cond.wait()
+                previous = self._pending.pop(key, None)
+                if previous is not None:
+                    # first_message is written with if_not_exists, and new_thread only drives warnings
+                    kwargs['new_thread'] = previous.get('new_thread', False) or kwargs.get('new_thread', False)
+                    if kwargs.get('first_message') is None:
+                        kwargs['first_message'] = previous.get('first_message')
+                self._pending[key] = kwargs
+                self._cond.notify_all()
+                return
+        self.write_fn(user_id, thread_id, **kwargs)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued update has been written.
+
+        Returns:
+            True if the queue drained, False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout=timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Flush the queue and stop the worker thread."""
+        drained = self.flush(timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=timeout)
+        return drained
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                (user_id, thread_id), kwargs = self._pending.popitem(last=False)
+                self._in_flight += 1
+                self._cond.notify_all()
+            try:
+                self.write_fn(user_id, thread_id, **kwargs)
+            except Exception as e:
+                print(f"Error in metadata write-behind: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+
+_writer: Optional[MetadataWriteBehind] = None
+_writer_lock = threading.Lock()
+
+
+def get_metadata_writer() -> MetadataWriteBehind:
+    """
+    Get the process-wide write-behind writer, starting it on first use.
+
+    The writer is flushed on interpreter shutdown.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = MetadataWriteBehind()
+                atexit.register(_writer.shutdown)
+    return _writer
@@ -0,0 +1,180 @@
+"""
+Lightweight per-turn tracing and latency histograms.
+
+`span()` times a block of work, logs it as one JSON line on the
+"docfliq.trace" logger and records its duration in an in-process histogram
+keyed by span name. Spans opened while another span is active share its
+trace_id, so every span of a chat turn can be correlated in the logs.
+
+    with span("llm.invoke", model="gpt-4o-mini") as attrs:
+        response = model.invoke(messages)
+        attrs["completion_tokens"] = ...
+
+get_latency_stats() returns count/mean/p50/p95/p99/max per span name.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("docfliq.trace")
+
+# Samples kept per span name for percentile estimates
+HISTOGRAM_MAX_SAMPLES = 2048
+
+_current_trace_id: ContextVar[Optional[str]] = ContextVar("docfliq_trace_id", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("docfliq_span", default=None)
+
+
+class LatencyHistogram:
+    """
+    Bounded reservoir of the most recent durations (ms) of one span name.
+    """
+
+    def __init__(self, max_samples: int = HISTOGRAM_MAX_SAMPLES):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        with self._lock:
+            self._samples.append(duration_ms)
+            self.count += 1
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total_ms, max_ms = self.count, self.total_ms, self.max_ms
+        return {
+            'count': count,
+            'mean_ms': total_ms / count if count else 0.0,
+            'p50_ms': percentile(samples, 50),
+            'p95_ms': percentile(samples, 95),
+            'p99_ms': percentile(samples, 99),
+            'max_ms': max_ms
+        }
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not sorted_samples:
+        return 0.0
+    rank = min(len(sorted_samples), max(1, math.ceil(pct / 100 * len(sorted_samples)))) - 1
+    return sorted_samples[rank]
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def record_latency(name: str, duration_ms: float) -> None:
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    histogram.record(duration_ms)
+
+
+def get_latency_stats() -> Dict[str, Dict[str, float]]:
+    """Latency summary of every span name recorded so far, sorted by name."""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    return {name: histogram.snapshot() for name, histogram in items}
+
+
+def dump_latency_stats(path: Optional[str] = None) -> str:
+    """
+    Serialize get_latency_stats() as JSON, optionally writing it to path.
+
+    Returns:
+        str: The JSON document
+    """
+    document = json.dumps(get_latency_stats(), indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(document)
+    return document
+
+
+def reset_latency_stats() -> None:
+    with _histograms_lock:
+        _histograms.clear()
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict]:
+    """
+    Time a block of work as a span.
+
+    Yields the attribute dict so the block can add attributes (e.g. token
+    counts) that are logged with the span. A new trace_id is started when no
+    span is active.
+    """
+    trace_id = _current_trace_id.get()
+    trace_token = None
+    if trace_id is None:
+        trace_id = uuid.uuid4().hex
+        trace_token = _current_trace_id.set(trace_id)
+    parent = _current_span.get()
+    span_token = _current_span.set(name)
+
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        status = "error"
+        attrs['error'] = repr(e)
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        try:
+            _current_span.reset(span_token)
+            if trace_token is not None:
+                _current_trace_id.reset(trace_token)
+        except ValueError:
+            # Generator spans finalized from another context (e.g. garbage collection)
+            pass
+        record_latency(name, duration_ms)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'span': name,
+                'trace_id': trace_id,
+                'parent': parent,
+                'duration_ms': round(duration_ms, 3),
+                'status': status,
+                **attrs
+            }, default=str))
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator that runs a function (sync or async) inside span(name).
+    """
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the chatbot backend and app start-up.
+"""
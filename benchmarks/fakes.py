@@ -0,0 +1,290 @@
+"""
+Offline stand-ins for the external services, used by the benchmarks.
+
+FakeStreamingChatModel replaces ChatOpenAI: it answers deterministically
+(the same prompt always gives the same reply), with a configurable delay
+before the first token and between tokens, and streams through LangChain
+callbacks like a real model, so graph token streaming is exercised. Asked
+for a content outline, it answers with a JSON outline of several sections,
+so the content_gen fan-out drafts them in parallel.
+
+InMemoryDynamoDBResource replaces the boto3 DynamoDB resource for the
+calls made by backend.utils.dynamodb_helper: get_item, put_item,
+update_item (SET with if_not_exists), delete_item, query (with the
+update_date index, Limit and ExclusiveStartKey), batch_get_item and
+batch_write_item.
+
+    install_offline_backend(first_token_latency_s=0.2, token_latency_s=0.01)
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from backend.config import CONTENT_OUTLINE_PROMPT
+from common_assets.config import dynamodb_update_date_index, retrieval_embedding_dim
+
+FAKE_VOCABULARY = (
+    "slide deck chart revenue growth quarter summary market product customer team roadmap "
+    "insight metric trend forecast risk plan launch budget region segment"
+).split()
+
+# First line of the outline system prompt, which identifies an outline request
+OUTLINE_PROMPT_MARKER = CONTENT_OUTLINE_PROMPT.split("\n", 1)[0]
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Deterministic chat model with simulated latency and token streaming.
+    """
+
+    model_name: str = "fake-chat-model"
+    temperature: float = 0.0
+    # Delay before the first token (simulates prompt processing / network)
+    first_token_latency_s: float = 0.0
+    # Delay between consecutive tokens
+    token_latency_s: float = 0.0
+    # Number of tokens in every reply
+    response_tokens: int = 40
+    # Sections of the JSON outline answered to the content outline prompt
+    outline_sections: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def get_num_tokens_from_messages(self, messages: List[BaseMessage], tools=None) -> int:
+        # Whitespace tokens plus a small per-message overhead, like the real tokenizer's framing
+        return sum(len(str(message.content).split()) + 4 for message in messages)
+
+    def _reply_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        digest = hashlib.sha256(str(messages[-1].content if messages else "").encode("utf-8")).digest()
+        words = [FAKE_VOCABULARY[digest[i % len(digest)] % len(FAKE_VOCABULARY)] for i in range(self.response_tokens)]
+        if messages and OUTLINE_PROMPT_MARKER in str(messages[0].content):
+            return self._outline_tokens(words)
+        return [word + " " for word in words]
+
+    def _outline_tokens(self, words: List[str]) -> List[str]:
+        # A valid outline, streamed as whitespace-separated pieces of its JSON
+        words = words or FAKE_VOCABULARY
+        outline = {
+            'title': " ".join(words[:3]).title(),
+            'sections': [
+                {'title': f"{words[(index + 3) % len(words)].title()} {index + 1}",
+                 'brief': " ".join(words[index:index + 8])}
+                for index in range(self.outline_sections)
+            ]
+        }
+        return [piece + " " for piece in json.dumps(outline).split(" ")]
+
+    def _usage(self, messages: List[BaseMessage]) -> Dict[str, int]:
+        input_tokens = self.get_num_tokens_from_messages(messages)
+        output_tokens = len(self._reply_tokens(messages))
+        return {'input_tokens': input_tokens, 'output_tokens': output_tokens,
+                'total_tokens': input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.first_token_latency_s + self.token_latency_s * self.response_tokens)
+        message = AIMessage(content="".join(self._reply_tokens(messages)).strip(),
+                            usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.first_token_latency_s + self.token_latency_s * self.response_tokens)
+        message = AIMessage(content="".join(self._reply_tokens(messages)).strip(),
+                            usage_metadata=self._usage(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency_s)
+        tokens = self._reply_tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_latency_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency_s)
+        tokens = self._reply_tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_latency_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
+
+
+# "name = :value" or "name = if_not_exists(name, :value)" in a SET clause
+SET_ACTION_PATTERN = re.compile(r"(\w+)\s*=\s*(?:if_not_exists\(\s*(\w+)\s*,\s*(:\w+)\s*\)|(:\w+))")
+
+
+class InMemoryDynamoDBTable:
+    """
+    Thread-safe in-memory table keyed by (user_id, thread_id).
+    """
+
+    def __init__(self, name: str, partition_key: str = "user_id", sort_key: str = "thread_id"):
+        self.name = name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self._items: Dict[Any, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key: Dict) -> tuple:
+        return key[self.partition_key], key[self.sort_key]
+
+    def get_item(self, Key: Dict, **kwargs) -> Dict:
+        partition, sort = self._key(Key)
+        with self._lock:
+            item = self._items.get(partition, {}).get(sort)
+            return {'Item': dict(item)} if item is not None else {}
+
+    def put_item(self, Item: Dict, **kwargs) -> Dict:
+        partition, sort = self._key(Item)
+        with self._lock:
+            self._items.setdefault(partition, {})[sort] = dict(Item)
+        return {}
+
+    def update_item(self, Key: Dict, UpdateExpression: str, ExpressionAttributeValues: Dict,
+                    ReturnValues: str = "NONE", **kwargs) -> Dict:
+        if not UpdateExpression.lstrip().upper().startswith("SET "):
+            raise ValueError(f"Unsupported UpdateExpression: {UpdateExpression}")
+        partition, sort = self._key(Key)
+        with self._lock:
+            item = self._items.setdefault(partition, {}).setdefault(sort, dict(Key))
+            for name, if_missing_name, if_missing_value, value in SET_ACTION_PATTERN.findall(UpdateExpression):
+                if if_missing_name:
+                    if if_missing_name not in item:
+                        item[name] = ExpressionAttributeValues[if_missing_value]
+                else:
+                    item[name] = ExpressionAttributeValues[value]
+            return {'Attributes': dict(item)} if ReturnValues == "ALL_NEW" else {}
+
+    def delete_item(self, Key: Dict, **kwargs) -> Dict:
+        partition, sort = self._key(Key)
+        with self._lock:
+            self._items.get(partition, {}).pop(sort, None)
+        return {}
+
+    def query(self, KeyConditionExpression, IndexName: Optional[str] = None, ScanIndexForward: bool = True,
+              Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict] = None, **kwargs) -> Dict:
+        # Only partition-key equality conditions, as built with boto3's Key(name).eq(value)
+        _, partition = KeyConditionExpression.get_expression()['values']
+        order_key = "update_date" if IndexName == dynamodb_update_date_index else self.sort_key
+
+        with self._lock:
+            items = [dict(item) for item in self._items.get(partition, {}).values() if order_key in item]
+        items.sort(key=lambda item: (item[order_key], item[self.sort_key]), reverse=not ScanIndexForward)
+
+        if ExclusiveStartKey:
+            start = (ExclusiveStartKey[order_key], ExclusiveStartKey[self.sort_key])
+            if ScanIndexForward:
+                items = [item for item in items if (item[order_key], item[self.sort_key]) > start]
+            else:
+                items = [item for item in items if (item[order_key], item[self.sort_key]) < start]
+
+        response = {'Items': items[:Limit] if Limit else items}
+        if Limit and len(items) > Limit:
+            last = response['Items'][-1]
+            response['LastEvaluatedKey'] = {self.partition_key: partition, self.sort_key: last[self.sort_key],
+                                            order_key: last[order_key]}
+        response['Count'] = len(response['Items'])
+        return response
+
+    def item_count(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._items.values())
+
+
+class InMemoryDynamoDBClient:
+    """
+    Low-level client counterpart of InMemoryDynamoDBResource (batch_get_item and batch_write_item).
+    """
+
+    def __init__(self, resource: "InMemoryDynamoDBResource"):
+        self._resource = resource
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict], **kwargs) -> Dict:
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self._resource.Table(table_name)
+            responses[table_name] = [response['Item'] for response in
+                                     (table.get_item(Key=key) for key in request['Keys']) if 'Item' in response]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict]], **kwargs) -> Dict:
+        for table_name, requests in RequestItems.items():
+            table = self._resource.Table(table_name)
+            for request in requests:
+                if 'DeleteRequest' in request:
+                    table.delete_item(Key=request['DeleteRequest']['Key'])
+                else:
+                    table.put_item(Item=request['PutRequest']['Item'])
+        return {'UnprocessedItems': {}}
+
+
+class InMemoryDynamoDBResource:
+    """
+    Stand-in for the boto3 DynamoDB ServiceResource; tables are created on first access.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, InMemoryDynamoDBTable] = {}
+        self._lock = threading.Lock()
+        self.meta = SimpleNamespace(client=InMemoryDynamoDBClient(self))
+
+    def Table(self, name: str) -> InMemoryDynamoDBTable:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = InMemoryDynamoDBTable(name)
+            return self._tables[name]
+
+
+def install_offline_backend(first_token_latency_s: float = 0.0, token_latency_s: float = 0.0,
+                            response_tokens: int = 40) -> InMemoryDynamoDBResource:
+    """
+    Point the backend at the fake chat model and an empty in-memory DynamoDB.
+
+    The LLM scheduler is replaced by one without rate limits, since the fake
+    model has none; concurrency and priority still apply. Retrieval embeds
+    with the local HashingEmbedder instead of the OpenAI embeddings.
+
+    Args:
+        first_token_latency_s: Simulated delay before the first token
+        token_latency_s: Simulated delay between tokens
+        response_tokens: Tokens per reply
+
+    Returns:
+        The InMemoryDynamoDBResource now used by backend.utils
+    """
+    from backend.chains import LLMScheduler, set_chat_model, set_llm_scheduler
+    from backend.retrieval import HashingEmbedder, set_embedder
+    from backend.utils import set_dynamodb_resource
+
+    set_chat_model(FakeStreamingChatModel(first_token_latency_s=first_token_latency_s,
+                                          token_latency_s=token_latency_s,
+                                          response_tokens=response_tokens))
+    set_llm_scheduler(LLMScheduler(requests_per_minute=0, tokens_per_minute=0))
+    set_embedder(HashingEmbedder(retrieval_embedding_dim))
+    resource = InMemoryDynamoDBResource()
+    set_dynamodb_resource(resource)
+    return resource
@@ -0,0 +1,90 @@
+"""
+Import-time benchmark for the app's cold start.
+
+Imports a module in fresh interpreters, takes the median wall time and fails
+(exit code 1) when it exceeds the absolute budget or regresses more than the
+allowed tolerance against the recorded baseline (import_time_baseline.json,
+committed; re-record it with --update-baseline when the machine the check
+runs on changes or an import-time increase is accepted).
+
+    python -m benchmarks.import_time                    # check
+    python -m benchmarks.import_time --update-baseline  # record the current time
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_time_baseline.json")
+
+MEASURE_SNIPPET = (
+    "import time; t0 = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def measure_import_time(module: str, runs: int = 5) -> List[float]:
+    """
+    Import module in `runs` fresh interpreters and return each import time in seconds.
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE_SNIPPET.format(module=module)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fail when the app's import time regresses.")
+    parser.add_argument("--module", default="frontend.app", help="Module whose import is timed")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (median is used)")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="Absolute import-time budget")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Record the measured time as baseline")
+    args = parser.parse_args(argv)
+
+    timings = measure_import_time(args.module, runs=args.runs)
+    median = statistics.median(timings)
+    result = {'module': args.module, 'median_s': median, 'timings_s': timings}
+
+    baseline = load_baseline()
+    if args.update_baseline:
+        baseline[args.module] = round(median, 3)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        result['baseline_updated'] = True
+        print(json.dumps(result))
+        return 0
+
+    failures = []
+    if median > args.max_seconds:
+        failures.append(f"median {median:.3f}s exceeds budget {args.max_seconds:.3f}s")
+    if args.module in baseline:
+        limit = baseline[args.module] * (1 + args.tolerance)
+        result['baseline_s'] = baseline[args.module]
+        if median > limit:
+            failures.append(f"median {median:.3f}s exceeds baseline {baseline[args.module]:.3f}s "
+                            f"+{args.tolerance:.0%}")
+    result['failures'] = failures
+    print(json.dumps(result))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Concurrent multi-user load driver for ChatBotGraph.
+
+Simulates N users at once, each owning M threads. A user sends messages
+through ChatBotGraph.get_response to its threads in turn and reloads the
+sidebar every few messages, sleeping a random think time between actions.
+Runs offline (fake chat model, in-memory DynamoDB, see benchmarks.fakes)
+against a real SQLite checkpoint database, so checkpoint contention and
+thread scheduling are what is measured. Each level gets its own temporary
+LLM response cache and retrieval indexes; the cache is off unless
+--llm-cache is given, and its hits are then reported per level.
+
+For every concurrency level it reports throughput, latency percentiles and
+errors grouped by kind ("database is locked" is counted separately):
+
+    python -m benchmarks.load_test --users 1 4 16 64 --threads-per-user 3 --messages-per-user 20
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .fakes import install_offline_backend
+from .offline_suite import (
+    summarize_timings,
+    git_revision,
+    use_metadata_store,
+    use_isolated_storage,
+    release_isolated_storage
+)
+
+DEFAULT_USER_LEVELS = (1, 4, 16, 32)
+
+
+def classify_error(error: Exception) -> str:
+    message = str(error)
+    if "database is locked" in message:
+        return "database is locked"
+    if "database is busy" in message:
+        return "database is busy"
+    return type(error).__name__
+
+
+class LoadStats:
+    """
+    Thread-safe collector of one load run's timings and errors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turn_timings: List[float] = []
+        self.sidebar_timings: List[float] = []
+        self.errors = Counter()
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            (self.turn_timings if kind == "turn" else self.sidebar_timings).append(seconds)
+
+    def record_error(self, kind: str, error: Exception) -> None:
+        with self._lock:
+            self.errors[f"{kind}: {classify_error(error)}"] += 1
+
+
+def simulate_user(resources, user_index: int, threads_per_user: int, messages_per_user: int,
+                  sidebar_every: int, think_time_s: float, chat_mode: str, stats: LoadStats,
+                  start_barrier: threading.Barrier) -> None:
+    from backend.langgraph_workflow.graph import ChatBotGraph
+
+    rng = random.Random(user_index)
+    chatbot = ChatBotGraph(user_id=f"load-user-{user_index}", resources=resources)
+    thread_ids = [str(uuid.uuid4()) for _ in range(threads_per_user)]
+    started = set()
+
+    start_barrier.wait()
+    for i in range(messages_per_user):
+        thread_id = thread_ids[i % threads_per_user]
+        start = time.perf_counter()
+        try:
+            chatbot.get_response(thread_id, f"User {user_index} message {i}: what does slide {i} show?",
+                                 chat_mode, new_thread=thread_id not in started)
+            stats.record("turn", time.perf_counter() - start)
+        except Exception as e:
+            stats.record_error("turn", e)
+        started.add(thread_id)
+
+        if sidebar_every and (i + 1) % sidebar_every == 0:
+            start = time.perf_counter()
+            try:
+                chatbot.get_sidebar_json()
+                stats.record("sidebar", time.perf_counter() - start)
+            except Exception as e:
+                stats.record_error("sidebar", e)
+
+        if think_time_s:
+            # Exponential think time: bursty like real users, with the requested mean
+            time.sleep(rng.expovariate(1.0 / think_time_s))
+
+
+def run_load_level(db_path: str, users: int, threads_per_user: int, messages_per_user: int,
+                   sidebar_every: int, think_time_s: float, chat_mode: str = "qna",
+                   metadata_store: str = "dynamodb", llm_cache: bool = False) -> Dict:
+    """
+    Run `users` simulated users concurrently against a fresh graph on db_path.
+
+    The LLM response cache and retrieval indexes live next to db_path and start
+    empty, so no level is served from an earlier level's (or run's) answers.
+
+    Returns:
+        dict: Throughput, latency summaries and error counts of the run
+    """
+    from backend.langgraph_workflow.registry import GraphResources
+    from backend.utils import SqliteMetadataStore, set_metadata_store
+
+    storage_dir = os.path.splitext(db_path)[0] + "_storage"
+    storage = use_isolated_storage(storage_dir, llm_cache=llm_cache)
+    store = use_metadata_store(metadata_store, db_path)
+    resources = GraphResources(db_path)
+    # Build the graph and checkpointer before the clock starts
+    resources.graph
+    stats = LoadStats()
+    start_barrier = threading.Barrier(users + 1)
+    workers = [
+        threading.Thread(target=simulate_user, name=f"load-user-{i}", daemon=True,
+                         args=(resources, i, threads_per_user, messages_per_user, sidebar_every,
+                               think_time_s, chat_mode, stats, start_barrier))
+        for i in range(users)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        start_barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        llm_cache_stats = storage['response_cache'].stats() if llm_cache else None
+    finally:
+        resources.close()
+        release_isolated_storage(storage)
+        if isinstance(store, SqliteMetadataStore):
+            store.close()
+        set_metadata_store(None)
+
+    completed = len(stats.turn_timings)
+    error_total = sum(stats.errors.values())
+    # Every turn was attempted; sidebar loads either succeeded or failed
+    sidebar_errors = sum(count for kind, count in stats.errors.items() if kind.startswith("sidebar"))
+    operations = users * messages_per_user + len(stats.sidebar_timings) + sidebar_errors
+    return {
+        'users': users,
+        'threads_per_user': threads_per_user,
+        'seconds': elapsed,
+        'turns_completed': completed,
+        'turns_per_second': completed / elapsed if elapsed else 0.0,
+        'turn_latency': summarize_timings(stats.turn_timings),
+        'sidebar_latency': summarize_timings(stats.sidebar_timings),
+        'errors': dict(stats.errors),
+        'error_rate': error_total / operations if operations else 0.0,
+        'database_locked': sum(count for kind, count in stats.errors.items() if "database is locked" in kind),
+        # Turns answered from the response cache skip the model, so they pull turn_latency down
+        'llm_cache': llm_cache_stats
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-user load test of ChatBotGraph (offline).")
+    parser.add_argument("--users", type=int, nargs="+", default=list(DEFAULT_USER_LEVELS),
+                        help="Concurrency levels (simultaneous users) to run, one after another")
+    parser.add_argument("--threads-per-user", type=int, default=3, help="Threads each user writes to")
+    parser.add_argument("--messages-per-user", type=int, default=20, help="Messages each user sends")
+    parser.add_argument("--sidebar-every", type=int, default=5, help="Reload the sidebar every N messages (0: never)")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean think time between messages (s)")
+    parser.add_argument("--chat-mode", default="qna", help="Chat mode of every message")
+    parser.add_argument("--first-token-latency", type=float, default=0.3,
+                        help="Simulated model delay before the first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Simulated delay between tokens (s)")
+    parser.add_argument("--metadata-store", choices=("dynamodb", "sqlite"), default="dynamodb",
+                        help="Metadata backend: in-memory DynamoDB stand-in or SQLite in the checkpoint database")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Enable the LLM response cache (empty at the start of every level)")
+    parser.add_argument("--workdir", default=None,
+                        help="Directory for the temporary checkpoint databases, LLM caches and indexes")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    install_offline_backend(first_token_latency_s=args.first_token_latency, token_latency_s=args.token_latency)
+
+    levels = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp_dir:
+        for users in args.users:
+            level = run_load_level(os.path.join(tmp_dir, f"checkpoints_{users}.db"), users,
+                                   args.threads_per_user, args.messages_per_user, args.sidebar_every,
+                                   args.think_time, chat_mode=args.chat_mode,
+                                   metadata_store=args.metadata_store, llm_cache=args.llm_cache)
+            levels.append(level)
+            cache_hits = (level['llm_cache']['hits_memory'] + level['llm_cache']['hits_sqlite']
+                          if level['llm_cache'] else 0)
+            print(f"users={users} turns/s={level['turns_per_second']:.2f} "
+                  f"p95={level['turn_latency']['p95_ms']:.0f}ms errors={sum(level['errors'].values())} "
+                  f"llm_cache_hits={cache_hits}",
+                  file=sys.stderr)
+
+    report = {
+        'revision': git_revision(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        'levels': levels
+    }
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Offline benchmark suite for ChatBotGraph.
+
+Runs without network access: the chat model is FakeStreamingChatModel and
+DynamoDB is the in-memory stand-in (see benchmarks.fakes). Checkpoints go
+to a real SQLite file in a temporary directory, and so do the LLM response
+cache and the retrieval indexes, so a run never reads what an earlier run
+(or the app) stored under ./storage. The response cache is off unless
+--llm-cache is given, so turn latency measures the model calls. Measures
+
+  - turn latency (get_response and time to first streamed token)
+  - sidebar load time with 10 / 1k / 10k threads
+  - checkpoint database growth per turn
+  - delete-all time
+
+and prints one JSON document (also written to --output) so results can be
+compared across commits.
+
+    python -m benchmarks.offline_suite --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from backend.utils.tracing import percentile, get_latency_stats, reset_latency_stats
+from .fakes import install_offline_backend
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIDEBAR_SIZES = (10, 1000, 10000)
+
+
+def summarize_timings(timings_s: List[float]) -> Dict[str, float]:
+    """count/mean/p50/p95/p99/max in milliseconds of a list of durations in seconds."""
+    samples = sorted(t * 1000 for t in timings_s)
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) if samples else 0.0,
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'p99_ms': percentile(samples, 99),
+        'max_ms': samples[-1] if samples else 0.0
+    }
+
+
+def checkpoint_db_size(db_path: str) -> int:
+    # The WAL holds recent writes until the next checkpoint, so count it too
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def new_chatbot(resources, user_id: str):
+    from backend.langgraph_workflow.graph import ChatBotGraph
+
+    return ChatBotGraph(user_id=user_id, resources=resources)
+
+
+def bench_turn_latency(chatbot, turns: int, chat_mode: str = "qna") -> Dict:
+    """Time get_response and stream_response turns on one thread."""
+    thread_id = str(uuid.uuid4())
+    invoke_timings = []
+    for i in range(turns):
+        start = time.perf_counter()
+        chatbot.get_response(thread_id, f"Question {i}: summarize slide {i}", chat_mode, new_thread=(i == 0))
+        invoke_timings.append(time.perf_counter() - start)
+
+    stream_thread_id = str(uuid.uuid4())
+    first_token_timings = []
+    stream_timings = []
+    for i in range(turns):
+        start = time.perf_counter()
+        first_token_at = None
+        for _ in chatbot.stream_response(stream_thread_id, f"Question {i}: list the key points", chat_mode,
+                                         new_thread=(i == 0)):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+        stream_timings.append(time.perf_counter() - start)
+        first_token_timings.append(first_token_at - start)
+
+    return {
+        'chat_mode': chat_mode,
+        'turns': turns,
+        'get_response': summarize_timings(invoke_timings),
+        'stream_response_total': summarize_timings(stream_timings),
+        'stream_response_first_token': summarize_timings(first_token_timings)
+    }
+
+
+def seed_thread_metadata(user_id: str, count: int) -> None:
+    # Writes metadata items directly; the sidebar is built from metadata alone
+    from backend.utils import get_metadata_store
+
+    base_time = datetime(2024, 1, 1)
+    items = []
+    for i in range(count):
+        timestamp = (base_time + timedelta(seconds=i)).isoformat()
+        items.append({
+            'user_id': user_id,
+            'thread_id': f"bench-thread-{i:06d}",
+            'chat_mode': "qna",
+            'created_date': timestamp,
+            'update_date': timestamp,
+            'first_message': f"Benchmark thread {i}",
+            'message_count': 2,
+            'last_message_preview': "slide deck chart revenue growth"
+        })
+    get_metadata_store().batch_put_threads(items)
+
+
+def use_metadata_store(backend: str, db_path: str):
+    """Point the metadata helpers at the in-memory DynamoDB or a SQLite table in db_path."""
+    from backend.utils import DynamoDBMetadataStore, SqliteMetadataStore, set_metadata_store
+
+    store = SqliteMetadataStore(db_path) if backend == "sqlite" else DynamoDBMetadataStore()
+    set_metadata_store(store)
+    return store
+
+
+def use_isolated_storage(storage_dir: str, llm_cache: bool = False) -> Dict:
+    """
+    Point the LLM response cache and the retrieval indexes at fresh files in storage_dir.
+
+    Args:
+        storage_dir: Directory of the run, e.g. its temporary directory
+        llm_cache: Serve repeated cacheable calls from the (empty) response cache; off measures every call
+
+    Returns:
+        dict of the installed 'response_cache', 'vector_index' and 'keyword_index'
+    """
+    from backend.chains import ResponseCache, set_llm_cache_enabled, set_response_cache
+    from backend.retrieval import KeywordIndex, VectorIndex, get_embedder, set_keyword_index, set_vector_index
+
+    embedder = get_embedder()
+    storage = {
+        'response_cache': ResponseCache(os.path.join(storage_dir, "llm_cache.db")),
+        'vector_index': VectorIndex(os.path.join(storage_dir, "vector_index"), embedder.dim, embedder.name),
+        'keyword_index': KeywordIndex(os.path.join(storage_dir, "keyword_index"))
+    }
+    set_response_cache(storage['response_cache'])
+    set_vector_index(storage['vector_index'])
+    set_keyword_index(storage['keyword_index'])
+    set_llm_cache_enabled(llm_cache)
+    return storage
+
+
+def release_isolated_storage(storage: Dict) -> None:
+    """Close what use_isolated_storage installed and restore the configured defaults."""
+    from backend.chains import set_llm_cache_enabled, set_response_cache
+    from backend.retrieval import set_keyword_index, set_vector_index
+    from common_assets.config import llm_cache_enabled
+
+    storage['vector_index'].close()
+    storage['keyword_index'].close()
+    set_response_cache(None)
+    set_vector_index(None)
+    set_keyword_index(None)
+    set_llm_cache_enabled(llm_cache_enabled)
+
+
+def bench_sidebar_load(resources, sizes, repeats: int) -> Dict:
+    """Time the first sidebar page and a full listing for users with `size` threads."""
+    results = {}
+    for size in sizes:
+        user_id = f"bench-sidebar-{size}"
+        seed_thread_metadata(user_id, size)
+        chatbot = new_chatbot(resources, user_id)
+
+        first_page_timings = []
+        full_timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            chatbot.get_sidebar_json()
+            first_page_timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cursor, loaded = None, 0
+            while True:
+                page, cursor = chatbot.get_sidebar_page(cursor=cursor)
+                loaded += len(page)
+                if not cursor:
+                    break
+            full_timings.append(time.perf_counter() - start)
+
+        results[str(size)] = {
+            'threads_loaded': loaded,
+            'first_page': summarize_timings(first_page_timings),
+            'all_pages': summarize_timings(full_timings)
+        }
+    return results
+
+
+def bench_checkpoint_growth(chatbot, turns: int, chat_mode: str = "qna") -> Dict:
+    """Size of the checkpoint database after each turn of a single thread."""
+    db_path = chatbot.resources.db_path
+    thread_id = str(uuid.uuid4())
+    sizes = [checkpoint_db_size(db_path)]
+    for i in range(turns):
+        chatbot.get_response(thread_id, f"Turn {i}: explain the chart on slide {i}", chat_mode, new_thread=(i == 0))
+        sizes.append(checkpoint_db_size(db_path))
+    deltas = [after - before for before, after in zip(sizes, sizes[1:])]
+    return {
+        'turns': turns,
+        'bytes_after_each_turn': sizes[1:],
+        'bytes_per_turn_mean': sum(deltas) / len(deltas) if deltas else 0,
+        'bytes_per_turn_last': deltas[-1] if deltas else 0
+    }
+
+
+def bench_delete_all(resources, threads: int, chat_mode: str = "qna") -> Dict:
+    """Create `threads` one-turn threads for a fresh user, then time delete_all_threads."""
+    chatbot = new_chatbot(resources, f"bench-delete-{uuid.uuid4().hex[:8]}")
+    for i in range(threads):
+        chatbot.get_response(str(uuid.uuid4()), f"Thread {i}", chat_mode, new_thread=True)
+
+    start = time.perf_counter()
+    result = chatbot.delete_all_threads()
+    elapsed = time.perf_counter() - start
+    return {
+        'threads': threads,
+        'seconds': elapsed,
+        'ok': result.ok,
+        'checkpoints_deleted': len(result.checkpoints_deleted),
+        'metadata_deleted': len(result.metadata_deleted)
+    }
+
+
+def run_suite(turns: int = 20, sidebar_sizes=DEFAULT_SIDEBAR_SIZES, sidebar_repeats: int = 5,
+              growth_turns: int = 30, delete_threads: int = 100, first_token_latency_s: float = 0.0,
+              token_latency_s: float = 0.0, metadata_store: str = "dynamodb", llm_cache: bool = False,
+              workdir: Optional[str] = None) -> Dict:
+    """
+    Run every benchmark against a fresh checkpoint database, metadata store, LLM cache and retrieval indexes.
+
+    Args:
+        metadata_store: "dynamodb" (in-memory stand-in) or "sqlite" (table in the checkpoint database)
+        llm_cache: Enable the (empty, per-run) LLM response cache
+
+    Returns:
+        dict: Results, environment and parameters (JSON-serializable)
+    """
+    install_offline_backend(first_token_latency_s=first_token_latency_s, token_latency_s=token_latency_s)
+    reset_latency_stats()
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp_dir:
+        from backend.langgraph_workflow.registry import GraphResources
+        from backend.utils import SqliteMetadataStore, set_metadata_store, get_metadata_cache
+
+        db_path = os.path.join(tmp_dir, "checkpoints.db")
+        storage = use_isolated_storage(tmp_dir, llm_cache=llm_cache)
+        store = use_metadata_store(metadata_store, db_path)
+        resources = GraphResources(db_path)
+        chatbot = new_chatbot(resources, "bench-user")
+        try:
+            results = {
+                'turn_latency': bench_turn_latency(chatbot, turns),
+                'sidebar_load': bench_sidebar_load(resources, sidebar_sizes, sidebar_repeats),
+                'checkpoint_growth': bench_checkpoint_growth(chatbot, growth_turns),
+                'delete_all': bench_delete_all(resources, delete_threads)
+            }
+            metadata_cache_stats = get_metadata_cache().stats()
+            llm_cache_stats = storage['response_cache'].stats() if llm_cache else None
+        finally:
+            resources.close()
+            release_isolated_storage(storage)
+            if isinstance(store, SqliteMetadataStore):
+                store.close()
+            set_metadata_store(None)
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'turns': turns,
+            'sidebar_sizes': list(sidebar_sizes),
+            'sidebar_repeats': sidebar_repeats,
+            'growth_turns': growth_turns,
+            'delete_threads': delete_threads,
+            'first_token_latency_s': first_token_latency_s,
+            'token_latency_s': token_latency_s,
+            'metadata_store': metadata_store,
+            'llm_cache': llm_cache
+        },
+        'results': results,
+        'spans': get_latency_stats(),
+        'metadata_cache': metadata_cache_stats,
+        'llm_cache': llm_cache_stats
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline ChatBotGraph benchmarks (fake LLM, in-memory DynamoDB).")
+    parser.add_argument("--turns", type=int, default=20, help="Turns timed for turn latency")
+    parser.add_argument("--sidebar-sizes", type=int, nargs="+", default=list(DEFAULT_SIDEBAR_SIZES),
+                        help="Thread counts for the sidebar benchmark")
+    parser.add_argument("--sidebar-repeats", type=int, default=5, help="Repetitions per sidebar size")
+    parser.add_argument("--growth-turns", type=int, default=30, help="Turns for the checkpoint growth benchmark")
+    parser.add_argument("--delete-threads", type=int, default=100, help="Threads created before delete-all")
+    parser.add_argument("--first-token-latency", type=float, default=0.0,
+                        help="Simulated model delay before the first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Simulated delay between tokens (s)")
+    parser.add_argument("--metadata-store", choices=("dynamodb", "sqlite"), default="dynamodb",
+                        help="Metadata backend: in-memory DynamoDB stand-in or SQLite in the checkpoint database")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Enable the LLM response cache (empty, in the run's temporary directory)")
+    parser.add_argument("--workdir", default=None,
+                        help="Directory for the temporary checkpoint database, LLM cache and indexes")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    report = run_suite(turns=args.turns, sidebar_sizes=args.sidebar_sizes, sidebar_repeats=args.sidebar_repeats,
+                       growth_turns=args.growth_turns, delete_threads=args.delete_threads,
+                       first_token_latency_s=args.first_token_latency, token_latency_s=args.token_latency,
+                       metadata_store=args.metadata_store, llm_cache=args.llm_cache, workdir=args.workdir)
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Retrieval latency benchmark on a synthetic slide library.
+
+Generates slide documents (Zipf-distributed words, plus product names in
+titles and logos) and measures, for the BM25 keyword index:
+
+  - build time (batched add_documents), snapshot save time and load time
+  - query latency for 1, 2 and 4 term queries, with and without a deck filter
+  - incremental add and delete latency, and search right after them
+
+and, for the vector index, append time and top-k search latency over random
+normalized vectors of the configured dimension (search cost does not depend
+on the embedder). Prints one JSON document like the other benchmarks.
+
+    python -m benchmarks.retrieval_bench --slides 100000 --output retrieval.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from .offline_suite import summarize_timings, git_revision
+
+SLIDES_PER_DECK = 40
+WORDS_PER_SLIDE = 120
+
+
+def synthetic_vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))) + str(i) for i in range(size)]
+
+
+def synthetic_slides(count: int, vocabulary: List[str], products: List[str], seed: int = 7) -> Iterator[Dict]:
+    """Slide documents shaped like slide_documents.iter_slide_documents output."""
+    rng = random.Random(seed)
+    cumulative_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(vocabulary) + 1)))
+    for i in range(count):
+        deck = i // SLIDES_PER_DECK
+        product = products[rng.randrange(len(products))]
+        title = f"{product} {rng.choice(vocabulary[:2000])}"
+        words = rng.choices(vocabulary, cum_weights=cumulative_weights, k=WORDS_PER_SLIDE)
+        yield {
+            'doc_id': f"bench-{deck:06d}:{i % SLIDES_PER_DECK + 1}",
+            'deck_hash': f"bench-deck-{deck:06d}",
+            'deck_name': f"deck-{deck}.pptx",
+            'slide_number': i % SLIDES_PER_DECK + 1,
+            'title': title,
+            'text': f"{title}\n" + " ".join(words),
+            'analysis': {'slide_headers': {'slide_title': title, 'logos': [{'logo_name': product}]}}
+        }
+
+
+def time_queries(search, queries: List[str]) -> Dict[str, float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append(time.perf_counter() - start)
+    return summarize_timings(timings)
+
+
+def bench_keyword_index(index_dir: str, slides: int, queries: int, batch_size: int, k: int) -> Dict:
+    from backend.retrieval import KeywordIndex
+
+    rng = random.Random(11)
+    vocabulary = synthetic_vocabulary(50000, rng)
+    products = [f"Product{name.capitalize()}" for name in synthetic_vocabulary(500, rng)]
+
+    index = KeywordIndex(index_dir)
+    start = time.perf_counter()
+    batch = []
+    for document in synthetic_slides(slides, vocabulary, products):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            index.add_documents(batch)
+            batch = []
+    index.add_documents(batch)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.save()
+    save_s = time.perf_counter() - start
+    index.close()
+
+    start = time.perf_counter()
+    index = KeywordIndex(index_dir)
+    load_s = time.perf_counter() - start
+
+    common = vocabulary[:200]
+    rare = vocabulary[5000:20000]
+    query_sets = {
+        'product_name': [rng.choice(products) for _ in range(queries)],
+        '2_terms': [f"{rng.choice(products)} {rng.choice(common)}" for _ in range(queries)],
+        '4_terms': [" ".join([rng.choice(common), rng.choice(common), rng.choice(rare), rng.choice(products)])
+                    for _ in range(queries)],
+        'common_term': [rng.choice(common[:20]) for _ in range(queries)]
+    }
+    latency = {name: time_queries(lambda q: index.search(q, k=k), texts) for name, texts in query_sets.items()}
+    decks = [f"bench-deck-{deck:06d}" for deck in range(0, max(1, slides // SLIDES_PER_DECK), 10)]
+    latency['2_terms_deck_filter'] = time_queries(lambda q: index.search(q, k=k, deck_hashes=decks),
+                                                  query_sets['2_terms'])
+
+    new_slides = list(synthetic_slides(queries, vocabulary, products, seed=99))
+    for number, document in enumerate(new_slides):
+        document['doc_id'] = f"bench-new:{number}"
+    add_timings = []
+    for document in new_slides:
+        start = time.perf_counter()
+        index.add_documents([document])
+        add_timings.append(time.perf_counter() - start)
+    after_add = time_queries(lambda q: index.search(q, k=k), query_sets['2_terms'])
+
+    delete_timings = []
+    for document in new_slides:
+        start = time.perf_counter()
+        index.delete_documents([document['doc_id']])
+        delete_timings.append(time.perf_counter() - start)
+    stats = index.stats()
+    index.close()
+
+    return {
+        'slides': slides,
+        'build_s': build_s,
+        'save_s': save_s,
+        'load_s': load_s,
+        'index_bytes': sum(os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir)),
+        'search': latency,
+        'add_one': summarize_timings(add_timings),
+        'search_after_adds': after_add,
+        'delete_one': summarize_timings(delete_timings),
+        'stats': stats
+    }
+
+
+def bench_vector_index(index_dir: str, slides: int, queries: int, batch_size: int, k: int) -> Dict:
+    import numpy as np
+
+    from backend.retrieval import VectorIndex, get_embedder
+
+    embedder = get_embedder()
+    dim = embedder.dim
+    rng = np.random.default_rng(5)
+    index = VectorIndex(index_dir, dim, embedder.name)
+    documents = synthetic_slides(slides, ["slide"], ["Product"])
+    start = time.perf_counter()
+    for offset in range(0, slides, batch_size):
+        rows = [next(documents) for _ in range(min(batch_size, slides - offset))]
+        index.append(rng.standard_normal((len(rows), dim), dtype=np.float32), rows)
+    append_s = time.perf_counter() - start
+
+    query_vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+    decks = [f"bench-deck-{deck:06d}" for deck in range(0, max(1, slides // SLIDES_PER_DECK), 10)]
+    timings = []
+    filtered_timings = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        index.search(vector[None, :], k=k)
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.search(vector[None, :], k=k, deck_hashes=decks)
+        filtered_timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    index.search(query_vectors, k=k)
+    batch_s = time.perf_counter() - start
+    index.close()
+    return {
+        'slides': slides,
+        'dim': dim,
+        'append_s': append_s,
+        'search': summarize_timings(timings),
+        'search_deck_filter': summarize_timings(filtered_timings),
+        'batched_search_per_query_ms': batch_s * 1000 / len(query_vectors)
+    }
+
+
+def run_benchmark(slides: int = 100000, queries: int = 200, batch_size: int = 1000, k: int = 4,
+                  vector: bool = True, workdir: Optional[str] = None) -> Dict:
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp_dir:
+        results = {'keyword': bench_keyword_index(os.path.join(tmp_dir, "keyword"), slides, queries, batch_size, k)}
+        if vector:
+            results['vector'] = bench_vector_index(os.path.join(tmp_dir, "vector"), slides, queries, batch_size, k)
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'slides': slides, 'queries': queries, 'batch_size': batch_size, 'k': k},
+        'results': results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Keyword and vector retrieval latency on a synthetic slide library.")
+    parser.add_argument("--slides", type=int, default=100000, help="Slides in the synthetic library")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed per query type")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Slides per add/append call while building")
+    parser.add_argument("--k", type=int, default=4, help="Results per query")
+    parser.add_argument("--no-vector", action="store_true", help="Skip the vector index benchmark")
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary indexes")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(slides=args.slides, queries=args.queries, batch_size=args.batch_size, k=args.k,
+                           vector=not args.no_vector, workdir=args.workdir)
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document)
+    print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
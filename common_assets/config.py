@@ -1,19 +1,152 @@
-from backend.langgraph_workflow.chat_mode_graphs import get_graph_content_gen, get_graph_qna
+import os
+from functools import lru_cache
+from importlib import import_module
+
+### Graph builders are referenced by import path and only imported when a graph is compiled,
+### so importing this config does not pull in LangGraph / LangChain
 d_chat_modes_graph = { 
     'qna': {
         'display_name':'QnA',
-        'graph_fn' : get_graph_qna
+        'graph_fn' : 'backend.langgraph_workflow.chat_mode_graphs:get_graph_qna',
+        ### Sampling temperature of the answers; the response cache only serves them at 0 (or with
+        ### llm_cache_allow_nonzero_temperature), see below
+        'temperature': 0.7,
+        'cache_llm_responses': True
     },
     'content_gen':{
         'display_name':'Content Generation',
-        'graph_fn' : get_graph_content_gen
+        'graph_fn' : 'backend.langgraph_workflow.chat_mode_graphs:get_graph_content_gen',
+        'temperature': 0.7,
+        'cache_llm_responses': False,
+        ### Sections drafted at once (LangGraph max_concurrency of the run)
+        'max_concurrency': 6
     }
 }
 
 
+@lru_cache(maxsize=None)
+def get_chat_mode_graph_fn(chat_mode: str):
+    """Resolve (and cache) the graph builder function of a chat mode."""
+    module_path, fn_name = d_chat_modes_graph[chat_mode]['graph_fn'].split(':')
+    return getattr(import_module(module_path), fn_name)
+
+
 
 checkpoint_sqlitite_loc = "./storage/checkpoints.db"
+### Checkpoint SQLite tuning (WAL, single writer + pooled readers)
+checkpoint_sqlite_busy_timeout_ms = 10000
+checkpoint_sqlite_synchronous = "NORMAL"
+checkpoint_sqlite_cache_size_kib = 16384
+checkpoint_sqlite_mmap_size = 256 * 1024 * 1024
+checkpoint_sqlite_read_pool_size = 4
+### Checkpoint retention: keep the latest N root checkpoints per thread; compaction interval in seconds (0 = off)
+checkpoint_keep_last = 5
+checkpoint_compaction_interval_s = 0
+### Thread metadata backend: "dynamodb" (table below) or "sqlite" (thread_metadata table, no network hops)
+metadata_store_backend = os.getenv("METADATA_STORE", "dynamodb")
+metadata_sqlite_loc = checkpoint_sqlitite_loc
+### Read-through cache of thread metadata items (per process); writes update it, TTL bounds cross-process staleness
+metadata_cache_enabled = True
+metadata_cache_max_entries = 10000
+metadata_cache_ttl_s = 300
 dynamodb_table_name = "docfliq_vp_gmail"
+### GSI on the metadata table: partition key user_id, sort key update_date, projection ALL
+dynamodb_update_date_index = "user_id-update_date-index"
+### Shared DynamoDB client: pool size, timeouts (seconds), retries, optional local endpoint
+dynamodb_endpoint_url = os.getenv("DYNAMODB_ENDPOINT_URL")
+dynamodb_max_pool_connections = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+dynamodb_connect_timeout = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+dynamodb_read_timeout = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+dynamodb_retry_mode = os.getenv("DYNAMODB_RETRY_MODE", "adaptive")
+dynamodb_max_attempts = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))
 default_user_name = "VIVEK"
 default_user_id = "10001"
 
+### Thread summary stored alongside thread metadata (sidebar)
+thread_preview_max_chars = 120
+sidebar_page_size = 50
+### Chat window: messages rendered by default, and added per "Load older messages" click
+message_window_size = 30
+
+### QnA history management: last K turns verbatim, within a token budget; older turns are summarized.
+### The summary (one extra LLM call before the answer) only runs once there are more than K + slack_turns turns or the
+### budget is exceeded, and then folds down to K turns and budget - slack_tokens, so it runs every few turns
+qna_history_max_turns = 10
+qna_history_max_tokens = 4000
+qna_history_summary_slack_turns = 4
+qna_history_summary_slack_tokens = 1000
+qna_history_summary_temperature = 0.0
+
+### Chat model; chat_model_temperature applies to calls without a chat mode 'temperature' (content_gen sections)
+chat_model_name = "gpt-4o-mini"
+chat_model_temperature = 0.7
+
+### LLM response cache (memory LRU + SQLite), switched per chat mode with 'cache_llm_responses' in
+### d_chat_modes_graph. Only calls made at temperature 0 are cached: a sampled answer is not the answer to
+### replay, so at the default temperatures the cache stays idle. llm_cache_allow_nonzero_temperature opts in
+### to caching sampled answers as well
+llm_cache_enabled = True
+llm_cache_allow_nonzero_temperature = False
+llm_cache_sqlite_loc = "./storage/llm_cache.db"
+llm_cache_memory_max_entries = 1024
+llm_cache_max_entries = 50000
+llm_cache_ttl_s = 7 * 24 * 3600
+### LLM scheduler (backend.chains.llm_scheduler): provider limits, calls in flight, retries with jittered backoff.
+### Batch work (ingestion) runs at most llm_batch_max_concurrency calls, always yields to chat turns and
+### leaves llm_batch_reserve_fraction of each rate bucket to them. <= 0 disables a rate limit
+llm_requests_per_minute = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+llm_tokens_per_minute = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+llm_max_concurrency = 16
+llm_batch_max_concurrency = 8
+llm_batch_reserve_fraction = 0.2
+llm_max_retries = 4
+llm_backoff_base_s = 1.0
+llm_backoff_max_s = 30.0
+### Completion tokens charged up front per call, corrected with the reported usage afterwards
+llm_expected_completion_tokens = 400
+
+### Metadata write-behind: queue save_thread_metadata off the response path
+metadata_write_behind = False
+metadata_write_queue_size = 1000
+
+
+### Tracing: per-span latency histograms are always kept; spans are logged as JSON on the "docfliq.trace" logger.
+### The debug panel shows p50/p95/p99 per span in the chat view (DEBUG_PANEL=1)
+debug_panel_enabled = os.getenv("DEBUG_PANEL", "0") == "1"
+
+### Slide ingestion (backend.ingestion): analyses + manifest in SQLite, rendered slide images on disk
+ingestion_sqlite_loc = "./storage/ingestion.db"
+ingestion_image_dir = "./storage/slide_images"
+ingestion_render_workers = int(os.getenv("INGESTION_RENDER_WORKERS", str(min(8, os.cpu_count() or 2))))
+ingestion_render_dpi = 110
+### Keep slide images after their analysis is saved (off: each PNG is deleted once its slide is done)
+ingestion_keep_images = False
+### Concurrent slide analysis calls, and retries per slide (API errors / invalid JSON)
+ingestion_max_concurrency = int(os.getenv("INGESTION_MAX_CONCURRENCY", "8"))
+ingestion_max_retries = 3
+ingestion_model_name = "gpt-4o-mini"
+
+### Retrieval for QnA (backend.retrieval): memory-mapped vector index of ingested slides, top-k slides per turn.
+### Embedder "openai" uses retrieval_openai_embedding_model; "hashing" is a deterministic local stand-in for
+### offline benchmarks and tests only (its vectors match shared words, not meaning)
+retrieval_enabled = True
+retrieval_index_dir = "./storage/vector_index"
+retrieval_embedder = os.getenv("RETRIEVAL_EMBEDDER", "openai")
+retrieval_embedding_dim = 384
+retrieval_openai_embedding_model = "text-embedding-3-small"
+retrieval_top_k = 4
+retrieval_max_context_chars = 6000
+### Keyword (BM25) index over slide analyses; header terms (title, subheadings, logos) count keyword_header_boost times.
+### Added slides are merged into the main postings once the delta exceeds keyword_index_max_delta_postings
+keyword_index_dir = "./storage/keyword_index"
+keyword_bm25_k1 = 1.2
+keyword_bm25_b = 0.75
+keyword_header_boost = 3
+keyword_index_max_delta_postings = 500000
+### Retriever of the QnA retrieve node: "vector", "keyword" or "hybrid" (reciprocal rank fusion of both)
+retrieval_backend = os.getenv("RETRIEVAL_BACKEND", "hybrid")
+retrieval_rrf_k = 60
+### Content generation: outline (at most content_gen_max_sections sections), sections drafted in parallel, merged.
+### The outline sees the last content_gen_history_messages messages of the thread
+content_gen_max_sections = 8
+content_gen_history_messages = 6
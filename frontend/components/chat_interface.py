@@ -1,6 +1,6 @@
 import streamlit as st
-from frontend.helper import create_new_thread
-from common_assets.config import default_user_id
+from frontend.helper import create_new_thread, upsert_sidebar_entry
+from common_assets.config import default_user_id, message_window_size, debug_panel_enabled
 
 def render_chat_interface():
     """
@@ -12,8 +12,9 @@ def render_chat_interface():
     chatbot = st.session_state.chatbot
     thread_id = st.session_state.selected_thread_id
 
-    ## Only for debugging. 
-    st.json(st.session_state, expanded=False)
+    ## Only for debugging: latency percentiles per span (turn, nodes, LLM, checkpoints, DynamoDB)
+    if debug_panel_enabled:
+        _display_debug_panel()
 
     # Display existing message history
     _display_message_history(chatbot, thread_id)
@@ -22,15 +23,59 @@ def render_chat_interface():
     _handle_new_message(chatbot, thread_id)
 
 
+def _display_debug_panel():
+    """Render per-span latency percentiles collected by backend.utils.tracing, and metadata cache stats."""
+    from backend.utils import get_latency_stats, get_metadata_cache
+
+    with st.expander("Latency (ms)", expanded=False):
+        st.caption(f"Metadata cache: {get_metadata_cache().stats()}")
+        stats = get_latency_stats()
+        if not stats:
+            st.caption("No spans recorded yet.")
+            return
+        st.dataframe(
+            [{'span': name, **{key: round(value, 1) for key, value in row.items()}} for name, row in stats.items()],
+            hide_index=True
+        )
+
+
 def _display_message_history(chatbot, thread_id):
-    """Display existing messages from the backend for the current thread."""
+    """
+    Display existing messages from the backend for the current thread.
+
+    Messages are cached per thread in session state together with the checkpoint
+    they were read at; on a rerun only messages added since that checkpoint are
+    fetched. Only the last `window` messages are rendered, older ones on demand.
+    """
     if thread_id is None:
         return
 
-    messages = chatbot.get_thread_state_messages(thread_id)['messages']
-    for message in messages:
-        with st.chat_message(message.type):
-            st.markdown(message.content)
+    entry = _get_cached_messages(chatbot, thread_id)
+    messages = entry['messages']
+
+    hidden_count = len(messages) - entry['window']
+    if hidden_count > 0:
+        if st.button(f"Load older messages ({hidden_count} hidden)", key=f"load_older_{thread_id}"):
+            entry['window'] += message_window_size
+            st.rerun()
+
+    for message_type, content in messages[-entry['window']:]:
+        with st.chat_message(message_type):
+            st.markdown(content)
+
+
+def _get_cached_messages(chatbot, thread_id):
+    """Return the thread's message cache entry, updated with the messages added since it was last read."""
+    message_cache = st.session_state.setdefault('message_cache', {})
+    entry = message_cache.setdefault(thread_id, {'checkpoint_id': None, 'messages': [], 'window': message_window_size})
+
+    delta = chatbot.get_thread_messages_delta(thread_id, since_checkpoint_id=entry['checkpoint_id'],
+                                              known_count=len(entry['messages']))
+    if delta['reset']:
+        entry['messages'] = []
+    entry['messages'].extend((message.type, message.content) for message in delta['messages'])
+    entry['checkpoint_id'] = delta['checkpoint_id']
+    return entry
 
 
 def _handle_new_message(chatbot, thread_id):
@@ -44,8 +89,6 @@ def _handle_new_message(chatbot, thread_id):
         if thread_id is None:
             thread_id = create_new_thread(default_user_id)
             new_thread = True
-            ### Update Session State to add new chat
-            st.session_state.all_thread_details = st.session_state.chatbot.get_sidebar_json()
 
         # Update session state for subsequent reruns
         st.session_state.selected_thread_id = thread_id
@@ -60,20 +103,17 @@ def _handle_new_message(chatbot, thread_id):
 
         # Display user message immediately
 
-        # Get AI response from backend
-        ai_response = chatbot.get_response(
+        # Stream the AI response from the backend, rendering tokens as they arrive
+        _stream_ai_response(chatbot.stream_response(
             human_message=user_input,
             thread_id=thread_id,
             chat_mode=chat_mode,
             new_thread = new_thread
-        )
+        ))
 
-        # Display AI response immediately
-        _display_ai_response(ai_response)
+        ### Update only this chat's sidebar entry with the summary written by the backend
+        upsert_sidebar_entry(thread_id, chatbot.get_thread_summary(thread_id))
 
-        if new_thread:
-            st.session_state.all_thread_details = st.session_state.chatbot.get_sidebar_json()
-            
         st.rerun()
 
 
@@ -84,7 +124,7 @@ def _display_user_message(content):
         st.markdown(content)
 
 
-def _display_ai_response(content):
-    """Render an AI response in the chat interface."""
+def _stream_ai_response(token_stream):
+    """Render an AI response incrementally from a stream of tokens and return the full text."""
     with st.chat_message("ai"):
-        st.markdown(content)
+        return st.write_stream(token_stream)
@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 from pathlib import Path
+from frontend.helper import load_more_sidebar, remove_sidebar_entries
 
 # Add backend to path
 
@@ -9,7 +10,6 @@ def display_chat_list_sidebar():
 
     chatbot = st.session_state.chatbot
     # d_list_chats = chatbot.get_sidebar_json()
-    d_all_chat_json = st.session_state.all_thread_details
 
 
     with st.sidebar:
@@ -23,8 +23,20 @@ def display_chat_list_sidebar():
             # # st.rerun()
         if st.button("🗑️ Delete All Chats", use_container_width=True, type="primary"):
             # Go to an empty chat screen -> Create fresh logic
-            chatbot.delete_all_threads()
-            st.rerun()
+            progress_bar = st.progress(0.0, text="Deleting chats...")
+            def update_progress(stage, done, total):
+                progress_bar.progress(done / total, text=f"Deleting {stage}: {done}/{total}")
+
+            result = chatbot.delete_all_threads(progress_callback=update_progress)
+            progress_bar.empty()
+            if not result:
+                st.warning(f"{len(result.failed)} of {result.total} chats could not be deleted. Try again.")
+            st.session_state.selected_thread_id = None
+            st.session_state.message_cache = {}
+            # Drop deleted chats locally, no refetch; chats that failed to delete stay listed
+            remove_sidebar_entries(result.metadata_deleted)
+            if result:
+                st.session_state.sidebar_cursor = None
             st.toast(f"Send message to start new chat")
 
         st.divider()
@@ -33,7 +45,10 @@ def display_chat_list_sidebar():
         # Display list of chats
         st.subheader("Recent Chats")
 
-        for thread_id,thread_info in d_all_chat_json.items() :
+        # Entries are upserted in place as chats are updated, so order by recency at render time
+        d_all_chat_json = st.session_state.all_thread_details
+        l_sorted_chats = sorted(d_all_chat_json.items(), key=lambda item: item[1]['update_date'], reverse=True)
+        for thread_id,thread_info in l_sorted_chats :
             # Chat summary as a single clickable line
             if st.button(
                 thread_info['first_message'],
@@ -42,3 +57,9 @@ def display_chat_list_sidebar():
             ):
                 # Set selected thread ID
                 st.session_state.selected_thread_id = thread_id
+
+        # Older chats are only fetched on demand
+        if st.session_state.get('sidebar_cursor'):
+            if st.button("Load more", key="sidebar_load_more", use_container_width=True):
+                load_more_sidebar()
+                st.rerun()
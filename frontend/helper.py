@@ -1,8 +1,8 @@
 import streamlit as st
 from uuid_utils import uuid7
-from backend.langgraph_workflow.graph import ChatBotGraph
-from backend.utils import save_thread_metadata
-from common_assets.config import d_chat_modes_graph, default_user_id, dynamodb_table_name
+from common_assets.config import (
+    d_chat_modes_graph, default_user_id, dynamodb_table_name, retrieval_enabled, retrieval_backend
+)
 
 def create_new_thread(user: str = str(default_user_id)) -> str:
     thread_id = str(uuid7())
@@ -11,14 +11,50 @@ def create_new_thread(user: str = str(default_user_id)) -> str:
 
 def init_st_session_state():
     if "chatbot" not in st.session_state:
+        # Imported on first session start so importing the frontend does not load LangGraph
+        from backend.langgraph_workflow.graph import ChatBotGraph
+        # Lightweight per-user handle: the compiled graph and checkpointer are shared by all sessions
         chatbot = ChatBotGraph(user_id=str(default_user_id))
+        if retrieval_enabled and retrieval_backend != "keyword":
+            # Open the vector index now, so an index built with another embedder fails at startup
+            from backend.retrieval import get_vector_index
+            get_vector_index()
         st.session_state.chatbot = chatbot
     if "selected_thread_id" not in st.session_state:
         st.session_state.selected_thread_id = None
     if 'all_thread_details' not in st.session_state:
         if 'chatbot' in st.session_state:
-            st.session_state.all_thread_details = st.session_state.chatbot.get_sidebar_json()
+            refresh_sidebar()
         else:
             st.session_state.all_thread_details = dict()
+            st.session_state.sidebar_cursor = None
     if 'selected_chat_mode' not in st.session_state:
         st.session_state.selected_chat_mode = list(d_chat_modes_graph.keys())[0]
+
+
+def refresh_sidebar():
+    ### Reload the first page of the sidebar; older chats are fetched with load_more_sidebar
+    d_threads, cursor = st.session_state.chatbot.get_sidebar_page()
+    st.session_state.all_thread_details = d_threads
+    st.session_state.sidebar_cursor = cursor
+
+def load_more_sidebar():
+    d_threads, cursor = st.session_state.chatbot.get_sidebar_page(cursor=st.session_state.sidebar_cursor)
+    st.session_state.all_thread_details.update(d_threads)
+    st.session_state.sidebar_cursor = cursor
+
+def upsert_sidebar_entry(thread_id, summary):
+    ### O(1) update of one chat in the sidebar; the first message and creation date already shown are kept
+    if summary is None:
+        return
+    d_threads = st.session_state.all_thread_details
+    if thread_id in d_threads:
+        summary = {**summary,
+                   'first_message': d_threads[thread_id]['first_message'],
+                   'created_date': d_threads[thread_id]['created_date']}
+    d_threads[thread_id] = summary
+
+def remove_sidebar_entries(thread_ids):
+    d_threads = st.session_state.all_thread_details
+    for thread_id in thread_ids:
+        d_threads.pop(thread_id, None)